@@ -0,0 +1,329 @@
+"""Colector asíncrono: varios puertos serie leídos a la vez.
+
+``SerialCollector`` bloquea en ``readline`` (2 s de timeout) y después
+duerme ``sample_interval_s``: un proceso atiende un solo puerto y el reenvío
+de la cola offline o la publicación esperan detrás de la lectura.
+
+``AsyncSerialCollector`` separa las tres cosas:
+
+* Un hilo lector por puerto hace el ``readline`` bloqueante (timeout corto),
+  sella la muestra con el instante de lectura, la parsea y calibra con el
+  ``SerialCollector`` de ese puerto y la entrega al bucle de eventos.
+* Una ``asyncio.Queue`` acotada recibe las muestras; la tarea de publicación
+  las saca por lotes y las publica en un hilo auxiliar (Influx/cola offline,
+  banda muerta y agregados como en el colector síncrono).
+* Con ``process=True`` otra cola alimenta la tarea de procesamiento
+  (``processing.stub.feed_sample``: reordenación, filtros, indicadores y
+  detectores) y cada resultado se entrega a ``on_result``.
+* Una tarea de mantenimiento reenvía la cola offline cada
+  ``influx_retry_interval_s`` sin frenar la lectura.
+
+Si una cola se llena, las muestras nuevas se descartan y se cuentan en
+``dropped`` (los hilos lectores nunca bloquean el puerto).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import serial
+
+from src.timeutils import now_ns
+
+from .collector import DEFAULT_BAUDRATE, SerialCollector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_TIMEOUT_S = 0.2
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 200
+_ERROR_BACKOFF_S = 1.0
+
+QueuedSample = Tuple[str, Dict[str, Any]]
+
+
+@dataclass(frozen=True, slots=True)
+class PortSpec:
+    """Puerto serie a leer (``node_id`` None = el de la configuración)."""
+
+    port: str
+    baudrate: int = DEFAULT_BAUDRATE
+    node_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class PortStats:
+    """Contadores de un puerto."""
+
+    lines: int = 0
+    invalid: int = 0
+    dropped: int = 0
+    published: int = 0
+    errors: int = 0
+
+
+class AsyncSerialCollector:
+    """Lee varios puertos en paralelo y publica/procesa desde colas asyncio."""
+
+    def __init__(
+        self,
+        ports: Iterable[Union[PortSpec, str]],
+        *,
+        node_id: Optional[str] = None,
+        process: bool = False,
+        on_result: Optional[Callable[[Any], None]] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        read_timeout_s: float = DEFAULT_READ_TIMEOUT_S,
+        collector_factory: Callable[..., SerialCollector] = SerialCollector,
+    ) -> None:
+        specs = [PortSpec(item) if isinstance(item, str) else item for item in ports]
+        if not specs:
+            raise ValueError("AsyncSerialCollector necesita al menos un puerto")
+        self.collectors: Dict[str, SerialCollector] = {
+            spec.port: collector_factory(port=spec.port, baudrate=spec.baudrate, node_id=spec.node_id or node_id)
+            for spec in specs
+        }
+        self.process = process
+        self.on_result = on_result
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.read_timeout_s = read_timeout_s
+        self.port_stats: Dict[str, PortStats] = {port: PortStats() for port in self.collectors}
+        self.processed = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._halt = threading.Event()
+        self._publish_queue: Optional[asyncio.Queue] = None
+        self._process_queue: Optional[asyncio.Queue] = None
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    async def run(self, duration_s: Optional[float] = None) -> Dict[str, Any]:
+        """Lee hasta ``stop()`` (o ``duration_s``), vacía las colas y devuelve ``stats()``."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._halt.clear()
+        self._publish_queue = asyncio.Queue(self.queue_size)
+        self._process_queue = asyncio.Queue(self.queue_size) if self.process else None
+
+        ports = [port for port, collector in self.collectors.items() if self._open(collector)]
+        if not ports:
+            logger.error("Ningún puerto serie disponible")
+            return self.stats()
+        readers = [
+            threading.Thread(target=self._read_port, args=(port,), name=f"serial-{port}", daemon=True)
+            for port in ports
+        ]
+        tasks = [asyncio.create_task(self._publish_loop()), asyncio.create_task(self._maintenance_loop())]
+        if self._process_queue is not None:
+            tasks.append(asyncio.create_task(self._process_loop()))
+
+        self._started = time.perf_counter()
+        for reader in readers:
+            reader.start()
+        logger.info("Leyendo %d puertos: %s", len(ports), ", ".join(ports))
+        try:
+            if duration_s is None:
+                await self._stop.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), duration_s)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._halt.set()
+            await asyncio.to_thread(self._join, readers)
+            self._elapsed = time.perf_counter() - self._started
+            await self._publish_queue.join()
+            if self._process_queue is not None:
+                await self._process_queue.join()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.to_thread(self._finish)
+        return self.stats()
+
+    def stop(self) -> None:
+        """Pide parar (seguro desde cualquier hilo)."""
+        self._halt.set()
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = self._elapsed or (time.perf_counter() - self._started if self._started else 0.0)
+        lines = sum(item.lines for item in self.port_stats.values())
+        return {
+            "ports": {port: asdict(item) for port, item in self.port_stats.items()},
+            "lines": lines,
+            "published": sum(item.published for item in self.port_stats.values()),
+            "dropped": sum(item.dropped for item in self.port_stats.values()),
+            "processed": self.processed,
+            "elapsed_s": round(elapsed, 3),
+            "lines_per_s": round(lines / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def get_last_values(self) -> Dict[str, Dict]:
+        """Últimos valores leídos por puerto."""
+        return {port: collector.get_last_values() for port, collector in self.collectors.items()}
+
+    # -- hilos lectores -------------------------------------------------------
+
+    def _open(self, collector: SerialCollector) -> bool:
+        if collector.ser is not None and collector.ser.is_open:
+            return True
+        return collector.connect(timeout=self.read_timeout_s)
+
+    def _read_port(self, port: str) -> None:
+        collector = self.collectors[port]
+        stats = self.port_stats[port]
+        pending = b""
+        while not self._halt.is_set():
+            try:
+                chunk = collector.ser.readline()
+            except (serial.SerialException, OSError) as exc:
+                stats.errors += 1
+                logger.warning("Error leyendo %s: %s", port, exc)
+                self._halt.wait(_ERROR_BACKOFF_S)
+                continue
+            if not chunk:
+                continue
+            if not chunk.endswith(b"\n"):
+                # Timeout a mitad de línea: se completa en la siguiente lectura.
+                pending += chunk
+                continue
+            line = (pending + chunk).decode("utf-8", errors="ignore").strip()
+            pending = b""
+            if not line:
+                continue
+            stats.lines += 1
+            sample = collector.sample_from_line(line, now_ns())
+            if sample is None:
+                stats.invalid += 1
+                continue
+            self._loop.call_soon_threadsafe(self._enqueue, port, sample)
+
+    @staticmethod
+    def _join(readers: List[threading.Thread]) -> None:
+        for reader in readers:
+            reader.join()
+
+    # -- bucle de eventos -----------------------------------------------------
+
+    def _enqueue(self, port: str, sample: Dict[str, Any]) -> None:
+        self._put(port, self._publish_queue, (port, sample))
+        if self._process_queue is not None:
+            self._put(port, self._process_queue, dict(sample))
+
+    def _put(self, port: str, queue: asyncio.Queue, item: Any) -> None:
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.port_stats[port].dropped += 1
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[Any]:
+        batch = [await queue.get()]
+        while len(batch) < self.batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _publish_loop(self) -> None:
+        queue = self._publish_queue
+        while True:
+            batch = await self._next_batch(queue)
+            try:
+                await asyncio.to_thread(self._store_batch, batch)
+            except Exception as exc:  # noqa: BLE001 - la publicación no debe parar la lectura
+                logger.error("Error publicando lote: %s", exc)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _store_batch(self, batch: List[QueuedSample]) -> None:
+        for port, sample in batch:
+            if self.collectors[port].store_sample(sample):
+                self.port_stats[port].published += 1
+
+    async def _process_loop(self) -> None:
+        from src.processing import stub as processing_stub
+
+        queue = self._process_queue
+        while True:
+            batch = await self._next_batch(queue)
+            try:
+                results = await asyncio.to_thread(
+                    lambda: [result for sample in batch for result in processing_stub.feed_sample(sample)]
+                )
+                self._deliver(results)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Error procesando lote: %s", exc)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _deliver(self, results: List[Any]) -> None:
+        self.processed += len(results)
+        if self.on_result is not None:
+            for result in results:
+                self.on_result(result)
+
+    async def _maintenance_loop(self) -> None:
+        collector = next(iter(self.collectors.values()))
+        interval_s = max(1, collector.retry_interval_s)
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await asyncio.to_thread(collector._flush_pending_payloads)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Error reenviando la cola offline: %s", exc)
+
+    def _finish(self) -> None:
+        """Agregados abiertos, lo retenido en la reordenación y cierre de puertos."""
+        for collector in self.collectors.values():
+            collector.flush_aggregates()
+            collector.disconnect()
+        if self.process:
+            from src.processing import stub as processing_stub
+
+            self._deliver(processing_stub.flush_stream())
+
+
+def collect_async_cli() -> None:
+    """CLI: ``python -m src.acquisition.async_collector --port A --port B``."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recolecta datos de varios puertos serie a la vez")
+    parser.add_argument("--port", action="append", required=True, help="Puerto serie (repetible)")
+    parser.add_argument("--baudrate", type=int, default=DEFAULT_BAUDRATE, help="Baudrate")
+    parser.add_argument("--node-id", default=None, help="ID del nodo")
+    parser.add_argument("--duration", type=float, help="Segundos de lectura (por defecto, hasta Ctrl+C)")
+    parser.add_argument("--process", action="store_true", help="Procesar también las muestras (detectores)")
+    parser.add_argument("--log-level", default="INFO", help="Nivel de log")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    collector = AsyncSerialCollector(
+        [PortSpec(port, args.baudrate) for port in args.port],
+        node_id=args.node_id,
+        process=args.process,
+    )
+    try:
+        stats = asyncio.run(collector.run(args.duration))
+    except KeyboardInterrupt:
+        stats = collector.stats()
+    print(f"\n✓ {stats['published']} muestras publicadas ({stats['lines_per_s']} líneas/s)")
+
+
+__all__ = ["AsyncSerialCollector", "PortSpec", "PortStats", "collect_async_cli"]
+
+
+if __name__ == "__main__":
+    collect_async_cli()
@@ -2,7 +2,7 @@
 
 import logging
 import time
-from datetime import datetime, UTC
+from datetime import timedelta
 from pathlib import Path
 from typing import Dict, Optional
 
@@ -10,6 +10,7 @@ import serial
 from dotenv import load_dotenv
 
 try:
+    from .db import get_database
     from .influx import get_influx_sink
     from .state_store import get_state_store
 except ImportError:  # Permite ejecutar "python collector.py" desde src/acquisition
@@ -18,11 +19,13 @@ except ImportError:  # Permite ejecutar "python collector.py" desde src/acquisit
     src_root = Path(__file__).resolve().parents[1]
     if str(src_root) not in sys.path:
         sys.path.append(str(src_root))
+    from acquisition.db import get_database  # type: ignore
     from acquisition.influx import get_influx_sink  # type: ignore
     from acquisition.state_store import get_state_store  # type: ignore
 
 try:
     from src.config import load_settings
+    from src.timeutils import iso_from_ns, now_ns
 except ModuleNotFoundError:  # Permite ejecutar "python collector.py"
     import sys
 
@@ -30,6 +33,21 @@ except ModuleNotFoundError:  # Permite ejecutar "python collector.py"
     if str(src_root) not in sys.path:
         sys.path.append(str(src_root))
     from config import load_settings  # type: ignore
+    from timeutils import iso_from_ns, now_ns  # type: ignore
+
+try:
+    from src.processing.aggregation import TumblingAggregator, widths_from_setting
+    from src.processing.calibration import get_calibration
+    from src.processing.deadband import DeadbandFilter, rules_from_setting
+except ModuleNotFoundError:  # Permite ejecutar "python collector.py": el procesado importa ``src.*``
+    import sys
+
+    repo_root = Path(__file__).resolve().parents[2]
+    if str(repo_root) not in sys.path:
+        sys.path.append(str(repo_root))
+    from src.processing.aggregation import TumblingAggregator, widths_from_setting  # type: ignore
+    from src.processing.calibration import get_calibration  # type: ignore
+    from src.processing.deadband import DeadbandFilter, rules_from_setting  # type: ignore
 
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
@@ -45,13 +63,15 @@ class SerialCollector:
     """Recolecta datos del puerto serie en la base de datos."""
 
     def __init__(self, port: str = DEFAULT_PORT, baudrate: int = DEFAULT_BAUDRATE,
-                 node_id: str = "naira-node-001"):
+                 node_id: str = "naira-node-001", deadband: Optional[DeadbandFilter] = None):
         """Inicializa el colector.
         
         Args:
             port: Puerto serie (ej: /dev/ttyACM0)
             baudrate: Velocidad en baudios
             node_id: ID del nodo
+            deadband: Filtro report-by-exception de la etapa de publicación;
+                por defecto se construye con ``NAIRA_DEADBAND`` (sin reglas, ninguno)
         """
         self.settings = load_settings()
         self.port = port
@@ -61,17 +81,55 @@ class SerialCollector:
         self.state_store = get_state_store()
         self.retry_interval_s = getattr(self.settings, "influx_retry_interval_s", 10)
         self.sample_interval_s = max(0, getattr(self.settings, "collector_interval_s", 30))
+        self.publish_mode = getattr(self.settings, "telemetry_publish", "raw")
+        self.aggregator = self._build_aggregator() if self.publish_mode in ("aggregates", "both") else None
+        # En modo agregados lo crudo no se publica: se guarda en el SQLite local.
+        self.database = self._open_database() if self.publish_mode == "aggregates" else None
+        self.deadband = deadband if deadband is not None else self._build_deadband()
+        self.calibration = self._load_calibration()
         self.ser = None
         self.last_values = {}  # Caché de últimos valores
 
-    def connect(self) -> bool:
+    def _build_aggregator(self):
+        """Ventanas tumbling para publicar agregados en lugar de (o además de) lo crudo."""
+        widths = widths_from_setting(getattr(self.settings, "aggregate_windows_s", ""))
+        return TumblingAggregator(widths, emit_raw=False)
+
+    def _open_database(self):
+        """Base SQLite local de muestras (None si no se puede abrir)."""
+        try:
+            return get_database()
+        except Exception as exc:  # noqa: BLE001 - sin BD local se avisa en cada muestra
+            logger.error("No se pudo abrir la base de datos local: %s", exc)
+            return None
+
+    def _load_calibration(self):
+        """Tablas de calibración de los sensores analógicos; registra su versión en el state store."""
+        calibration = get_calibration()
+        if calibration and self.state_store:
+            try:
+                calibration.record_version(self.state_store, self.node_id)
+            except Exception as exc:  # noqa: BLE001 - el registro no debe impedir la adquisición
+                logger.warning("No se pudo registrar la versión de calibración: %s", exc)
+        return calibration
+
+    def _build_deadband(self):
+        """Filtro report-by-exception de ``NAIRA_DEADBAND`` (None si no hay reglas)."""
+        max_silence = timedelta(seconds=max(0, getattr(self.settings, "deadband_max_silence_s", 900)))
+        rules = rules_from_setting(getattr(self.settings, "deadband_rules", ""), max_silence=max_silence)
+        return DeadbandFilter(rules) if rules else None
+
+    def connect(self, timeout: float = DEFAULT_TIMEOUT) -> bool:
         """Abre conexión al puerto serie.
         
+        Args:
+            timeout: Espera máxima de ``readline`` en segundos
+            
         Returns:
             True si conecta, False si falla
         """
         try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=DEFAULT_TIMEOUT)
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=timeout)
             logger.info(f"Conectado a {self.port} @ {self.baudrate} baud")
             return True
         except serial.SerialException as e:
@@ -149,17 +207,21 @@ class SerialCollector:
             logger.warning(f"Error parseando línea '{line}': {e}")
             return None
 
-    def normalize_sample(self, parsed: Dict) -> Dict:
+    def normalize_sample(self, parsed: Dict, ts_ns: Optional[int] = None) -> Dict:
         """Normaliza muestra a estructura estándar.
         
         Args:
             parsed: Dict con {metric, value, unit, source}
+            ts_ns: Instante de lectura (epoch ns); por defecto, ahora
             
         Returns:
-            Dict normalizado con estructura NAIRA
+            Dict normalizado con estructura NAIRA (``ts`` ISO y ``ts_ns`` epoch ns)
         """
+        if ts_ns is None:
+            ts_ns = now_ns()
         return {
-            "ts": datetime.now(UTC).isoformat().replace("+00:00", "") + "Z",
+            "ts": iso_from_ns(ts_ns),
+            "ts_ns": ts_ns,
             "node_id": self.node_id,
             "source": parsed.get("source", "meteo"),
             "metric": parsed.get("metric"),
@@ -284,28 +346,91 @@ class SerialCollector:
         if not line:
             return False
         
+        normalized = self.sample_from_line(line)
+        if not normalized:
+            return False
+        return self.store_sample(normalized)
+
+    def sample_from_line(self, line: str, ts_ns: Optional[int] = None) -> Optional[Dict]:
+        """Parsea, normaliza y calibra una línea (None si no es válida).
+        
+        Args:
+            line: Línea recibida
+            ts_ns: Instante de lectura (epoch ns); por defecto, ahora
+        """
         parsed = self.parse_line(line)
         if not parsed:
-            return False
+            return None
         
-        normalized = self.normalize_sample(parsed)
+        normalized = self.normalize_sample(parsed, ts_ns)
         if normalized.get("quality") == "bad":
             self._record_event(
                 event_type="sensor_sample_bad_quality",
                 severity="warn",
                 context={"metric": normalized.get("metric"), "value": normalized.get("value")},
             )
+        # La calidad se evalúa sobre las cuentas del ADC; se publica el valor calibrado.
+        return self.calibration.apply(normalized)
 
-        published = self._publish_sample(normalized)
+    def store_sample(self, normalized: Dict) -> bool:
+        """Actualiza la caché local y publica la muestra (o la encola offline).
+        
+        En modo ``aggregates`` lo crudo no se publica: se guarda en la base
+        SQLite local y sólo salen los agregados.
+        
+        Returns:
+            True si se publicó (o se guardó en local en modo agregados), False si no
+        """
         metric = normalized.get("metric", "unknown")
         unit = normalized.get("unit", "")
+        # La caché local siempre refleja la última lectura, se publique o no.
+        self.last_values[metric] = normalized.get("value")
+        if self.publish_mode == "aggregates":
+            stored = self._store_local(normalized)
+            if self.aggregator is not None:
+                for aggregate in self.aggregator.process(normalized):
+                    self._publish_sample(aggregate)
+            return stored
+
+        published = self._publish_raw(normalized)
+        if self.aggregator is not None:
+            # Los agregados ven todas las lecturas, también las suprimidas.
+            for aggregate in self.aggregator.process(normalized):
+                self._publish_sample(aggregate)
+        if published is None:
+            logger.debug(f"Sin cambio significativo, no se publica: {metric}={normalized.get('value')} {unit}")
+            return False
         if published:
-            self.last_values[metric] = normalized.get("value")
             logger.info(f"Publicado: {metric}={normalized.get('value')} {unit}")
         else:
             logger.warning(f"Muestra encolada offline: {metric}")
         return published
 
+    def _publish_raw(self, sample: Dict) -> Optional[bool]:
+        """Etapa de publicación de lo crudo: banda muerta y envío (None si se suprime)."""
+        if self.deadband is not None and self.deadband.process(sample) is None:
+            return None
+        return self._publish_sample(sample)
+
+    def _store_local(self, sample: Dict) -> bool:
+        """Guarda una muestra cruda sólo en el SQLite local (sin replicar a Influx)."""
+        metric = sample.get("metric", "unknown")
+        if self.database is None:
+            logger.error(f"Base de datos local deshabilitada; muestra cruda perdida: {metric}")
+            return False
+        try:
+            self.database.insert_sample(sample, replicate=False)
+        except Exception as exc:  # noqa: BLE001 - la adquisición sigue aunque falle el disco
+            logger.error(f"Error guardando en local {metric}: {exc}")
+            self._record_event(
+                event_type="local_store_failed",
+                severity="error",
+                context={"metric": metric, "error": str(exc)},
+            )
+            return False
+        logger.debug(f"Guardado en local: {metric}={sample.get('value')} {sample.get('unit', '')}")
+        return True
+
     def read_and_store_loop(self, count: Optional[int] = None) -> int:
         """Lee N líneas del puerto y las guarda en BD.
         
@@ -338,6 +463,15 @@ class SerialCollector:
         
         return saved
 
+    def flush_aggregates(self) -> int:
+        """Publica las ventanas abiertas (p. ej. al detener el colector)."""
+        if self.aggregator is None:
+            return 0
+        closed = self.aggregator.flush()
+        for aggregate in closed:
+            self._publish_sample(aggregate)
+        return len(closed)
+
     def get_last_values(self) -> Dict:
         """Obtiene últimos valores leídos (caché).
         
@@ -346,6 +480,12 @@ class SerialCollector:
         """
         return self.last_values.copy()
 
+    def get_deadband_stats(self) -> Dict:
+        """Contadores del filtro de banda muerta (publicadas, suprimidas, latidos, tasa)."""
+        if self.deadband is None:
+            return {"deadband": "disabled"}
+        return self.deadband.stats()
+
     def get_state_stats(self) -> Dict:
         """Resumen del almacén de estado/offline."""
         if not self.state_store:
@@ -12,7 +12,7 @@ import sqlite3
 import logging
 from datetime import datetime, UTC
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from .influx import get_influx_sink
 
@@ -67,6 +67,9 @@ class SensorDatabase:
                 cursor.execute("""
                     CREATE INDEX IF NOT EXISTS idx_node ON sensor_samples(node_id)
                 """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_metric_ts ON sensor_samples(metric, ts)
+                """)
                 
                 # Tabla de consolidaciones (para agregaciones diarias)
                 cursor.execute("""
@@ -106,7 +109,7 @@ class SensorDatabase:
             logger.error(f"Error inicializando BD: {e}")
             raise
 
-    def insert_sample(self, sample: Dict) -> int:
+    def insert_sample(self, sample: Dict, replicate: bool = True) -> int:
         """Inserta una muestra sensorial.
         
         Args:
@@ -120,6 +123,7 @@ class SensorDatabase:
                     "unit": "°C|%",
                     "quality": "ok|suspect|bad"
                 }
+            replicate: Replicar también en Influx (False para guardar sólo en local)
         
         Returns:
             ID de la fila insertada
@@ -143,7 +147,8 @@ class SensorDatabase:
                 conn.commit()
                 row_id = cursor.lastrowid
                 logger.debug(f"Muestra insertada: ID={row_id}, metric={sample.get('metric')}")
-                self._replicate_sample(sample)
+                if replicate:
+                    self._replicate_sample(sample)
                 return row_id
         except sqlite3.Error as e:
             logger.error(f"Error insertando muestra: {e}")
@@ -311,6 +316,38 @@ class SensorDatabase:
             logger.error(f"Error obteniendo rango de tiempo: {e}")
             return []
 
+    def iter_metric_window(self, metric: str, start_ts: str,
+                           node_id: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+        """Recorre ``(node_id, ts, value)`` de una métrica desde ``start_ts``.
+
+        Una única consulta por rango sobre el índice ``(metric, ts)``, en orden
+        cronológico y sin materializar dicts por fila (para warm-up de detectores).
+
+        Args:
+            metric: Métrica (ej: "temp_aire")
+            start_ts: Timestamp inicio (ISO8601, inclusive)
+            node_id: Filtrar por nodo (opcional)
+        """
+        query = """
+            SELECT node_id, ts, value FROM sensor_samples
+            WHERE metric = ? AND ts >= ?
+        """
+        params: Tuple = (metric, start_ts)
+        if node_id:
+            query += " AND node_id = ?"
+            params += (node_id,)
+        query += " ORDER BY ts"
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(4096)
+                    if not rows:
+                        break
+                    yield from rows
+        except sqlite3.Error as e:
+            logger.error(f"Error leyendo ventana de {metric}: {e}")
+
     def compute_daily_aggregate(self, date_str: str, metric: str, 
                                 node_id: str = "naira-node-001") -> Dict:
         """Calcula agregación diaria para una métrica.
@@ -8,12 +8,12 @@ presentes, el helper queda deshabilitado de forma silenciosa.
 from __future__ import annotations
 
 import logging
-from datetime import datetime, UTC
 from pathlib import Path
 from typing import Dict, Iterable, Optional
 
 try:
     from src.config import load_settings
+    from src.timeutils import now_ns, parse_iso_ns, sample_ts_ns
 except ModuleNotFoundError:  # Permite ejecutar "python collector.py"
     import sys
 
@@ -21,6 +21,7 @@ except ModuleNotFoundError:  # Permite ejecutar "python collector.py"
     if str(src_root) not in sys.path:
         sys.path.append(str(src_root))
     from config import load_settings
+    from timeutils import now_ns, parse_iso_ns, sample_ts_ns  # type: ignore
 
 try:  # Import perezoso para no romper cuando no esté instalada la librería
     from influxdb_client import InfluxDBClient, Point, WritePrecision
@@ -216,7 +217,7 @@ class InfluxSink:
         if Point is None:
             raise RuntimeError("Point no disponible; verificar instalación de influxdb-client")
 
-        ts = self._get_timestamp(sample.get("ts"))
+        ts = sample_ts_ns(sample) if "ts_ns" in sample else self._get_timestamp(sample.get("ts"))
         value = sample.get("value")
         try:
             numeric_value = float(value) if value is not None else 0.0
@@ -255,20 +256,28 @@ class InfluxSink:
         )
         if "meta" in sample:
             point.tag("meta", str(sample.get("meta")))
+        if "value_adc" in sample:
+            # Cuentas crudas del ADC antes de calibrar (``processing.calibration``)
+            self._assign_numeric_field(point, "value_adc", sample.get("value_adc"))
+        if "window_s" in sample:
+            # Agregado de ventana (``processing.aggregation``)
+            point.tag("window", f"{sample['window_s']}s")
+            for field in ("value_min", "value_max", "value_last"):
+                self._assign_numeric_field(point, field, sample.get(field))
+            point.field("value_count", int(sample.get("value_count", 0)))
         point.time(ts, WritePrecision.NS if WritePrecision else None)
         return point
 
-    def _get_timestamp(self, ts: Optional[str]) -> datetime:
+    def _get_timestamp(self, ts: Optional[str]) -> int:
+        """Epoch ns para ``Point.time`` (caché de la última cadena parseada)."""
         if not ts:
-            return datetime.now(UTC)
+            return now_ns()
 
-        try:
-            if ts.endswith("Z"):
-                return datetime.fromisoformat(ts.replace("Z", "+00:00"))
-            return datetime.fromisoformat(ts)
-        except ValueError:
+        parsed = parse_iso_ns(ts)
+        if parsed is None:
             logger.debug("Timestamp inválido para Influx (%s); se usa ahora UTC", ts)
-            return datetime.now(UTC)
+            return now_ns()
+        return parsed
 
     @staticmethod
     def _assign_numeric_field(point: "Point", field: str, value: Optional[float]) -> None:
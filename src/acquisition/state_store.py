@@ -149,6 +149,16 @@ class StateStore:
                         ON pending_payloads(next_retry_ts)
                     """
                 )
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS detector_state (
+                        name TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        blob BLOB NOT NULL,
+                        updated_ts TEXT NOT NULL
+                    )
+                    """
+                )
                 conn.commit()
         except sqlite3.Error as exc:  # pragma: no cover - inicialización crítica
             logger.error("No se pudo inicializar state store: %s", exc)
@@ -284,6 +294,68 @@ class StateStore:
             logger.error("No se pudo guardar config: %s", exc)
             raise
 
+    def find_config_version(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Última versión de configuración registrada con esa huella (None si no existe)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT id, applied_ts, node_id, version_tag, payload
+                    FROM config_versions
+                    WHERE sha256 = ?
+                    ORDER BY applied_ts DESC, id DESC
+                    LIMIT 1
+                    """,
+                    (sha256,),
+                )
+                row = cursor.fetchone()
+        except sqlite3.Error as exc:
+            logger.error("No se pudo leer config: %s", exc)
+            return None
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "applied_ts": row[1],
+            "node_id": row[2],
+            "version_tag": row[3],
+            "sha256": sha256,
+            "payload": self._deserialize_json(row[4]),
+        }
+
+    def save_detector_state(self, name: str, blob: bytes, *, kind: str = "detector_bank") -> None:
+        """Guarda (o reemplaza) el estado binario de un conjunto de detectores."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO detector_state (name, kind, blob, updated_ts)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        kind=excluded.kind,
+                        blob=excluded.blob,
+                        updated_ts=excluded.updated_ts
+                    """,
+                    (name, kind, sqlite3.Binary(blob), _iso_now()),
+                )
+                conn.commit()
+        except sqlite3.Error as exc:
+            logger.error("No se pudo guardar estado de detectores: %s", exc)
+            raise
+
+    def load_detector_state(self, name: str) -> Optional[bytes]:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT blob FROM detector_state WHERE name = ?", (name,))
+                row = cursor.fetchone()
+        except sqlite3.Error as exc:
+            logger.error("No se pudo leer estado de detectores: %s", exc)
+            return None
+        return bytes(row[0]) if row else None
+
     def enqueue_payload(
         self,
         payload: Dict[str, Any],
@@ -24,6 +24,33 @@ class Settings:
     simulated_inventory_path: str = os.getenv("NAIRA_SIM_INVENTORY_PATH", "")
     offline_queue_max_items: int = int(os.getenv("NAIRA_OFFLINE_QUEUE_MAX", "500"))
     collector_interval_s: int = int(os.getenv("NAIRA_COLLECTOR_INTERVAL", "10"))
+    # Detectores de anomalías (banco por nodo/métrica)
+    detector_memory_budget_mb: float = float(os.getenv("NAIRA_DETECTOR_MEMORY_MB", "64"))
+    detector_idle_timeout_s: int = int(os.getenv("NAIRA_DETECTOR_IDLE_S", "86400"))
+    detector_checkpoint_interval_s: int = int(os.getenv("NAIRA_DETECTOR_CHECKPOINT_S", "300"))
+    # Método para métricas sin detector propio ("" desactiva)
+    detector_fallback_method: str = os.getenv("NAIRA_DETECTOR_FALLBACK", "ewma")
+    # Desfase UTC (h) de la hora local para perfiles diarios estacionales
+    detector_utc_offset_h: float = float(os.getenv("NAIRA_DETECTOR_UTC_OFFSET_H", "0"))
+    # Curvas de calibración de los sensores analógicos: JSON propio de cada sitio
+    # ("" = sin calibrar, se publican las cuentas crudas)
+    calibration_path: str = os.getenv("NAIRA_CALIBRATION_PATH", "")
+    # Reordenación de flujos desordenados (reenvíos, varios puertos) antes de los detectores
+    reorder_allowed_lateness_s: float = float(os.getenv("NAIRA_REORDER_LATENESS_S", "60"))
+    reorder_max_pending: int = int(os.getenv("NAIRA_REORDER_MAX_PENDING", "1000"))
+    # Filtros de ruido por métrica antes de los detectores (ver ``processing.denoise``);
+    # "" = sin filtrar, p. ej. "humedad_suelo:median:window=5,luminosidad:kalman:q=1:r=16"
+    denoise_filters: str = os.getenv("NAIRA_DENOISE", "")
+    # Indicadores agronómicos (GDD por el método de la media; altitud para ET0)
+    indicator_gdd_base_c: float = float(os.getenv("NAIRA_GDD_BASE_C", "10"))
+    indicator_gdd_upper_c: float = float(os.getenv("NAIRA_GDD_UPPER_C", "30"))
+    site_altitude_m: float = float(os.getenv("NAIRA_SITE_ALTITUDE_M", "0"))
+    # Modelo ONNX opcional ("" desactiva) y su micro-batching
+    onnx_model_path: str = os.getenv("NAIRA_ONNX_MODEL", "")
+    onnx_features: str = os.getenv("NAIRA_ONNX_FEATURES", "soil_moisture_pct,air_temp_c,air_humidity_pct")
+    onnx_threads: int = int(os.getenv("NAIRA_ONNX_THREADS", "2"))
+    onnx_batch_size: int = int(os.getenv("NAIRA_ONNX_BATCH", "16"))
+    onnx_batch_latency_ms: int = int(os.getenv("NAIRA_ONNX_BATCH_MS", "200"))
     # Telegram alertas
     telegram_bot_token: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     telegram_chat_id: str = os.getenv("TELEGRAM_CHAT_ID", "")
@@ -46,6 +73,12 @@ class Settings:
         os.getenv("NAIRA_INFLUX_BUCKET", ""),
     )
     influx_retry_interval_s: int = int(os.getenv("NAIRA_INFLUX_RETRY_INTERVAL", "10"))
+    # Qué telemetría se publica: "raw", "aggregates" (ventanas) o "both"
+    telemetry_publish: str = os.getenv("NAIRA_TELEMETRY_PUBLISH", "raw")
+    aggregate_windows_s: str = os.getenv("NAIRA_AGGREGATE_WINDOWS", "60,900,3600")
+    # Banda muerta por métrica antes de publicar ("temp_aire:0.2,luminosidad:5%"; vacío = publicar todo)
+    deadband_rules: str = os.getenv("NAIRA_DEADBAND", "")
+    deadband_max_silence_s: int = int(os.getenv("NAIRA_DEADBAND_MAX_SILENCE", "900"))
     # LLM / Ollama
     ollama_host: str = os.getenv("NAIRA_OLLAMA_HOST", "127.0.0.1")
     ollama_port: int = int(os.getenv("NAIRA_OLLAMA_PORT", "11434"))
@@ -5,15 +5,21 @@ from __future__ import annotations
 from typing import Dict
 
 
-def apply_rules(sample: Dict[str, float]) -> Dict[str, bool]:
+def apply_rules(sample: Dict[str, float], *, irrigation_lead_h: float = 2.0) -> Dict[str, bool]:
     """Aplica reglas de control simples (ej. activar riego) y devuelve acciones.
 
+    Además de ``dry_alert`` se riega de forma preventiva si el pronóstico
+    (``soil_dry_in_h``) prevé suelo seco en menos de ``irrigation_lead_h`` horas.
     En instalación real, se enviaría comandos a relés/BLE/MODBUS/etc.
     """
     actions = {"start_irrigation": False}
+    dry_in_h = sample.get("soil_dry_in_h")
     if sample.get("dry_alert", False):
         actions["start_irrigation"] = True
         print("[control] Regla accionada: start_irrigation")
+    elif dry_in_h is not None and dry_in_h <= irrigation_lead_h:
+        actions["start_irrigation"] = True
+        print(f"[control] Regla accionada: start_irrigation (suelo seco en {dry_in_h} h)")
     else:
         print("[control] No se accionan actuadores")
     return actions
@@ -41,9 +41,20 @@ def main(argv: list[str] | None = None) -> int:
         from .llm.stub import get_client as get_llm_client
         from .llm.ollama_client import load_role
 
+        from .acquisition.state_store import get_state_store
+        from .models import stub as model_stub
+
+        # Ventanas de los detectores: arranque en caliente desde el state store
+        state_store = get_state_store()
+        if not model_stub.attach_state_store(state_store):
+            model_stub.warm_up_from_database()
+        processing_stub.attach_state_store(state_store)
+
         # Run a minimal orchestrated cycle
         data = acquisition_stub.read_sensor(sim=args.sim)
-        processed = processing_stub.process_sample(data)
+        processed = processing_stub.process_sample(data).to_dict()
+        model_stub.checkpoint_state()
+        processing_stub.checkpoint_state()
         comms_stub.publish_sample(processed)
         control_stub.apply_rules(processed)
         diag = diag_stub.health_check()
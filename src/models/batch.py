@@ -0,0 +1,191 @@
+"""Utilidades comunes para la evaluación por lotes de los detectores.
+
+Convierte series históricas a arrays NumPy (epoch en nanosegundos y
+``float64``) y calcula, para cada muestra, el inicio de la ventana que
+tendría el camino escalar tras ``_trim`` y el límite ``max_samples``.
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Sequence, Tuple
+
+from src.timeutils import EPOCH_MS_MIN, EPOCH_NS_MIN, EPOCH_US_MIN, to_epoch_ns
+
+try:  # NumPy es opcional: el camino escalar no lo necesita
+    import numpy as np
+except ImportError:  # pragma: no cover - dependencia opcional
+    np = None  # type: ignore[assignment]
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("evaluate_batch requiere numpy. Ejecuta 'pip install numpy'.")
+
+
+def as_epoch_ns(ts_array: Any) -> "np.ndarray":
+    """Convierte marcas de tiempo (datetime64, epoch numérico o ISO/datetime) a int64 ns."""
+    require_numpy()
+    arr = np.asarray(ts_array)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[ns]").view(np.int64)
+    if arr.dtype.kind in "iu":
+        ints = arr.astype(np.int64)
+        magnitude = np.abs(ints)
+        scale = np.select(
+            [magnitude >= EPOCH_NS_MIN, magnitude >= EPOCH_US_MIN, magnitude >= EPOCH_MS_MIN],
+            [1, 1_000, 1_000_000],
+            default=1_000_000_000,
+        )
+        return ints * scale
+    return np.fromiter((to_epoch_ns(item) for item in arr.tolist()), dtype=np.int64, count=arr.size)
+
+
+def as_float_values(values_array: Any, safe_float) -> "np.ndarray":
+    """Convierte valores a ``float64``; los no numéricos pasan a NaN."""
+    require_numpy()
+    try:
+        return np.asarray(values_array, dtype=np.float64)
+    except (TypeError, ValueError):
+        items = values_array.tolist() if hasattr(values_array, "tolist") else list(values_array)
+        converted = (safe_float(item) for item in items)
+        return np.fromiter((np.nan if value is None else value for value in converted), dtype=np.float64)
+
+
+def history_arrays(ts_values: Iterable[Any], values: Iterable[Any], safe_float) -> Tuple[array, array]:
+    """Histórico a ``array('q')``/``array('d')`` sin NumPy, descartando valores no numéricos."""
+    ts_block = array("q")
+    value_block = array("d")
+    for ts, value in zip(ts_values, values):
+        numeric = safe_float(value)
+        if numeric is None:
+            continue
+        ts_block.append(ts if type(ts) is int else to_epoch_ns(ts))
+        value_block.append(numeric)
+    return ts_block, value_block
+
+
+def window_starts(all_ts: "np.ndarray", positions: "np.ndarray", window_ns: int, max_samples: int) -> "np.ndarray":
+    """Índice del primer elemento de la ventana tras insertar cada posición."""
+    if all_ts.size > 1 and bool(np.any(all_ts[1:] < all_ts[:-1])):
+        raise ValueError("evaluate_batch requiere marcas de tiempo en orden cronológico")
+    by_time = np.searchsorted(all_ts, all_ts[positions] - window_ns, side="left")
+    by_size = positions - max(max_samples, 1) + 1
+    return np.maximum(np.maximum(by_time, by_size), 0)
+
+
+def constant_windows(all_values: "np.ndarray", starts: "np.ndarray", positions: "np.ndarray") -> "np.ndarray":
+    """True donde todos los valores de la ventana ``[start, pos]`` son idénticos."""
+    changes = np.flatnonzero(all_values[1:] != all_values[:-1]) + 1
+    idx = np.searchsorted(changes, positions, side="right") - 1
+    last_change = np.where(idx >= 0, changes[np.maximum(idx, 0)] if changes.size else 0, 0)
+    return last_change <= starts
+
+
+@dataclass(slots=True)
+class BatchEvaluation:
+    """Resultado columnar de ``evaluate_batch`` (una fila por muestra de entrada)."""
+
+    valid: "np.ndarray"
+    window_samples: "np.ndarray"
+    window_hours: "np.ndarray"
+    center: "np.ndarray"
+    spread: "np.ndarray"
+    score: "np.ndarray"
+    anomaly: "np.ndarray"
+    window_ready: "np.ndarray"
+
+    def __len__(self) -> int:
+        return int(self.score.size)
+
+
+def expand_to_rows(
+    valid: "np.ndarray",
+    prior_len: int,
+    prior_hours: float,
+    lengths: "np.ndarray",
+    hours: "np.ndarray",
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """Propaga tamaño/horas de ventana a las filas no válidas (sin cambio de estado)."""
+    rows = valid.size
+    row_len = np.empty(rows, dtype=np.int64)
+    row_hours = np.empty(rows, dtype=np.float64)
+    row_len[valid] = lengths
+    row_hours[valid] = hours
+    if not bool(valid.all()):
+        valid_idx = np.where(valid, np.arange(rows), -1)
+        last_valid = np.maximum.accumulate(valid_idx)
+        missing = ~valid
+        source = last_valid[missing]
+        has_source = source >= 0
+        fill_len = np.full(source.size, prior_len, dtype=np.int64)
+        fill_hours = np.full(source.size, prior_hours, dtype=np.float64)
+        fill_len[has_source] = row_len[source[has_source]]
+        fill_hours[has_source] = row_hours[source[has_source]]
+        row_len[missing] = fill_len
+        row_hours[missing] = fill_hours
+    return row_len, row_hours
+
+
+def scatter(valid: "np.ndarray", values: "np.ndarray", fill: Any, dtype: Any) -> "np.ndarray":
+    out = np.full(valid.size, fill, dtype=dtype)
+    out[valid] = values
+    return out
+
+
+def window_hours(all_ts: "np.ndarray", starts: "np.ndarray", positions: "np.ndarray") -> "np.ndarray":
+    lengths = positions - starts + 1
+    delta = (all_ts[positions] - all_ts[starts]).astype(np.float64) / 3.6e12
+    return np.where(lengths < 2, 0.0, np.maximum(delta, 0.0))
+
+
+def concat_window(prior_ts: Sequence[int], prior_values: Sequence[float], ts_ns: "np.ndarray", values: "np.ndarray"):
+    all_ts = np.concatenate([np.asarray(prior_ts, dtype=np.int64), ts_ns])
+    all_values = np.concatenate([np.asarray(prior_values, dtype=np.float64), values])
+    return all_ts, all_values
+
+
+def round_like_python(values: "np.ndarray", digits: int) -> "np.ndarray":
+    """``round(x, digits)`` elemento a elemento, idéntico al ``round`` de Python.
+
+    ``np.round`` escala por ``10**digits`` y puede romper empates distintos
+    (p. ej. 0.025 → 0.02 frente a 0.03); sólo esos casos se recalculan.
+    """
+    rounded = np.round(values, digits)
+    scaled = values * 10.0**digits
+    near_tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(item, digits) for item in values[near_tie].tolist()]
+    return rounded
+
+
+def result_columns(layout: Any, batch: BatchEvaluation) -> Dict[str, "np.ndarray"]:
+    """Columnas ``{metric}_<sufijo>`` de un lote (campos en el orden del ``ResultLayout``)."""
+    arrays = (
+        batch.window_samples,
+        batch.window_hours,
+        batch.center,
+        batch.spread,
+        batch.score,
+        batch.anomaly,
+        batch.window_ready,
+    )
+    return {
+        key: values if digits is None else round_like_python(values, digits)
+        for key, values, digits in zip(layout.keys, arrays, layout.digits)
+    }
+
+
+def rows_to_columns(results: Sequence[Mapping[str, Any]]) -> Dict[str, "np.ndarray"]:
+    """Columnas a partir de resultados por fila con las mismas claves (p. ej. ``DetectorResult``)."""
+    if not results:
+        return {}
+    columns = {}
+    for key in results[0]:
+        column = np.array([result[key] for result in results])
+        columns[key] = column.astype(object) if column.dtype.kind in "US" else column
+    return columns
+
+
+__all__ = ["BatchEvaluation", "require_numpy", "result_columns", "round_like_python", "rows_to_columns"]
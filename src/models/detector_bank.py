@@ -0,0 +1,514 @@
+"""Banco de detectores por ``(node_id, metric, method)``.
+
+Un gateway que atiende varios nodos no puede compartir una única ventana
+por métrica: cada flujo de sensor necesita su propio detector. El banco los
+crea bajo demanda a partir de una configuración por métrica y los retiene
+en orden LRU; los que llevan más de ``idle_timeout_s`` sin muestras, o los
+menos usados cuando se supera el presupuesto de memoria, se descartan (su
+ventana se reconstruirá con las muestras siguientes).
+
+``to_bytes``/``restore_bytes`` empaquetan todas las ventanas en un único
+bloque binario para guardarlo en ``StateStore`` y arrancar en caliente.
+"""
+
+from __future__ import annotations
+
+import logging
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from src.timeutils import TimestampLike
+
+from . import batch as _batch
+from .batch import np
+from .ewma_anomaly import EwmaAnomalyDetector
+from .holt_winters import HoltWintersForecaster
+from .mad_anomaly import RollingMadAnomalyDetector
+from .mahalanobis_anomaly import MahalanobisAnomalyDetector
+from .result import ResultChain
+from .seasonal_anomaly import SeasonalAnomalyDetector
+from .sketch_mad import SketchMadAnomalyDetector
+from .zscore_anomaly import RollingAnomalyDetector
+
+logger = logging.getLogger(__name__)
+
+DetectorKey = Tuple[str, str, str]
+
+# Coste fijo aproximado por entrada (objetos Python del detector y del banco).
+_ENTRY_OVERHEAD_BYTES = 1024
+
+_BANK_MAGIC = b"NDB1"
+_COUNT = struct.Struct("<I")
+_ENTRY_HEADER = struct.Struct("<HHHI")
+
+
+@dataclass(frozen=True, slots=True)
+class DetectorConfig:
+    """Parámetros de un detector para una métrica concreta."""
+
+    method: str = "zscore"
+    window: timedelta = timedelta(days=3)
+    min_samples: int = 48
+    threshold: float = 3.0
+    max_samples: int = 2048
+    half_life: Optional[timedelta] = None  # sólo "ewma"; por defecto ``window / 12``
+    slot_minutes: int = 60  # "seasonal" y "holt_winters": resolución del perfil diario
+    utc_offset: timedelta = timedelta(0)  # "seasonal" y "holt_winters": hora local del nodo
+    metrics: Tuple[str, ...] = ()  # sólo "mahalanobis": componentes del vector conjunto
+    horizon: timedelta = timedelta(hours=6)  # sólo "holt_winters": horizonte del pronóstico
+    floor: Optional[float] = None  # sólo "holt_winters": nivel cuyo cruce se anticipa
+
+
+def _build_zscore(metric: str, config: DetectorConfig) -> RollingAnomalyDetector:
+    return RollingAnomalyDetector(
+        metric=metric,
+        window=config.window,
+        min_samples=config.min_samples,
+        z_threshold=config.threshold,
+        max_samples=config.max_samples,
+    )
+
+
+def _build_mad(metric: str, config: DetectorConfig) -> RollingMadAnomalyDetector:
+    return RollingMadAnomalyDetector(
+        metric=metric,
+        window=config.window,
+        min_samples=config.min_samples,
+        mad_threshold=config.threshold,
+        max_samples=config.max_samples,
+    )
+
+
+def _build_mad_sketch(metric: str, config: DetectorConfig) -> SketchMadAnomalyDetector:
+    # Memoria fija: ``max_samples`` no aplica, la ventana puede ser de semanas.
+    return SketchMadAnomalyDetector(
+        metric=metric,
+        window=config.window,
+        min_samples=config.min_samples,
+        mad_threshold=config.threshold,
+    )
+
+
+def _build_ewma(metric: str, config: DetectorConfig) -> EwmaAnomalyDetector:
+    return EwmaAnomalyDetector(
+        metric=metric,
+        half_life=config.half_life or config.window / 12,
+        min_samples=config.min_samples,
+        z_threshold=config.threshold,
+    )
+
+
+def _build_seasonal(metric: str, config: DetectorConfig) -> SeasonalAnomalyDetector:
+    # ``window`` es la memoria del perfil (días); ``min_samples`` es por franja.
+    return SeasonalAnomalyDetector(
+        metric=metric,
+        days=max(config.window.days, 1),
+        slot_minutes=config.slot_minutes,
+        min_samples=config.min_samples,
+        threshold=config.threshold,
+        utc_offset=config.utc_offset,
+    )
+
+
+def _build_mahalanobis(group: str, config: DetectorConfig) -> MahalanobisAnomalyDetector:
+    # La clave de configuración es el nombre del grupo; ``metrics`` sus componentes.
+    return MahalanobisAnomalyDetector(
+        metric=group,
+        metrics=config.metrics,
+        window=config.window,
+        min_samples=config.min_samples,
+        threshold=config.threshold,
+        max_samples=config.max_samples,
+    )
+
+
+def _build_holt_winters(metric: str, config: DetectorConfig) -> HoltWintersForecaster:
+    # Pasos de ``slot_minutes``; ``min_samples`` cuenta pasos cerrados.
+    return HoltWintersForecaster(
+        metric=metric,
+        step=timedelta(minutes=config.slot_minutes),
+        horizon=config.horizon,
+        min_samples=config.min_samples,
+        threshold=config.threshold,
+        floor=config.floor,
+        utc_offset=config.utc_offset,
+    )
+
+
+DETECTOR_FACTORIES: Dict[str, Callable[[str, DetectorConfig], Any]] = {
+    "zscore": _build_zscore,
+    "mad": _build_mad,
+    "mad_sketch": _build_mad_sketch,
+    "ewma": _build_ewma,
+    "seasonal": _build_seasonal,
+    "mahalanobis": _build_mahalanobis,
+    "holt_winters": _build_holt_winters,
+}
+
+# Sufijos de ``{metric}_<sufijo>`` para ventana lista, puntuación y anomalía.
+RESULT_KEYS: Dict[str, Tuple[str, str, str]] = {
+    "zscore": ("window_ready", "zscore", "anomaly"),
+    "mad": ("mad_window_ready", "mad_score", "mad_anomaly"),
+    "mad_sketch": ("mad_window_ready", "mad_score", "mad_anomaly"),
+    "ewma": ("ewma_window_ready", "ewma_zscore", "ewma_anomaly"),
+    "seasonal": ("seasonal_window_ready", "seasonal_score", "seasonal_anomaly"),
+    "mahalanobis": ("mahal_window_ready", "mahal_distance", "mahal_anomaly"),
+    "holt_winters": ("hw_window_ready", "hw_residual", "hw_anomaly"),
+}
+
+# Métodos con un detector sobre varias métricas (``build_detector`` recibe el
+# grupo): no pueden evaluar una serie suelta.
+MULTIVARIATE_METHODS = frozenset({"mahalanobis"})
+# Métodos ejecutables sobre una sola serie (backtest, CLI y dashboard de Influx).
+UNIVARIATE_METHODS = tuple(sorted(set(RESULT_KEYS) - MULTIVARIATE_METHODS))
+
+
+def register_method(
+    method: str,
+    factory: Callable[[str, DetectorConfig], Any],
+    result_keys: Tuple[str, str, str],
+) -> None:
+    """Registra un nuevo tipo de detector seleccionable por ``DetectorConfig.method``."""
+    DETECTOR_FACTORIES[method] = factory
+    RESULT_KEYS[method] = result_keys
+
+
+def result_keys(metric: str, method: str) -> Dict[str, str]:
+    """Claves ``ready``/``score``/``anomaly`` del resultado de un método."""
+    try:
+        ready, score, anomaly = RESULT_KEYS[method]
+    except KeyError:
+        raise ValueError(f"Método de detección desconocido: {method!r}") from None
+    return {"ready": f"{metric}_{ready}", "score": f"{metric}_{score}", "anomaly": f"{metric}_{anomaly}"}
+
+
+def build_detector(metric: str, config: DetectorConfig) -> Any:
+    try:
+        factory = DETECTOR_FACTORIES[config.method]
+    except KeyError:
+        raise ValueError(f"Método de detección desconocido: {config.method!r}") from None
+    return factory(metric, config)
+
+
+class _Entry:
+    __slots__ = ("detector", "nbytes", "last_used")
+
+    def __init__(self, detector: Any, nbytes: int, last_used: float) -> None:
+        self.detector = detector
+        self.nbytes = nbytes
+        self.last_used = last_used
+
+
+class DetectorBank:
+    """Detectores creados bajo demanda con expulsión LRU / por inactividad."""
+
+    def __init__(
+        self,
+        configs: Mapping[str, Sequence[DetectorConfig]],
+        memory_budget_bytes: int = 64 * 1024 * 1024,
+        idle_timeout_s: Optional[float] = None,
+        default_node_id: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+        fallback: Sequence[DetectorConfig] = (),
+    ) -> None:
+        self.configs: Dict[str, Tuple[DetectorConfig, ...]] = {
+            metric: tuple(metric_configs) for metric, metric_configs in configs.items()
+        }
+        # Detectores para métricas sin configuración propia (formato largo).
+        self.fallback: Tuple[DetectorConfig, ...] = tuple(fallback)
+        # Grupos multivariantes en los que participa cada métrica.
+        self._groups: Dict[str, List[Tuple[str, DetectorConfig]]] = {}
+        for group, group_configs in self.configs.items():
+            for config in group_configs:
+                for member in config.metrics:
+                    self._groups.setdefault(member, []).append((group, config))
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_timeout_s = idle_timeout_s
+        self.default_node_id = default_node_id
+        self._clock = clock
+        self._entries: "OrderedDict[DetectorKey, _Entry]" = OrderedDict()
+        self._nbytes = 0
+        self._created = 0
+        self._evicted_idle = 0
+        self._evicted_memory = 0
+        self._last_checkpoint: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def keys(self) -> List[DetectorKey]:
+        return list(self._entries)
+
+    def get(self, node_id: str, metric: str, config: DetectorConfig) -> Any:
+        """Detector para el flujo indicado (se crea si no existe)."""
+        key = (node_id, metric, config.method)
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.last_used = now
+            self._entries.move_to_end(key)
+            return entry.detector
+
+        self._evict_idle(now)
+        detector = build_detector(metric, config)
+        nbytes = detector.nbytes() + _ENTRY_OVERHEAD_BYTES
+        self._entries[key] = _Entry(detector, nbytes, now)
+        self._nbytes += nbytes
+        self._created += 1
+        self._evict_over_budget()
+        return detector
+
+    def evaluate(self, node_id: str, metric: str, ts: TimestampLike, value: Any) -> Mapping[str, Any]:
+        """Evalúa una lectura con todos los detectores configurados para la métrica.
+
+        La lectura también alimenta los grupos multivariantes que incluyen la
+        métrica (que evalúan el vector cuando se completa su bucket temporal).
+        """
+        metric_configs = self.configs.get(metric, self.fallback)
+        groups = self._groups.get(metric)
+        if len(metric_configs) == 1 and not groups:
+            return self.get(node_id, metric, metric_configs[0]).evaluate(ts, value)
+        result = ResultChain(self.get(node_id, metric, config).evaluate(ts, value) for config in metric_configs)
+        for group, config in groups or ():
+            result.append(self.get(node_id, group, config).evaluate(ts, {metric: value}))
+        return result
+
+    def evaluate_sample(self, sample: Mapping[str, Any]) -> ResultChain:
+        """Evalúa una muestra.
+
+        Acepta el formato largo del contrato (``metric``/``value``) o una
+        muestra ancha con una columna por métrica; en el segundo caso se
+        evalúan todas las métricas configuradas (las ausentes devuelven el
+        estado vacío del detector, como hasta ahora). Las salidas de cada
+        detector se encadenan sin copiarlas en un dict común.
+        """
+        node_id = sample.get("node_id") or self.default_node_id
+        ts = sample.get("ts_ns") or sample.get("ts")
+        metric = sample.get("metric")
+        if isinstance(metric, str) and "value" in sample:
+            return ResultChain((self.evaluate(node_id, metric, ts, sample.get("value")),))
+        result = ResultChain()
+        for metric_name, metric_configs in self.configs.items():
+            value = sample.get(metric_name)
+            for config in metric_configs:
+                if config.metrics:
+                    vector = {member: sample.get(member) for member in config.metrics}
+                    result.append(self.get(node_id, metric_name, config).evaluate(ts, vector))
+                else:
+                    result.append(self.get(node_id, metric_name, config).evaluate(ts, value))
+        return result
+
+    def load_history(self, node_id: str, metric: str, ts_values: Sequence[Any], values: Sequence[Any]) -> int:
+        """Precarga un histórico en todos los detectores de la métrica (sin puntuar)."""
+        loaded = 0
+        for config in self.configs.get(metric, self.fallback):
+            loaded = self.get(node_id, metric, config).load_history(ts_values, values)
+        return loaded
+
+    def predict_many(self, samples: Iterable[Mapping[str, Any]]) -> List[ResultChain]:
+        """Evalúa un lote de muestras de cualquier nodo (una salida por muestra)."""
+        evaluate_sample = self.evaluate_sample
+        return [evaluate_sample(sample) for sample in samples]
+
+    def evaluate_columns(self, node_ids: Any, metrics: Any, ts_ns: Any, values: Any) -> Dict[str, Any]:
+        """Evalúa lecturas en formato largo columnar y devuelve columnas NumPy.
+
+        Equivale a ``evaluate`` fila a fila en orden: las filas se agrupan por
+        ``(node_id, metric)`` y los detectores con ``evaluate_batch`` procesan
+        su grupo de una vez; los demás (y los grupos multivariantes, que
+        necesitan el orden entre métricas) se evalúan fila a fila. Cada clave
+        ``{metric}_<sufijo>`` es una columna; en las filas de otras métricas
+        vale NaN, ``False``, 0 o ``None`` según su tipo.
+        """
+        _batch.require_numpy()
+        node_ids = np.asarray(node_ids, dtype=object)
+        metrics = np.asarray(metrics, dtype=object)
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        rows = ts_ns.size
+        columns: Dict[str, Any] = {}
+        if not rows:
+            return columns
+
+        streams: Dict[Tuple[str, str], List[int]] = {}
+        for pos, key in enumerate(zip(node_ids.tolist(), metrics.tolist())):
+            streams.setdefault(key, []).append(pos)
+        for (node_id, metric), positions in streams.items():
+            idx = np.asarray(positions, dtype=np.int64)
+            for config in self.configs.get(metric, self.fallback):
+                detector = self.get(node_id, metric, config)
+                if hasattr(detector, "evaluate_batch"):
+                    part = detector.batch_columns(detector.evaluate_batch(ts_ns[idx], values[idx]))
+                else:
+                    part = _batch.rows_to_columns(
+                        [detector.evaluate(ts, value) for ts, value in zip(ts_ns[idx].tolist(), values[idx].tolist())]
+                    )
+                _merge_columns(columns, part, idx, rows)
+
+        if self._groups:
+            group_rows: Dict[Tuple[str, str], Tuple[List[int], List[Any]]] = {}
+            for pos, (node_id, metric, ts, value) in enumerate(
+                zip(node_ids.tolist(), metrics.tolist(), ts_ns.tolist(), values.tolist())
+            ):
+                for group, config in self._groups.get(metric, ()):
+                    result = self.get(node_id, group, config).evaluate(ts, {metric: value})
+                    positions, results = group_rows.setdefault((node_id, group), ([], []))
+                    positions.append(pos)
+                    results.append(result)
+            for positions, results in group_rows.values():
+                _merge_columns(columns, _batch.rows_to_columns(results), np.asarray(positions, dtype=np.int64), rows)
+        return columns
+
+    def evict(self, key: DetectorKey) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._nbytes -= entry.nbytes
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "detectors": len(self._entries),
+            "nbytes": self._nbytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "created": self._created,
+            "evicted_idle": self._evicted_idle,
+            "evicted_memory": self._evicted_memory,
+        }
+
+    def to_bytes(self) -> bytes:
+        """Empaqueta las ventanas de todos los detectores (orden LRU) en un bloque."""
+        parts = [_BANK_MAGIC, _COUNT.pack(len(self._entries))]
+        for (node_id, metric, method), entry in self._entries.items():
+            names = [part.encode("utf-8") for part in (node_id, metric, method)]
+            blob = entry.detector.to_bytes()
+            parts.append(_ENTRY_HEADER.pack(*(len(name) for name in names), len(blob)))
+            parts.extend(names)
+            parts.append(blob)
+        return b"".join(parts)
+
+    def restore_bytes(self, data: bytes) -> int:
+        """Recrea los detectores guardados con ``to_bytes``; devuelve cuántos restauró.
+
+        Se ignoran las entradas cuya métrica o método ya no están configurados.
+        Un bloque truncado o corrupto lanza ``ValueError``.
+        """
+        if data[:4] != _BANK_MAGIC:
+            raise ValueError("Estado de detectores con formato desconocido")
+        try:
+            return self._restore_entries(memoryview(data))
+        except struct.error as exc:
+            raise ValueError(f"Estado de detectores truncado: {exc}") from exc
+
+    def _restore_entries(self, view: memoryview) -> int:
+        (count,) = _COUNT.unpack_from(view, 4)
+        offset = 4 + _COUNT.size
+        restored = 0
+        for _ in range(count):
+            node_len, metric_len, method_len, blob_len = _ENTRY_HEADER.unpack_from(view, offset)
+            offset += _ENTRY_HEADER.size
+            node_id = bytes(view[offset:offset + node_len]).decode("utf-8")
+            offset += node_len
+            metric = bytes(view[offset:offset + metric_len]).decode("utf-8")
+            offset += metric_len
+            method = bytes(view[offset:offset + method_len]).decode("utf-8")
+            offset += method_len
+            blob = bytes(view[offset:offset + blob_len])
+            offset += blob_len
+            if len(blob) != blob_len:
+                raise ValueError("Estado de detectores truncado")
+            candidates = self.configs.get(metric, self.fallback)
+            config = next((item for item in candidates if item.method == method), None)
+            if config is None:
+                logger.debug("Estado de %s descartado: sin configuración", (node_id, metric, method))
+                continue
+            self.get(node_id, metric, config).restore(blob)
+            restored += 1
+        return restored
+
+    def checkpoint(self, store: Any, name: str = "detectors") -> int:
+        """Guarda el estado completo en ``StateStore``; devuelve los bytes escritos."""
+        blob = self.to_bytes()
+        store.save_detector_state(name, blob)
+        self._last_checkpoint = self._clock()
+        return len(blob)
+
+    def maybe_checkpoint(self, store: Any, interval_s: float, name: str = "detectors") -> bool:
+        """``checkpoint`` si han pasado ``interval_s`` segundos desde el anterior."""
+        now = self._clock()
+        if self._last_checkpoint is None:
+            self._last_checkpoint = now
+            return False
+        if now - self._last_checkpoint < interval_s:
+            return False
+        self.checkpoint(store, name)
+        return True
+
+    def restore(self, store: Any, name: str = "detectors") -> int:
+        """Restaura desde ``StateStore`` con una sola lectura del bloque."""
+        blob = store.load_detector_state(name)
+        if not blob:
+            return 0
+        restored = self.restore_bytes(blob)
+        self._last_checkpoint = self._clock()
+        return restored
+
+    def _evict_idle(self, now: float) -> None:
+        if self.idle_timeout_s is None:
+            return
+        cutoff = now - self.idle_timeout_s
+        # El orden LRU coincide con el de último uso: basta mirar el principio.
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.last_used >= cutoff:
+                break
+            self.evict(key)
+            self._evicted_idle += 1
+            logger.debug("Detector %s expulsado por inactividad", key)
+
+    def _evict_over_budget(self) -> None:
+        # Se conserva siempre el detector más reciente aunque supere el presupuesto.
+        while self._nbytes > self.memory_budget_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._nbytes -= entry.nbytes
+            self._evicted_memory += 1
+            logger.debug("Detector %s expulsado por presupuesto de memoria", key)
+
+
+def _merge_columns(columns: Dict[str, Any], part: Mapping[str, Any], idx: Any, rows: int) -> None:
+    for key, column in part.items():
+        target = columns.get(key)
+        if target is None:
+            kind = column.dtype.kind
+            if kind == "f":
+                target = np.full(rows, np.nan)
+            elif kind == "O":
+                target = np.full(rows, None, dtype=object)
+            else:
+                target = np.zeros(rows, dtype=column.dtype)
+            columns[key] = target
+        target[idx] = column
+
+
+__all__ = [
+    "DETECTOR_FACTORIES",
+    "MULTIVARIATE_METHODS",
+    "RESULT_KEYS",
+    "UNIVARIATE_METHODS",
+    "DetectorBank",
+    "DetectorConfig",
+    "build_detector",
+    "register_method",
+    "result_keys",
+]
@@ -0,0 +1,157 @@
+"""Detector de anomalías por media y varianza con ponderación exponencial.
+
+Pensado para las métricas de baja prioridad: en lugar de una ventana guarda
+sólo media, varianza, peso acumulado y marcas de tiempo (unos pocos
+``float``), con coste O(1) por muestra. Los pesos decaen con el tiempo real
+transcurrido (``half_life``), así que un intervalo irregular entre lecturas
+se trata correctamente: tras una pausa larga la historia pesa menos.
+
+Cada lectura se puntúa contra la media/varianza *previas* a incorporarla
+(gráfico de control EWMA), para que un pico no se absorba a sí mismo.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+from datetime import timedelta
+from math import isnan, sqrt
+from typing import Any, Iterable
+
+from src.timeutils import TimestampLike, timedelta_ns, to_epoch_ns
+
+from . import batch as _batch
+from .result import DetectorResult, ResultLayout
+
+_STATE = struct.Struct("<Bdddqqq")
+_FORMAT_VERSION = 1
+_RESULT_FIELDS = (
+    ("ewma_window_samples", None),
+    ("ewma_window_hours", 2),
+    ("ewma_mean", 3),
+    ("ewma_std", 3),
+    ("ewma_zscore", 3),
+    ("ewma_anomaly", None),
+    ("ewma_window_ready", None),
+)
+
+
+def _safe_float(value: float | int | str | None) -> float | None:
+    try:
+        numeric = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return None if isnan(numeric) else numeric
+
+
+@dataclass(slots=True)
+class EwmaAnomalyDetector:
+    """Detector EWMA/EWMV con semivida temporal y memoria constante.
+
+    ``min_samples`` se compara con el tamaño efectivo de la muestra (suma de
+    pesos), que satura en torno a ``half_life / intervalo / ln 2``.
+    """
+
+    metric: str
+    half_life: timedelta = timedelta(hours=6)
+    min_samples: int = 48
+    z_threshold: float = 3.0
+    _half_life_ns: int = field(init=False)
+    _mean: float = field(default=0.0, init=False)
+    _var: float = field(default=0.0, init=False)
+    _weight: float = field(default=0.0, init=False)
+    _first_ts: int = field(default=0, init=False)
+    _last_ts: int = field(default=0, init=False)
+    _count: int = field(default=0, init=False)
+    _layout: ResultLayout = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._half_life_ns = max(timedelta_ns(self.half_life), 1)
+        self._layout = ResultLayout(self.metric, _RESULT_FIELDS)
+
+    def window_size(self) -> int:
+        return int(self._weight)
+
+    def evaluate(self, ts: TimestampLike, value: float | int | str | None) -> DetectorResult:
+        """Puntúa la lectura frente al estado previo y la incorpora."""
+        numeric_value = _safe_float(value)
+        if numeric_value is None:
+            return self._empty_result()
+
+        ts_ns = to_epoch_ns(ts)
+        avg = self._mean
+        std_dev = sqrt(self._var)
+        window_ready = self._weight >= self.min_samples
+        zscore = 0.0 if std_dev == 0.0 else (numeric_value - avg) / std_dev
+        anomaly = window_ready and abs(zscore) >= self.z_threshold
+        if not self._count:
+            avg = numeric_value
+        self._update(ts_ns, numeric_value)
+        return self._result(avg, std_dev, zscore, anomaly, window_ready)
+
+    def load_history(self, ts_values: Iterable[Any], values: Iterable[Any]) -> int:
+        """Precarga un histórico cronológico sin puntuar cada muestra."""
+        ts_block, value_block = _batch.history_arrays(ts_values, values, _safe_float)
+        loaded = 0
+        for ts_ns, value in zip(ts_block, value_block):
+            if self._count and ts_ns < self._last_ts:
+                continue
+            self._update(ts_ns, value)
+            loaded += 1
+        return loaded
+
+    def nbytes(self) -> int:
+        """Tamaño del estado serializado (bytes)."""
+        return _STATE.size
+
+    def to_bytes(self) -> bytes:
+        return _STATE.pack(
+            _FORMAT_VERSION, self._mean, self._var, self._weight, self._first_ts, self._last_ts, self._count
+        )
+
+    def restore(self, blob: bytes) -> None:
+        if len(blob) != _STATE.size:
+            raise ValueError("Estado EWMA truncado")
+        version, mean, var, weight, first_ts, last_ts, count = _STATE.unpack(blob)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Versión de estado EWMA no soportada: {version}")
+        self._mean, self._var, self._weight = mean, var, weight
+        self._first_ts, self._last_ts, self._count = first_ts, last_ts, count
+
+    def _update(self, ts_ns: int, value: float) -> None:
+        if not self._count:
+            self._first_ts = ts_ns
+        elif ts_ns > self._last_ts:
+            # Decaimiento por tiempo real: peso 2^(-dt / half_life).
+            self._weight *= 2.0 ** (-(ts_ns - self._last_ts) / self._half_life_ns)
+        self._weight += 1.0
+        share = 1.0 / self._weight
+        delta = value - self._mean
+        self._mean += share * delta
+        self._var = (1.0 - share) * (self._var + share * delta * delta)
+        self._last_ts = max(self._last_ts, ts_ns)
+        self._count += 1
+
+    def _window_hours(self) -> float:
+        if self._count < 2:
+            return 0.0
+        return max((self._last_ts - self._first_ts) / 3.6e12, 0.0)
+
+    def _result(
+        self,
+        avg: float,
+        std_dev: float,
+        zscore: float,
+        anomaly: bool,
+        window_ready: bool,
+    ) -> DetectorResult:
+        return self._layout.build(
+            self.window_size(), self._window_hours(), avg, std_dev, zscore, anomaly, window_ready
+        )
+
+    def _empty_result(self) -> DetectorResult:
+        window_ready = self._weight >= self.min_samples
+        return self._layout.build(self.window_size(), self._window_hours(), 0.0, 0.0, 0.0, False, window_ready)
+
+
+__all__ = ["EwmaAnomalyDetector"]
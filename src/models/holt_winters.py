@@ -0,0 +1,276 @@
+"""Pronóstico Holt-Winters incremental (nivel, tendencia y ciclo diario).
+
+Pensado para la humedad de suelo: ``risk_score`` sólo veía el valor
+instantáneo; aquí se mantiene un modelo aditivo cuyo estado se actualiza en
+O(1) y que sirve pronósticos a ``horizon`` sin reajustar nada.
+
+Las lecturas (irregulares) se promedian en pasos fijos de ``step``; al
+cerrar cada paso se aplica la recursión de Holt-Winters (``phi < 1``
+amortigua la tendencia en horizontes largos)::
+
+    nivel     l = α (y - s[k]) + (1 - α)(l + φ b)
+    tendencia b = β (l - l_prev) + (1 - β) φ b
+    estación  s[k] = γ (y - l) + (1 - γ) s[k]
+
+y el pronóstico a ``h`` pasos es ``l + (φ + … + φ^h) b + s[k + h]``. Los
+pasos sin lecturas avanzan el modelo con su propio pronóstico.
+
+Además del pronóstico se informa del residuo de cada lectura frente al paso
+en curso (anomalía si supera ``threshold`` veces su desviación media) y, si
+se define ``floor``, de las horas hasta cruzar ese nivel (p. ej. el umbral
+de riego).
+"""
+
+from __future__ import annotations
+
+import struct
+from array import array
+from dataclasses import dataclass, field
+from datetime import timedelta
+from math import isnan
+from typing import Any, Iterable, List, Optional
+
+from src.timeutils import TimestampLike, timedelta_ns, to_epoch_ns
+
+from . import batch as _batch
+from .result import DetectorResult, ResultLayout
+
+_HEADER = struct.Struct("<BIqqqddddId")
+_FORMAT_VERSION = 1
+_MEAN_ABS_TO_STD = 1.2533
+# Pasos vacíos que se rellenan con el pronóstico; a partir de ahí se reinicia el paso.
+_MAX_GAP_STEPS = 10_000
+_RESULT_FIELDS = (
+    ("hw_window_steps", None),
+    ("hw_level", 3),
+    ("hw_trend_per_h", 4),
+    ("hw_forecast", 3),
+    ("hw_dry_in_h", 2),
+    ("hw_residual", 3),
+    ("hw_anomaly", None),
+    ("hw_window_ready", None),
+)
+
+
+def _safe_float(value: float | int | str | None) -> float | None:
+    try:
+        numeric = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return None if isnan(numeric) else numeric
+
+
+@dataclass(slots=True)
+class HoltWintersForecaster:
+    """Holt-Winters aditivo con estado persistente y pronóstico bajo demanda.
+
+    ``min_samples`` son pasos cerrados antes de dar el modelo por listo (por
+    defecto, un ciclo completo de ``season``).
+    """
+
+    metric: str
+    step: timedelta = timedelta(minutes=15)
+    season: timedelta = timedelta(days=1)
+    horizon: timedelta = timedelta(hours=6)
+    alpha: float = 0.2
+    beta: float = 0.02
+    gamma: float = 0.1
+    phi: float = 1.0
+    min_samples: Optional[int] = None
+    threshold: float = 4.0
+    floor: Optional[float] = None
+    utc_offset: timedelta = timedelta(0)
+    _step_ns: int = field(init=False)
+    _offset_ns: int = field(init=False)
+    _season_steps: int = field(init=False)
+    _horizon_steps: int = field(init=False)
+    _seasonal: array = field(init=False)
+    _level: float = field(default=0.0, init=False)
+    _trend: float = field(default=0.0, init=False)
+    _step_id: int = field(default=0, init=False)
+    _closed_id: int = field(default=0, init=False)
+    _step_sum: float = field(default=0.0, init=False)
+    _step_count: int = field(default=0, init=False)
+    _steps: int = field(default=0, init=False)
+    _resid_mad: float = field(default=0.0, init=False)
+    _dry_in_h: float = field(default=-1.0, init=False)
+    _layout: ResultLayout = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._step_ns = max(timedelta_ns(self.step), 1)
+        self._offset_ns = timedelta_ns(self.utc_offset)
+        self._season_steps = max(timedelta_ns(self.season) // self._step_ns, 1)
+        self._horizon_steps = max(timedelta_ns(self.horizon) // self._step_ns, 1)
+        if self.min_samples is None:
+            self.min_samples = self._season_steps
+        self._seasonal = array("d", bytes(8 * self._season_steps))
+        self._layout = ResultLayout(self.metric, _RESULT_FIELDS)
+
+    def window_size(self) -> int:
+        return self._steps
+
+    @property
+    def ready(self) -> bool:
+        return self._steps >= self.min_samples
+
+    def evaluate(self, ts: TimestampLike, value: float | int | str | None) -> DetectorResult:
+        """Incorpora la lectura y devuelve nivel, pronóstico y residuo."""
+        numeric_value = _safe_float(value)
+        if numeric_value is None:
+            return self._result(0.0, False)
+        step_id = (to_epoch_ns(ts) + self._offset_ns) // self._step_ns
+        self._add(step_id, numeric_value)
+        ready = self.ready
+        residual = numeric_value - self._forecast_steps(self._step_id - self._closed_id)
+        scale = _MEAN_ABS_TO_STD * self._resid_mad
+        anomaly = ready and scale > 0.0 and abs(residual) >= self.threshold * scale
+        if ready:
+            self._resid_mad += 0.05 * (abs(residual) - self._resid_mad)
+        return self._result(residual, anomaly)
+
+    def forecast(self, hours_ahead: float) -> float:
+        """Valor previsto ``hours_ahead`` horas después del último paso cerrado."""
+        steps = max(int(round(hours_ahead * 3.6e12 / self._step_ns)), 1)
+        return self._forecast_steps(steps)
+
+    def forecast_path(self, hours_ahead: float) -> List[float]:
+        """Pronóstico paso a paso hasta ``hours_ahead`` horas."""
+        steps = max(int(round(hours_ahead * 3.6e12 / self._step_ns)), 1)
+        return [self._forecast_steps(idx) for idx in range(1, steps + 1)]
+
+    def hours_until(self, floor: float, max_hours: Optional[float] = None) -> Optional[float]:
+        """Horas hasta que el pronóstico baje de ``floor`` (``None`` si no ocurre en el horizonte)."""
+        limit = self._horizon_steps if max_hours is None else max(int(max_hours * 3.6e12 / self._step_ns), 1)
+        hours_per_step = self._step_ns / 3.6e12
+        for idx in range(1, limit + 1):
+            if self._forecast_steps(idx) < floor:
+                return idx * hours_per_step
+        return None
+
+    def load_history(self, ts_values: Iterable[Any], values: Iterable[Any]) -> int:
+        """Ajusta el estado con un histórico cronológico (sin puntuar)."""
+        ts_block, value_block = _batch.history_arrays(ts_values, values, _safe_float)
+        loaded = 0
+        for ts_ns, value in zip(ts_block, value_block):
+            step_id = (ts_ns + self._offset_ns) // self._step_ns
+            if self._step_count and step_id < self._step_id:
+                continue
+            self._add(step_id, value)
+            loaded += 1
+        return loaded
+
+    def nbytes(self) -> int:
+        return _HEADER.size + 8 * self._season_steps
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(
+            _FORMAT_VERSION,
+            self._season_steps,
+            self._step_id,
+            self._closed_id,
+            self._steps,
+            self._level,
+            self._trend,
+            self._step_sum,
+            self._resid_mad,
+            self._step_count,
+            self._dry_in_h,
+        )
+        return header + self._seasonal.tobytes()
+
+    def restore(self, blob: bytes) -> None:
+        if len(blob) < _HEADER.size:
+            raise ValueError("Estado Holt-Winters truncado")
+        (
+            version,
+            season_steps,
+            step_id,
+            closed_id,
+            steps,
+            level,
+            trend,
+            step_sum,
+            resid_mad,
+            step_count,
+            dry_in_h,
+        ) = _HEADER.unpack_from(blob)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Versión de estado Holt-Winters no soportada: {version}")
+        if season_steps != self._season_steps:
+            raise ValueError("El estado guardado usa otra estacionalidad o paso")
+        if len(blob) != _HEADER.size + 8 * season_steps:
+            raise ValueError("Estado Holt-Winters truncado")
+        seasonal = array("d")
+        seasonal.frombytes(blob[_HEADER.size:_HEADER.size + 8 * season_steps])
+        self._seasonal = seasonal
+        self._step_id, self._closed_id, self._steps = step_id, closed_id, steps
+        self._level, self._trend = level, trend
+        self._step_sum, self._step_count = step_sum, step_count
+        self._resid_mad, self._dry_in_h = resid_mad, dry_in_h
+
+    def _add(self, step_id: int, value: float) -> None:
+        if self._step_count and step_id > self._step_id:
+            self._close_step(step_id)
+        if not self._step_count:
+            self._step_id = max(step_id, self._step_id)
+        self._step_sum += value
+        self._step_count += 1
+
+    def _close_step(self, next_step_id: int) -> None:
+        observed = self._step_sum / self._step_count
+        self._update(self._step_id, observed)
+        gap = next_step_id - self._step_id - 1
+        if gap > _MAX_GAP_STEPS:
+            gap = 0  # pausa muy larga: se retoma sin rellenar
+        for missing in range(self._step_id + 1, self._step_id + 1 + gap):
+            self._update(missing, self._forecast_steps(1), fill=True)
+        self._step_sum = 0.0
+        self._step_count = 0
+        self._refresh_dry_in()
+
+    def _update(self, step_id: int, observed: float, *, fill: bool = False) -> None:
+        slot = step_id % self._season_steps
+        seasonal = self._seasonal[slot]
+        if not self._steps:
+            self._level = observed - seasonal
+        else:
+            prev_level = self._level
+            damped = self.phi * self._trend
+            self._level = self.alpha * (observed - seasonal) + (1.0 - self.alpha) * (prev_level + damped)
+            self._trend = self.beta * (self._level - prev_level) + (1.0 - self.beta) * damped
+            # Primer ciclo sólo nivel y tendencia: la estación no absorbe la deriva.
+            if not fill and self._steps >= self._season_steps:
+                self._seasonal[slot] = self.gamma * (observed - self._level) + (1.0 - self.gamma) * seasonal
+        self._closed_id = step_id
+        self._steps += 1
+
+    def _forecast_steps(self, steps: int) -> float:
+        if not self._steps:
+            return self._step_sum / self._step_count if self._step_count else 0.0
+        phi = self.phi
+        damped_sum = steps if phi == 1.0 else phi * (1.0 - phi**steps) / (1.0 - phi)
+        slot = (self._closed_id + steps) % self._season_steps
+        return self._level + damped_sum * self._trend + self._seasonal[slot]
+
+    def _refresh_dry_in(self) -> None:
+        if self.floor is None or not self.ready:
+            self._dry_in_h = -1.0
+            return
+        hours = self.hours_until(self.floor)
+        self._dry_in_h = -1.0 if hours is None else hours
+
+    def _result(self, residual: float, anomaly: bool) -> DetectorResult:
+        trend_per_h = self._trend * 3.6e12 / self._step_ns
+        return self._layout.build(
+            self._steps,
+            self._level,
+            trend_per_h,
+            self._forecast_steps(self._horizon_steps),
+            self._dry_in_h,
+            residual,
+            anomaly,
+            self.ready,
+        )
+
+
+__all__ = ["HoltWintersForecaster"]
@@ -2,25 +2,28 @@
 
 from __future__ import annotations
 
-from collections import deque
 from dataclasses import dataclass, field
-from datetime import UTC, datetime, timedelta
+from datetime import timedelta
 from math import isnan
-from statistics import median
-from typing import Deque, Dict, Iterable, Tuple
+from typing import Any, Dict, Iterable
 
+from src.timeutils import TimestampLike, timedelta_ns, to_epoch_ns
 
-def _ensure_dt(ts: str | datetime | None) -> datetime:
-    if isinstance(ts, datetime):
-        return ts.astimezone(UTC)
-    if isinstance(ts, str):
-        value = ts.replace("Z", "+00:00")
-        try:
-            parsed = datetime.fromisoformat(value)
-            return parsed.astimezone(UTC)
-        except ValueError:
-            pass
-    return datetime.now(UTC)
+from . import batch as _batch
+from .batch import BatchEvaluation, np
+from .result import DetectorResult, ResultLayout
+from .order_stats import SortedWindow
+from .ring_buffer import TimeSeriesRing
+
+_RESULT_FIELDS = (
+    ("mad_window_samples", None),
+    ("mad_window_hours", 2),
+    ("mad_median", 3),
+    ("mad_deviation", 3),
+    ("mad_score", 3),
+    ("mad_anomaly", None),
+    ("mad_window_ready", None),
+)
 
 
 def _safe_float(value: float | int | str | None) -> float | None:
@@ -33,7 +36,11 @@ def _safe_float(value: float | int | str | None) -> float | None:
 
 @dataclass(slots=True)
 class RollingMadAnomalyDetector:
-    """Sliding window anomaly detector using median absolute deviation."""
+    """Sliding window anomaly detector using median absolute deviation.
+
+    Median and MAD come from an order-statistics window updated on every
+    append/eviction, so each reading costs O(log n) instead of two sorts.
+    """
 
     metric: str
     window: timedelta = timedelta(days=3)
@@ -41,20 +48,32 @@ class RollingMadAnomalyDetector:
     mad_threshold: float = 3.5
     max_samples: int = 2048
     scale_factor: float = 1.4826  # approx to convert MAD into stddev for normal dist
-    _samples: Deque[Tuple[datetime, float]] = field(default_factory=deque, init=False)
+    _samples: TimeSeriesRing = field(init=False)
+    _window_ns: int = field(init=False)
+    _sorted: SortedWindow = field(default_factory=SortedWindow, init=False)
+    _layout: ResultLayout = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._samples = TimeSeriesRing(max(self.max_samples, 1))
+        self._window_ns = timedelta_ns(self.window)
+        self._layout = ResultLayout(self.metric, _RESULT_FIELDS)
 
-    def evaluate(self, ts: str | datetime | None, value: float | int | str | None) -> Dict[str, float | int | bool]:
+    def window_size(self) -> int:
+        return len(self._samples)
+
+    def evaluate(self, ts: TimestampLike, value: float | int | str | None) -> DetectorResult:
         numeric_value = _safe_float(value)
         if numeric_value is None:
             return self._empty_result()
 
-        ts_dt = _ensure_dt(ts)
-        self._trim(ts_dt)
-        self._samples.append((ts_dt, numeric_value))
-        if len(self._samples) > self.max_samples:
-            self._samples.popleft()
+        ts_ns = to_epoch_ns(ts)
+        self._trim(ts_ns)
+        if len(self._samples) >= self._samples.capacity:
+            self._evict()
+        self._samples.append(ts_ns, numeric_value)
+        self._sorted.add(numeric_value)
 
-        med, mad = self._stats()
+        med, mad = self._sorted.median_and_mad()
         scaled = self.scale_factor * mad
         if scaled == 0.0:
             diff = numeric_value - med
@@ -63,48 +82,142 @@ class RollingMadAnomalyDetector:
             mad_score = (numeric_value - med) / scaled
         window_ready = len(self._samples) >= self.min_samples
         anomaly = window_ready and abs(mad_score) >= self.mad_threshold
-
-        return {
-            f"{self.metric}_mad_window_samples": len(self._samples),
-            f"{self.metric}_mad_window_hours": round(self._window_hours(), 2),
-            f"{self.metric}_mad_median": round(med, 3),
-            f"{self.metric}_mad_deviation": round(mad, 3),
-            f"{self.metric}_mad_score": round(mad_score, 3),
-            f"{self.metric}_mad_anomaly": anomaly,
-            f"{self.metric}_mad_window_ready": window_ready,
-        }
-
-    def _trim(self, current_ts: datetime) -> None:
-        cutoff = current_ts - self.window
-        while self._samples and self._samples[0][0] < cutoff:
-            self._samples.popleft()
-
-    def _stats(self) -> Tuple[float, float]:
-        values: Iterable[float] = (sample[1] for sample in self._samples)
-        values_list = list(values)
-        if not values_list:
-            return 0.0, 0.0
-        med = median(values_list)
-        deviations = [abs(sample - med) for sample in values_list]
-        mad = median(deviations)
-        return med, mad
+        return self._result(len(self._samples), self._window_hours(), med, mad, mad_score, anomaly, window_ready)
+
+    def load_history(self, ts_values: Iterable[Any], values: Iterable[Any]) -> int:
+        """Bulk-load a chronological history without scoring each sample.
+
+        Returns the number of valid samples considered.
+        """
+        ts_block, value_block = _batch.history_arrays(ts_values, values, _safe_float)
+        loaded = self._samples.extend_history(ts_block, value_block, self._window_ns)
+        self._sorted = SortedWindow(self._samples.values())
+        return loaded
+
+    def evaluate_batch(self, ts_array: Any, values_array: Any) -> BatchEvaluation:
+        """Evaluate a chronological history with NumPy.
+
+        Produces the same scores as calling ``evaluate`` per sample and leaves
+        the window in the same state. Window bounds, scores and flags are
+        vectorized; median/MAD come from ``SortedWindow.sweep``, one tight
+        pass over the order-statistics window whose MAD search starts from
+        the previous row's split (a sliding median has no prefix-sum shortcut,
+        and per-window ``np.partition`` is O(window) per row).
+        """
+        _batch.require_numpy()
+        values = _batch.as_float_values(values_array, _safe_float)
+        ts_ns = _batch.as_epoch_ns(ts_array)
+        if ts_ns.size != values.size:
+            raise ValueError("ts_array and values_array must have the same length")
+
+        valid = ~np.isnan(values)
+        prior_len = len(self._samples)
+        prior_hours = self._window_hours()
+        all_ts, all_values = _batch.concat_window(
+            *self._samples.to_arrays(),
+            ts_ns[valid],
+            values[valid],
+        )
+        positions = prior_len + np.arange(int(valid.sum()))
+        starts = _batch.window_starts(all_ts, positions, timedelta_ns(self.window), self.max_samples)
+        lengths = positions - starts + 1
+        medians, mads = self._sorted.sweep(all_values.tolist(), starts.tolist(), positions.tolist())
+        med = np.asarray(medians, dtype=np.float64)
+        mad = np.asarray(mads, dtype=np.float64)
+
+        current = all_values[positions]
+        scaled = self.scale_factor * mad
+        diff = current - med
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mad_score = np.where(
+                scaled == 0.0,
+                np.where(diff == 0.0, 0.0, self.mad_threshold + np.abs(diff)),
+                diff / scaled,
+            )
+        ready = lengths >= self.min_samples
+        anomaly = ready & (np.abs(mad_score) >= self.mad_threshold)
+
+        row_len, row_hours = _batch.expand_to_rows(
+            valid, prior_len, prior_hours, lengths, _batch.window_hours(all_ts, starts, positions)
+        )
+        if positions.size:
+            self._restore_window(all_ts[starts[-1]:], all_values[starts[-1]:])
+        return BatchEvaluation(
+            valid=valid,
+            window_samples=row_len,
+            window_hours=row_hours,
+            center=_batch.scatter(valid, med, 0.0, np.float64),
+            spread=_batch.scatter(valid, mad, 0.0, np.float64),
+            score=_batch.scatter(valid, mad_score, 0.0, np.float64),
+            anomaly=_batch.scatter(valid, anomaly, False, bool),
+            window_ready=row_len >= self.min_samples,
+        )
+
+    def result_at(self, batch: BatchEvaluation, idx: int) -> DetectorResult:
+        """Result ``evaluate`` would have returned for row ``idx`` of a batch."""
+        samples = int(batch.window_samples[idx])
+        if not batch.valid[idx]:
+            return self._empty_state(samples, float(batch.window_hours[idx]))
+        return self._result(
+            samples,
+            float(batch.window_hours[idx]),
+            float(batch.center[idx]),
+            float(batch.spread[idx]),
+            float(batch.score[idx]),
+            bool(batch.anomaly[idx]),
+            bool(batch.window_ready[idx]),
+        )
+
+    def batch_columns(self, batch: BatchEvaluation) -> Dict[str, Any]:
+        """Columns of an ``evaluate_batch`` result, keyed and rounded like ``evaluate``."""
+        return _batch.result_columns(self._layout, batch)
+
+    def _restore_window(self, ts_ns: Any, values: Any) -> None:
+        self._samples.load(ts_ns, values)
+
+    def _result(
+        self,
+        samples: int,
+        hours: float,
+        med: float,
+        mad: float,
+        mad_score: float,
+        anomaly: bool,
+        window_ready: bool,
+    ) -> DetectorResult:
+        return self._layout.build(samples, hours, med, mad, mad_score, anomaly, window_ready)
+
+    def nbytes(self) -> int:
+        """Worst-case size of the window buffers (ring + sorted copy, bytes)."""
+        return self._samples.nbytes() + 8 * self._samples.capacity
+
+    def to_bytes(self) -> bytes:
+        """Serialized window for ``StateStore`` (16 bytes per sample)."""
+        return self._samples.to_bytes()
+
+    def restore(self, blob: bytes) -> None:
+        """Reload a window saved with ``to_bytes`` and rebuild the sorted copy."""
+        self._samples.load_bytes(blob)
+        self._sorted = SortedWindow(self._samples.values())
+
+    def _trim(self, current_ts_ns: int) -> None:
+        cutoff = current_ts_ns - self._window_ns
+        while self._samples and self._samples.first_ts < cutoff:
+            self._evict()
+
+    def _evict(self) -> None:
+        _, value = self._samples.popleft()
+        self._sorted.remove(value)
 
     def _window_hours(self) -> float:
         if len(self._samples) < 2:
             return 0.0
-        delta = self._samples[-1][0] - self._samples[0][0]
-        return max(delta.total_seconds() / 3600.0, 0.0)
-
-    def _empty_result(self) -> Dict[str, float | int | bool]:
-        return {
-            f"{self.metric}_mad_window_samples": len(self._samples),
-            f"{self.metric}_mad_window_hours": self._window_hours(),
-            f"{self.metric}_mad_median": 0.0,
-            f"{self.metric}_mad_deviation": 0.0,
-            f"{self.metric}_mad_score": 0.0,
-            f"{self.metric}_mad_anomaly": False,
-            f"{self.metric}_mad_window_ready": len(self._samples) >= self.min_samples,
-        }
-
-
-__all__ = ["RollingMadAnomalyDetector"]
+        delta_ns = self._samples.last_ts - self._samples.first_ts
+        return max(delta_ns / 3.6e12, 0.0)
+
+    def _empty_result(self) -> DetectorResult:
+        return self._empty_state(len(self._samples), self._window_hours())
+
+    def _empty_state(self, samples: int, hours: float) -> DetectorResult:
+        return self._layout.build(samples, hours, 0.0, 0.0, 0.0, False, samples >= self.min_samples)
+
@@ -0,0 +1,273 @@
+"""Detector multivariante (distancia de Mahalanobis) para sensores co-ubicados.
+
+Los detectores por métrica no ven fallos correlacionados: un sensor que se
+queda fijo mientras los demás siguen el ciclo diario nunca sale de su propia
+banda. Aquí se evalúa el vector conjunto ``x`` (p. ej. humedad de suelo,
+temperatura y humedad del aire) frente a la media ``μ`` y la covarianza
+``Σ`` de la ventana:
+
+    d(x) = sqrt((x - μ)ᵀ Σ⁻¹ (x - μ))
+
+Media, matriz de dispersión y su inversa se actualizan con correcciones de
+rango uno al añadir/expulsar cada vector (Welford + Sherman–Morrison), con
+coste O(d²) por muestra; cada ``max_samples`` actualizaciones se recalculan
+de la ventana para acotar la deriva numérica. NumPy hace el álgebra lineal.
+
+Las lecturas del formato largo llegan métrica a métrica: se agrupan por
+``bucket`` temporal y el vector se evalúa cuando está completo. Cada vector
+se puntúa contra la ventana *previa* a incorporarlo.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+from datetime import timedelta
+from math import isnan, sqrt
+from typing import Any, Iterable, Mapping, Tuple
+
+from src.timeutils import TimestampLike, timedelta_ns, to_epoch_ns
+
+from .batch import np, require_numpy
+from .result import DetectorResult, ResultLayout
+
+_HEADER = struct.Struct("<BII")
+_FORMAT_VERSION = 1
+_RESULT_FIELDS = (
+    ("mahal_window_samples", None),
+    ("mahal_window_hours", 2),
+    ("mahal_distance", 3),
+    ("mahal_driver", None),
+    ("mahal_anomaly", None),
+    ("mahal_window_ready", None),
+)
+
+
+def _safe_float(value: float | int | str | None) -> float | None:
+    try:
+        numeric = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return None if isnan(numeric) else numeric
+
+
+@dataclass(slots=True)
+class MahalanobisAnomalyDetector:
+    """Distancia de Mahalanobis de cada vector conjunto frente a la ventana.
+
+    ``metric`` es el nombre del grupo (prefijo de las claves) y ``metrics``
+    las componentes del vector. ``ridge`` regulariza la matriz de dispersión
+    para que sea invertible desde el primer vector. El resultado incluye la
+    métrica que más contribuye a la distancia (``mahal_driver``).
+    """
+
+    metric: str
+    metrics: Tuple[str, ...] = ()
+    window: timedelta = timedelta(days=3)
+    min_samples: int = 48
+    threshold: float = 4.0
+    max_samples: int = 2048
+    bucket: timedelta = timedelta(minutes=1)
+    ridge: float = 1e-6
+    _dims: int = field(init=False)
+    _index: dict = field(init=False)
+    _window_ns: int = field(init=False)
+    _bucket_ns: int = field(init=False)
+    _ts: Any = field(init=False)
+    _values: Any = field(init=False)
+    _head: int = field(default=0, init=False)
+    _size: int = field(default=0, init=False)
+    _mean: Any = field(init=False)
+    _scatter: Any = field(init=False)
+    _inverse: Any = field(init=False)
+    _updates: int = field(default=0, init=False)
+    _pending: Any = field(init=False)
+    _pending_bucket: int = field(default=-1, init=False)
+    _layout: ResultLayout = field(init=False)
+
+    def __post_init__(self) -> None:
+        require_numpy()
+        if not self.metrics:
+            raise ValueError("MahalanobisAnomalyDetector necesita al menos una métrica")
+        self.metrics = tuple(self.metrics)
+        self._dims = len(self.metrics)
+        self._index = {name: pos for pos, name in enumerate(self.metrics)}
+        self._window_ns = timedelta_ns(self.window)
+        self._bucket_ns = max(timedelta_ns(self.bucket), 1)
+        capacity = max(self.max_samples, 1)
+        self._ts = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros((capacity, self._dims), dtype=np.float64)
+        self._pending = np.full(self._dims, np.nan)
+        self._layout = ResultLayout(self.metric, _RESULT_FIELDS)
+        self._reanchor()
+
+    def window_size(self) -> int:
+        return self._size
+
+    def evaluate(self, ts: TimestampLike, values: Mapping[str, Any]) -> DetectorResult:
+        """Incorpora las componentes recibidas y puntúa el vector si está completo.
+
+        ``values`` puede traer todas las métricas (muestra ancha) o sólo
+        algunas; las que faltan se completan con las recibidas en el mismo
+        ``bucket`` temporal.
+        """
+        ts_ns = to_epoch_ns(ts)
+        bucket = ts_ns // self._bucket_ns
+        if bucket != self._pending_bucket:
+            self._pending.fill(np.nan)
+            self._pending_bucket = bucket
+        for name, raw in values.items():
+            pos = self._index.get(name)
+            numeric = _safe_float(raw) if pos is not None else None
+            if numeric is not None:
+                self._pending[pos] = numeric
+        if np.isnan(self._pending).any():
+            return self._empty_result()
+
+        vector = self._pending.copy()
+        self._pending.fill(np.nan)
+        window_ready = self._size >= self.min_samples
+        distance, driver = self._distance(vector) if self._size >= 2 else (0.0, "")
+        anomaly = window_ready and distance >= self.threshold
+        self._trim(ts_ns)
+        self._append(ts_ns, vector)
+        return self._layout.build(self._size, self._window_hours(), distance, driver, anomaly, window_ready)
+
+    def load_history(self, ts_values: Iterable[Any], values: Iterable[Any]) -> int:
+        """Precarga vectores cronológicos (mappings o secuencias en el orden de ``metrics``)."""
+        loaded = 0
+        for ts, row in zip(ts_values, values):
+            vector = self._as_vector(row)
+            if vector is None:
+                continue
+            ts_ns = to_epoch_ns(ts)
+            self._trim(ts_ns)
+            self._append(ts_ns, vector)
+            loaded += 1
+        self._reanchor()
+        return loaded
+
+    def nbytes(self) -> int:
+        """Tamaño de la ventana y de las matrices (bytes)."""
+        return self._ts.nbytes + self._values.nbytes + 8 * (2 * self._dims * self._dims + 2 * self._dims)
+
+    def to_bytes(self) -> bytes:
+        ts_ns, values = self._window()
+        return _HEADER.pack(_FORMAT_VERSION, self._dims, self._size) + ts_ns.tobytes() + values.tobytes()
+
+    def restore(self, blob: bytes) -> None:
+        if len(blob) < _HEADER.size:
+            raise ValueError("Estado Mahalanobis truncado")
+        version, dims, size = _HEADER.unpack_from(blob)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Versión de estado Mahalanobis no soportada: {version}")
+        if dims != self._dims:
+            raise ValueError("El estado guardado tiene otro número de métricas")
+        offset = _HEADER.size
+        if len(blob) != offset + 8 * size * (1 + dims):
+            raise ValueError("Estado Mahalanobis truncado")
+        ts_ns = np.frombuffer(blob, dtype=np.int64, count=size, offset=offset)
+        values = np.frombuffer(blob, dtype=np.float64, count=size * dims, offset=offset + 8 * size)
+        keep = min(size, self._ts.size)
+        self._ts[:keep] = ts_ns[size - keep:]
+        self._values[:keep] = values.reshape(size, dims)[size - keep:]
+        self._head, self._size = 0, keep
+        self._reanchor()
+
+    def _as_vector(self, row: Any) -> Any:
+        if isinstance(row, Mapping):
+            items = [_safe_float(row.get(name)) for name in self.metrics]
+        else:
+            items = [_safe_float(item) for item in row]
+        if len(items) != self._dims or any(item is None for item in items):
+            return None
+        return np.array(items, dtype=np.float64)
+
+    def _distance(self, vector: Any) -> Tuple[float, str]:
+        delta = vector - self._mean
+        # Σ⁻¹ = (n - 1) · S⁻¹ con S la matriz de dispersión.
+        weighted = (self._size - 1) * (self._inverse @ delta)
+        contributions = delta * weighted
+        squared = float(contributions.sum())
+        driver = self.metrics[int(np.argmax(np.abs(contributions)))]
+        return sqrt(max(squared, 0.0)), driver
+
+    def _append(self, ts_ns: int, vector: Any) -> None:
+        capacity = self._ts.size
+        if self._size >= capacity:
+            self._evict()
+        pos = (self._head + self._size) % capacity
+        self._ts[pos] = ts_ns
+        self._values[pos] = vector
+        # Welford: μ' = μ + δ/(n+1);  S' = S + n/(n+1) · δδᵀ
+        count = self._size
+        delta = vector - self._mean
+        self._size += 1
+        self._mean += delta / self._size
+        self._rank_one(delta, count / self._size)
+        self._count_update()
+
+    def _evict(self) -> None:
+        vector = self._values[self._head].copy()
+        self._head = (self._head + 1) % self._ts.size
+        count = self._size
+        self._size -= 1
+        if not self._size:
+            self._reanchor()
+            return
+        # Inversa de Welford: μ' = μ - δ/(n-1);  S' = S - n/(n-1) · δδᵀ
+        delta = vector - self._mean
+        self._mean -= delta / self._size
+        self._rank_one(delta, -count / self._size)
+        self._count_update()
+
+    def _rank_one(self, delta: Any, coeff: float) -> None:
+        # Sherman–Morrison: (A + c·uuᵀ)⁻¹ = A⁻¹ - c·A⁻¹u uᵀA⁻¹ / (1 + c·uᵀA⁻¹u)
+        self._scatter += coeff * np.outer(delta, delta)
+        projected = self._inverse @ delta
+        denom = 1.0 + coeff * float(delta @ projected)
+        if abs(denom) < 1e-12:
+            self._reanchor()
+            return
+        self._inverse -= (coeff / denom) * np.outer(projected, projected)
+
+    def _count_update(self) -> None:
+        self._updates += 1
+        if self._updates >= self._ts.size:
+            self._reanchor()
+
+    def _trim(self, current_ts_ns: int) -> None:
+        cutoff = current_ts_ns - self._window_ns
+        while self._size and self._ts[self._head] < cutoff:
+            self._evict()
+
+    def _window(self) -> Tuple[Any, Any]:
+        order = (self._head + np.arange(self._size)) % self._ts.size
+        return self._ts[order], self._values[order]
+
+    def _reanchor(self) -> None:
+        _, values = self._window()
+        dims = self._dims
+        if values.shape[0]:
+            self._mean = values.mean(axis=0)
+            centered = values - self._mean
+            self._scatter = centered.T @ centered
+        else:
+            self._mean = np.zeros(dims)
+            self._scatter = np.zeros((dims, dims))
+        self._inverse = np.linalg.inv(self._scatter + self.ridge * np.eye(dims))
+        self._scatter += self.ridge * np.eye(dims)
+        self._updates = 0
+
+    def _window_hours(self) -> float:
+        if self._size < 2:
+            return 0.0
+        last = self._ts[(self._head + self._size - 1) % self._ts.size]
+        return max(int(last - self._ts[self._head]) / 3.6e12, 0.0)
+
+    def _empty_result(self) -> DetectorResult:
+        window_ready = self._size >= self.min_samples
+        return self._layout.build(self._size, self._window_hours(), 0.0, "", False, window_ready)
+
+
+__all__ = ["MahalanobisAnomalyDetector"]
@@ -0,0 +1,208 @@
+"""Ejecución de modelos ONNX con sesión cacheada y micro-lotes.
+
+Las sesiones de ``onnxruntime`` (sólo CPU) se crean una vez por modelo y
+número de hilos y se reutilizan (``load_session``). ``OnnxModelRunner``
+acumula vectores de características en micro-lotes que se disparan por
+tamaño (``batch_size``) o por antigüedad (``max_latency_s``) y los ejecuta
+en un hilo propio: ``submit`` devuelve un ``Future`` al instante, así que el
+bucle de adquisición no se bloquea durante la inferencia (onnxruntime libera
+el GIL mientras calcula).
+
+``stats()`` expone el tiempo de carga del modelo, la latencia por lote y el
+rendimiento (muestras por segundo de inferencia).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .batch import np, require_numpy
+
+try:  # dependencia opcional: sólo necesaria si hay modelos desplegados
+    import onnxruntime as ort
+except ImportError:  # pragma: no cover - optional dependency
+    ort = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+_SESSIONS: Dict[Tuple[str, float, int], Tuple[Any, float]] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def load_session(model_path: str, *, threads: int = 2) -> Tuple[Any, float]:
+    """Sesión CPU cacheada para ``model_path``; devuelve ``(sesión, segundos de carga)``.
+
+    La caché se invalida si el fichero cambia (mtime). ``threads`` limita los
+    hilos intra-operador: en una Pi de 4 núcleos conviene dejar núcleos
+    libres para la adquisición.
+    """
+    if ort is None:
+        raise RuntimeError("onnxruntime no está instalado. Ejecuta 'pip install onnxruntime'.")
+    path = os.path.abspath(model_path)
+    key = (path, os.path.getmtime(path), threads)
+    with _SESSIONS_LOCK:
+        cached = _SESSIONS.get(key)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        load_s = time.perf_counter() - started
+        _SESSIONS[key] = (session, load_s)
+        logger.info("Modelo ONNX cargado: %s (%.3fs, %s hilos)", path, load_s, threads)
+        return session, load_s
+
+
+def clear_sessions() -> None:
+    with _SESSIONS_LOCK:
+        _SESSIONS.clear()
+
+
+def features_from_sample(sample: Mapping[str, Any], feature_names: Sequence[str]) -> "np.ndarray":
+    """Vector ``float32`` en el orden de ``feature_names`` (NaN si falta un valor)."""
+    row = np.full(len(feature_names), np.nan, dtype=np.float32)
+    for pos, name in enumerate(feature_names):
+        try:
+            row[pos] = float(sample.get(name))  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            continue
+    return row
+
+
+class OnnxModelRunner:
+    """Inferencia asíncrona por micro-lotes sobre una sesión ONNX."""
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        *,
+        feature_names: Sequence[str],
+        batch_size: int = 16,
+        max_latency_s: float = 0.2,
+        threads: int = 2,
+        session: Any = None,
+    ) -> None:
+        require_numpy()
+        if session is None:
+            if model_path is None:
+                raise ValueError("Indica model_path o una sesión ya creada")
+            session, self.load_time_s = load_session(model_path, threads=threads)
+        else:
+            self.load_time_s = 0.0
+        self.session = session
+        self.input_name: str = session.get_inputs()[0].name
+        self.feature_names = tuple(feature_names)
+        self.batch_size = max(batch_size, 1)
+        self.max_latency_s = max_latency_s
+        self._cond = threading.Condition()
+        self._pending: List[Tuple["np.ndarray", Future]] = []
+        self._deadline = 0.0
+        self._closed = False
+        self._batches = 0
+        self._samples = 0
+        self._busy_s = 0.0
+        self._max_batch_s = 0.0
+        self._errors = 0
+        self._thread = threading.Thread(target=self._loop, name="onnx-runner", daemon=True)
+        self._thread.start()
+
+    def submit(self, features: Mapping[str, Any] | Sequence[float]) -> Future:
+        """Encola un vector (dict de muestra o secuencia ordenada) y devuelve su ``Future``."""
+        if isinstance(features, Mapping):
+            row = features_from_sample(features, self.feature_names)
+        else:
+            row = np.asarray(features, dtype=np.float32)
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("OnnxModelRunner cerrado")
+            if not self._pending:
+                self._deadline = time.monotonic() + self.max_latency_s
+            self._pending.append((row, future))
+            if len(self._pending) in (1, self.batch_size):
+                self._cond.notify()  # arma el temporizador o dispara el lote lleno
+        return future
+
+    def predict_batch(self, matrix: Any) -> "np.ndarray":
+        """Inferencia síncrona sobre una matriz ``(n, features)``."""
+        outputs = self.session.run(None, {self.input_name: np.asarray(matrix, dtype=np.float32)})
+        return np.asarray(outputs[0])
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Fuerza el envío del lote pendiente y espera a que termine."""
+        with self._cond:
+            futures = [future for _, future in self._pending]
+            self._deadline = 0.0
+            self._cond.notify()
+        for future in futures:
+            future.exception(timeout=timeout)
+
+    def close(self) -> None:
+        """Procesa lo pendiente y detiene el hilo de inferencia."""
+        with self._cond:
+            self._closed = True
+            self._deadline = 0.0
+            self._cond.notify()
+        self._thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "load_time_s": round(self.load_time_s, 4),
+            "batches": self._batches,
+            "samples": self._samples,
+            "pending": pending,
+            "errors": self._errors,
+            "batch_latency_ms": round(self._busy_s / self._batches * 1e3, 3) if self._batches else 0.0,
+            "max_batch_latency_ms": round(self._max_batch_s * 1e3, 3),
+            "throughput_per_s": round(self._samples / self._busy_s, 1) if self._busy_s else 0.0,
+        }
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending and (
+                        len(self._pending) >= self.batch_size or time.monotonic() >= self._deadline
+                    ):
+                        break
+                    if self._closed and not self._pending:
+                        return
+                    timeout = self._deadline - time.monotonic() if self._pending else None
+                    self._cond.wait(timeout)
+                batch = self._pending[: self.batch_size]
+                del self._pending[: self.batch_size]
+                if self._pending and not self._closed:
+                    self._deadline = time.monotonic() + self.max_latency_s
+            self._run(batch)
+
+    def _run(self, batch: List[Tuple["np.ndarray", Future]]) -> None:
+        started = time.perf_counter()
+        try:
+            predictions = self.predict_batch(np.stack([row for row, _ in batch]))
+        except Exception as exc:  # noqa: BLE001 - el error se entrega a cada Future
+            self._errors += 1
+            logger.warning("Fallo en inferencia ONNX (%s muestras): %s", len(batch), exc)
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        elapsed = time.perf_counter() - started
+        self._batches += 1
+        self._samples += len(batch)
+        self._busy_s += elapsed
+        self._max_batch_s = max(self._max_batch_s, elapsed)
+        for (_, future), prediction in zip(batch, predictions):
+            future.set_result(prediction.tolist() if hasattr(prediction, "tolist") else prediction)
+
+
+__all__ = ["OnnxModelRunner", "clear_sessions", "features_from_sample", "load_session"]
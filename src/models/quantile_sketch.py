@@ -0,0 +1,175 @@
+"""Sketch de cuantiles de memoria acotada (estilo KLL) y consultas ponderadas.
+
+``QuantileSketch`` mantiene una jerarquía de compactadores: el nivel ``h``
+guarda valores con peso ``2**h`` y, al superar su capacidad, se ordena y se
+promociona uno de cada dos elementos al nivel siguiente. Con capacidad
+``k`` en el nivel superior la memoria es O(k) valores y el error de rango
+típico ronda ``1.7 / k`` (Karnin, Lang, Liberty 2016). La alternancia del
+desplazamiento de compactación es determinista para que dos nodos con la
+misma entrada den el mismo resultado.
+
+``WeightedValues`` es la forma consultable: valores ordenados con pesos
+acumulados, construida a partir de los elementos de varias sub-ventanas.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Sequence, Tuple
+
+_LEVEL_DECAY = 2.0 / 3.0
+# Cabecera de un ``array`` de CPython (sys.getsizeof de un array vacío).
+ARRAY_OVERHEAD_BYTES = 80
+
+
+class QuantileSketch:
+    """Compactadores KLL con capacidad ``k`` en el nivel más alto."""
+
+    __slots__ = ("k", "count", "_levels", "_flip")
+
+    def __init__(self, k: int = 64) -> None:
+        if k < 8:
+            raise ValueError("k debe ser >= 8")
+        self.k = k
+        self.count = 0
+        self._levels: List[array] = [array("d")]
+        self._flip = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def update(self, value: float) -> None:
+        self._levels[0].append(value)
+        self.count += 1
+        if len(self._levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def items(self, min_height: int = 0) -> Iterable[Tuple[float, float]]:
+        """Pares ``(valor, peso)`` retenidos (sin ordenar) desde ``min_height``."""
+        for height in range(min_height, len(self._levels)):
+            weight = float(1 << height)
+            for value in self._levels[height]:
+                yield value, weight
+
+    def quantiles(self, points: int) -> array:
+        """``points`` cuantiles equiespaciados (centros de rango) de la distribución."""
+        weighted = WeightedValues.from_items(self.items())
+        total = weighted.total
+        if not total:
+            return array("d")
+        # Desde una lista: el array queda con el tamaño justo, sin margen de crecimiento.
+        return array("d", [weighted.value_at_rank((idx + 0.5) / points * total) for idx in range(points)])
+
+    def retained(self) -> int:
+        return sum(len(level) for level in self._levels)
+
+    def nbytes(self) -> int:
+        """Cota de memoria en bytes: ~3·k valores retenidos (con el margen de
+        crecimiento de ``array``) más la cabecera de cada nivel y de la lista."""
+        return 8 * 3 * self.k * 9 // 8 + (ARRAY_OVERHEAD_BYTES + 8) * len(self._levels) + 64
+
+    def clear(self) -> None:
+        self.count = 0
+        self._levels = [array("d")]
+        self._flip = 0
+
+    def state(self) -> Tuple[int, List[array]]:
+        return self._flip, self._levels
+
+    def load_state(self, count: int, flip: int, levels: Sequence[array]) -> None:
+        self.count = count
+        self._flip = flip
+        self._levels = [array("d", level) for level in levels] or [array("d")]
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self._levels) - 1 - height
+        return max(2, int(self.k * _LEVEL_DECAY**depth))
+
+    def _compress(self) -> None:
+        height = 0
+        while height < len(self._levels):
+            level = self._levels[height]
+            if len(level) >= self._capacity(height):
+                if height + 1 == len(self._levels):
+                    self._levels.append(array("d"))
+                ordered = sorted(level)
+                keep = array("d")
+                if len(ordered) % 2:
+                    keep.append(ordered.pop())
+                self._levels[height + 1].extend(ordered[self._flip::2])
+                self._flip ^= 1
+                self._levels[height] = keep
+            height += 1
+
+
+class WeightedValues:
+    """Valores ordenados con pesos acumulados para cuantiles ponderados."""
+
+    __slots__ = ("values", "cumulative", "total")
+
+    def __init__(self, values: Sequence[float], cumulative: Sequence[float]) -> None:
+        self.values = values
+        self.cumulative = cumulative
+        self.total = cumulative[-1] if cumulative else 0.0
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[float, float]]) -> "WeightedValues":
+        ordered = sorted(items)
+        values = array("d", (value for value, _ in ordered))
+        cumulative = array("d", accumulate(weight for _, weight in ordered))
+        return cls(values, cumulative)
+
+    def value_at_rank(self, rank: float) -> float:
+        idx = bisect_left(self.cumulative, rank)
+        return self.values[min(idx, len(self.values) - 1)]
+
+    def median(self) -> float:
+        """Menor valor cuyo peso acumulado alcanza la mitad del total."""
+        if not self.values:
+            return 0.0
+        return self.value_at_rank(self.total / 2)
+
+    def mad(self, center: float) -> float:
+        """Mediana ponderada de ``|x - center|`` sin construir la lista de desviaciones.
+
+        Las distancias crecen hacia ambos lados de ``center``: se busca por
+        bisección en cada rama la menor distancia ``d`` cuyo peso en
+        ``[center - d, center + d]`` alcanza la mitad del total.
+        """
+        values = self.values
+        cumulative = self.cumulative
+        half = self.total / 2
+
+        def covered(distance: float) -> float:
+            upper = bisect_right(values, center + distance)
+            lower = bisect_left(values, center - distance)
+            return (cumulative[upper - 1] if upper else 0.0) - (cumulative[lower - 1] if lower else 0.0)
+
+        split = bisect_left(values, center)
+        best = float("inf")
+        # rama derecha: distancias values[split + i] - center, crecientes en i
+        lo, hi = split, len(values)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if covered(values[mid] - center) >= half:
+                hi = mid
+            else:
+                lo = mid + 1
+        if lo < len(values):
+            best = values[lo] - center
+        # rama izquierda: distancias center - values[split - 1 - i], crecientes en i
+        lo, hi = 0, split
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if covered(center - values[split - 1 - mid]) >= half:
+                hi = mid
+            else:
+                lo = mid + 1
+        if lo < split:
+            best = min(best, center - values[split - 1 - lo])
+        return 0.0 if best == float("inf") else best
+
+
+__all__ = ["ARRAY_OVERHEAD_BYTES", "QuantileSketch", "WeightedValues"]
@@ -0,0 +1,127 @@
+"""Resultados de detectores sin construir un dict por lectura.
+
+Cada detector calcula una sola vez (``ResultLayout``) los nombres
+``{metric}_<sufijo>`` de sus claves; ``evaluate`` devuelve un
+``DetectorResult`` con ``__slots__`` que sólo guarda la tupla de valores. El
+redondeo se aplica al leer. ``ResultChain`` combina varios resultados (y la
+muestra original) sin copiarlos; ``to_dict()`` produce el dict plano sólo
+cuando hace falta, al publicar.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+Field = Tuple[str, Optional[int]]
+
+
+class ResultLayout:
+    """Claves precalculadas y decimales de redondeo de un detector."""
+
+    __slots__ = ("keys", "index", "digits")
+
+    def __init__(self, metric: str, fields: Sequence[Field]) -> None:
+        self.keys: Tuple[str, ...] = tuple(f"{metric}_{suffix}" for suffix, _ in fields)
+        self.index: Dict[str, int] = {key: pos for pos, key in enumerate(self.keys)}
+        self.digits: Tuple[Optional[int], ...] = tuple(digits for _, digits in fields)
+
+    def build(self, *values: Any) -> "DetectorResult":
+        return DetectorResult(self, values)
+
+
+class DetectorResult(Mapping[str, Any]):
+    """Salida de ``evaluate``: se comporta como un dict de sólo lectura."""
+
+    __slots__ = ("_layout", "_values")
+
+    def __init__(self, layout: ResultLayout, values: Tuple[Any, ...]) -> None:
+        self._layout = layout
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        pos = self._layout.index[key]
+        digits = self._layout.digits[pos]
+        value = self._values[pos]
+        return value if digits is None else round(value, digits)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._layout.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.keys)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            key: value if digits is None else round(value, digits)
+            for key, value, digits in zip(self._layout.keys, self._values, self._layout.digits)
+        }
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ResultChain(Mapping[str, Any]):
+    """Vista combinada de varias salidas, equivalente a ``dict.update`` en orden.
+
+    Las partes posteriores tienen prioridad y las asignaciones
+    (``chain[key] = value``) van a ``extra``, que prevalece sobre todas.
+    """
+
+    __slots__ = ("parts", "extra")
+
+    def __init__(self, parts: Iterable[Mapping[str, Any]] = (), extra: Optional[Dict[str, Any]] = None) -> None:
+        self.parts: List[Mapping[str, Any]] = list(parts)
+        self.extra: Dict[str, Any] = {} if extra is None else extra
+
+    def append(self, part: Mapping[str, Any]) -> None:
+        self.parts.append(part)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.extra[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.extra:
+            return self.extra[key]
+        for part in reversed(self.parts):
+            if key in part:
+                return part[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.extra or any(key in part for part in self.parts)
+
+    def __iter__(self) -> Iterator[str]:
+        # Mismo orden que ``to_dict`` (primera aparición) sin copiar valores
+        # ni redondear: las partes se recorren en su sitio.
+        seen = set()
+        for part in (*self.parts, self.extra):
+            for key in part:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        merged: Dict[str, Any] = {}
+        for part in self.parts:
+            to_dict = getattr(part, "to_dict", None)
+            merged.update(to_dict() if to_dict is not None else part)
+        merged.update(self.extra)
+        return merged
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def as_dict(result: Mapping[str, Any]) -> Dict[str, Any]:
+    """Dict plano de cualquier salida (``DetectorResult``, ``ResultChain`` o dict)."""
+    to_dict = getattr(result, "to_dict", None)
+    return to_dict() if to_dict is not None else dict(result)
+
+
+__all__ = ["DetectorResult", "ResultChain", "ResultLayout", "as_dict"]
@@ -0,0 +1,188 @@
+"""Buffer circular compacto para las ventanas de los detectores.
+
+Guarda cada muestra como un ``int64`` (epoch en nanosegundos) y un
+``float64`` en dos ``array.array`` preasignados a la capacidad máxima:
+16 bytes por punto frente a los ~150 de una tupla ``(datetime, float)``
+en un ``deque``. Altas y bajas por ambos extremos en O(1).
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterator, Sequence, Tuple
+
+# Cabecera de ``to_bytes``: versión de formato y número de muestras.
+_HEADER = struct.Struct("<BI")
+_FORMAT_VERSION = 1
+
+
+class TimeSeriesRing:
+    """Cola doble de capacidad fija sobre arrays ``int64``/``float64``."""
+
+    __slots__ = ("capacity", "_ts", "_values", "_head", "_size")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity debe ser > 0")
+        self.capacity = capacity
+        self._ts = array("q", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[int, float]]:
+        for offset in range(self._size):
+            idx = (self._head + offset) % self.capacity
+            yield self._ts[idx], self._values[idx]
+
+    def is_full(self) -> bool:
+        return self._size == self.capacity
+
+    def append(self, ts_ns: int, value: float) -> None:
+        """Añade al final; falla si el buffer está lleno (evict antes)."""
+        if self._size == self.capacity:
+            raise IndexError("TimeSeriesRing lleno")
+        idx = (self._head + self._size) % self.capacity
+        self._ts[idx] = ts_ns
+        self._values[idx] = value
+        self._size += 1
+
+    def appendleft(self, ts_ns: int, value: float) -> None:
+        if self._size == self.capacity:
+            raise IndexError("TimeSeriesRing lleno")
+        self._head = (self._head - 1) % self.capacity
+        self._ts[self._head] = ts_ns
+        self._values[self._head] = value
+        self._size += 1
+
+    def popleft(self) -> Tuple[int, float]:
+        """Retira y devuelve la muestra más antigua."""
+        if not self._size:
+            raise IndexError("pop de TimeSeriesRing vacío")
+        idx = self._head
+        self._head = (idx + 1) % self.capacity
+        self._size -= 1
+        return self._ts[idx], self._values[idx]
+
+    def pop(self) -> Tuple[int, float]:
+        """Retira y devuelve la muestra más reciente."""
+        if not self._size:
+            raise IndexError("pop de TimeSeriesRing vacío")
+        self._size -= 1
+        idx = (self._head + self._size) % self.capacity
+        return self._ts[idx], self._values[idx]
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+
+    @property
+    def first_ts(self) -> int:
+        return self._ts[self._head]
+
+    @property
+    def last_ts(self) -> int:
+        return self._ts[(self._head + self._size - 1) % self.capacity]
+
+    def values(self) -> Iterator[float]:
+        for offset in range(self._size):
+            yield self._values[(self._head + offset) % self.capacity]
+
+    def to_arrays(self) -> Tuple[array, array]:
+        """Copias ordenadas (antigua → reciente) de timestamps y valores."""
+        end = self._head + self._size
+        if end <= self.capacity:
+            return self._ts[self._head:end], self._values[self._head:end]
+        wrap = end - self.capacity
+        return (
+            self._ts[self._head:] + self._ts[:wrap],
+            self._values[self._head:] + self._values[:wrap],
+        )
+
+    def load(self, ts_ns, values) -> None:
+        """Sustituye el contenido por las últimas ``capacity`` muestras dadas."""
+        ts_block = _as_array("q", ts_ns)[-self.capacity:]
+        value_block = _as_array("d", values)[-self.capacity:]
+        if len(ts_block) != len(value_block):
+            raise ValueError("ts_ns y values deben tener la misma longitud")
+        size = len(ts_block)
+        self._ts[:size] = ts_block
+        self._values[:size] = value_block
+        self._head = 0
+        self._size = size
+
+    def extend_history(self, ts_ns: Sequence[int], values: Sequence[float], window_ns: int) -> int:
+        """Añade un histórico cronológico en bloque y recorta a ``window_ns``/``capacity``.
+
+        Se ignoran las muestras anteriores a la última ya presente. Devuelve
+        cuántas muestras nuevas se consideraron.
+        """
+        ts_block = _as_array("q", ts_ns)
+        value_block = _as_array("d", values)
+        if len(ts_block) != len(value_block):
+            raise ValueError("ts_ns y values deben tener la misma longitud")
+        if self._size:
+            skip = bisect_left(ts_block, self.last_ts)
+            ts_block, value_block = ts_block[skip:], value_block[skip:]
+        if not ts_block:
+            return 0
+        all_ts, all_values = self.to_arrays()
+        all_ts.extend(ts_block)
+        all_values.extend(value_block)
+        start = max(bisect_left(all_ts, all_ts[-1] - window_ns), len(all_ts) - self.capacity)
+        self.load(all_ts[start:], all_values[start:])
+        return len(ts_block)
+
+    def nbytes(self) -> int:
+        return self._ts.itemsize * len(self._ts) + self._values.itemsize * len(self._values)
+
+    def to_bytes(self) -> bytes:
+        """Serializa la ventana (antigua → reciente) en un bloque little-endian."""
+        ts_block, value_block = self.to_arrays()
+        if sys.byteorder != "little":  # pragma: no cover - el nodo es little-endian
+            ts_block.byteswap()
+            value_block.byteswap()
+        return _HEADER.pack(_FORMAT_VERSION, self._size) + ts_block.tobytes() + value_block.tobytes()
+
+    def load_bytes(self, blob: bytes) -> None:
+        """Restaura el contenido generado por ``to_bytes``.
+
+        Lanza ``ValueError`` si el bloque no tiene la longitud que indica su
+        cabecera (checkpoint truncado): la ventana queda intacta.
+        """
+        if len(blob) < _HEADER.size:
+            raise ValueError("Bloque de ventana truncado")
+        version, size = _HEADER.unpack_from(blob)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Versión de ventana no soportada: {version}")
+        offset = _HEADER.size
+        if len(blob) != offset + 16 * size:
+            raise ValueError("Bloque de ventana truncado")
+        ts_block = array("q")
+        ts_block.frombytes(blob[offset:offset + 8 * size])
+        value_block = array("d")
+        value_block.frombytes(blob[offset + 8 * size:])
+        if sys.byteorder != "little":  # pragma: no cover
+            ts_block.byteswap()
+            value_block.byteswap()
+        self.load(ts_block, value_block)
+
+
+def _as_array(typecode: str, data) -> array:
+    if isinstance(data, array) and data.typecode == typecode:
+        return data
+    dtype = getattr(data, "dtype", None)  # arrays NumPy: copia directa del buffer
+    if dtype is not None and dtype.kind == ("i" if typecode == "q" else "f") and dtype.itemsize == 8:
+        block = array(typecode)
+        block.frombytes(data.tobytes())
+        return block
+    return array(typecode, data)
+
+
+__all__ = ["TimeSeriesRing"]
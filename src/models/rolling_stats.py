@@ -0,0 +1,106 @@
+"""Estadísticos incrementales para ventanas deslizantes.
+
+Mantiene media y varianza poblacional en O(1) por muestra (Welford con
+altas y bajas) para que los detectores no recorran toda la ventana en
+cada lectura. Cada ``reanchor_every`` actualizaciones se recalculan los
+acumuladores desde la ventana para acotar la deriva numérica; como ese
+recálculo recorre la ventana, el periodo debe crecer con su capacidad
+(``RollingMoments.for_capacity``) para que el coste amortizado siga en O(1).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from math import fsum, sqrt
+from typing import Iterable, Tuple
+
+DEFAULT_REANCHOR_EVERY = 1024
+
+
+@dataclass(slots=True)
+class RollingMoments:
+    """Media y varianza de una ventana con altas/bajas en O(1)."""
+
+    reanchor_every: int = DEFAULT_REANCHOR_EVERY
+    count: int = field(default=0, init=False)
+    mean: float = field(default=0.0, init=False)
+    _m2: float = field(default=0.0, init=False)
+    _last_value: float = field(default=0.0, init=False)
+    _run_length: int = field(default=0, init=False)
+    _updates: int = field(default=0, init=False)
+
+    @classmethod
+    def for_capacity(cls, capacity: int) -> "RollingMoments":
+        """Momentos para una ventana de hasta ``capacity`` muestras.
+
+        El periodo de recálculo nunca es menor que la capacidad: cada
+        recálculo cuesta O(capacidad) y se reparte entre otras tantas
+        actualizaciones.
+        """
+        return cls(reanchor_every=max(DEFAULT_REANCHOR_EVERY, capacity))
+
+    def push(self, value: float) -> None:
+        """Añade un valor al final de la ventana."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self._run_length and value == self._last_value:
+            self._run_length += 1
+        else:
+            self._last_value = value
+            self._run_length = 1
+        self._updates += 1
+
+    def pop(self, value: float) -> None:
+        """Retira un valor (el más antiguo) de la ventana."""
+        if self.count <= 1:
+            self.reset()
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self._m2 = max(self._m2 - delta * (value - self.mean), 0.0)
+        self._updates += 1
+
+    def needs_reanchor(self) -> bool:
+        return self.reanchor_every > 0 and self._updates >= self.reanchor_every
+
+    def reanchor(self, values: Iterable[float]) -> None:
+        """Recalcula los acumuladores desde la ventana completa."""
+        values_list = list(values)
+        self.count = len(values_list)
+        self._updates = 0
+        if not values_list:
+            self.reset()
+            return
+        self.mean = fsum(values_list) / self.count
+        self._m2 = fsum((value - self.mean) ** 2 for value in values_list)
+        last = values_list[-1]
+        run = 0
+        for value in reversed(values_list):
+            if value != last:
+                break
+            run += 1
+        self._last_value = last
+        self._run_length = run
+
+    def reset(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._last_value = 0.0
+        self._run_length = 0
+        self._updates = 0
+
+    def stats(self) -> Tuple[float, float]:
+        """Devuelve ``(media, desviación típica poblacional)``."""
+        if self.count == 0:
+            return 0.0, 0.0
+        if self._run_length >= self.count:
+            # Ventana constante: resultado exacto, sin residuos de redondeo.
+            return self._last_value, 0.0
+        return self.mean, sqrt(self._m2 / self.count)
+
+
+__all__ = ["DEFAULT_REANCHOR_EVERY", "RollingMoments"]
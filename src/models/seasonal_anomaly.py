@@ -0,0 +1,223 @@
+"""Detector de anomalías con línea base estacional por franja horaria.
+
+La temperatura del aire y la luz siguen un ciclo diario fuerte: una ventana
+deslizante de 12 h marca cada amanecer como anomalía. Aquí cada lectura se
+compara con el perfil de *su* franja del día (``slot_minutes``), construido
+con las lecturas de esa misma franja en los últimos días.
+
+Cada franja guarda media y desviación absoluta media con ponderación
+exponencial en el tiempo (semivida ``days · ln 2``, es decir, edad media de
+los datos ≈ ``days``), peso efectivo y número de días observados. Todo vive
+en arrays preasignados indexados por franja: la búsqueda es O(1) por
+muestra (``(ts + utc_offset) // slot % slots``) y el estado se serializa en
+un bloque binario. Las lecturas anómalas se incorporan recortadas al umbral
+para no contaminar la línea base.
+"""
+
+from __future__ import annotations
+
+import struct
+from array import array
+from dataclasses import dataclass, field
+from datetime import timedelta
+from math import isnan, log
+from typing import Any, Iterable, Tuple
+
+from src.timeutils import TimestampLike, timedelta_ns, to_epoch_ns
+
+from . import batch as _batch
+from .result import DetectorResult, ResultLayout
+
+_DAY_NS = 86_400 * 10**9
+_HEADER = struct.Struct("<BIqqq")
+_FORMAT_VERSION = 1
+# Desviación absoluta media -> sigma para una normal (sqrt(pi / 2)).
+_MEAN_ABS_TO_STD = 1.2533
+_RESULT_FIELDS = (
+    ("seasonal_window_samples", None),
+    ("seasonal_window_hours", 2),
+    ("seasonal_slot", None),
+    ("seasonal_mean", 3),
+    ("seasonal_mad", 3),
+    ("seasonal_score", 3),
+    ("seasonal_anomaly", None),
+    ("seasonal_window_ready", None),
+)
+
+
+def _safe_float(value: float | int | str | None) -> float | None:
+    try:
+        numeric = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return None if isnan(numeric) else numeric
+
+
+@dataclass(slots=True)
+class SeasonalAnomalyDetector:
+    """Perfil diario por franjas con media/MAD exponenciales y consulta O(1).
+
+    La franja está lista cuando acumula ``min_samples`` de peso efectivo en
+    al menos ``min_days`` días distintos.
+    """
+
+    metric: str
+    days: int = 14
+    slot_minutes: int = 60
+    min_samples: int = 30
+    min_days: int = 3
+    threshold: float = 3.5
+    utc_offset: timedelta = timedelta(0)
+    _slots: int = field(init=False)
+    _slot_ns: int = field(init=False)
+    _offset_ns: int = field(init=False)
+    _half_life_ns: float = field(init=False)
+    _mean: array = field(init=False)
+    _mad: array = field(init=False)
+    _weight: array = field(init=False)
+    _last_ts: array = field(init=False)
+    _days_seen: array = field(init=False)
+    _last_day: array = field(init=False)
+    _first_ts: int = field(default=0, init=False)
+    _latest_ts: int = field(default=0, init=False)
+    _count: int = field(default=0, init=False)
+    _layout: ResultLayout = field(init=False)
+
+    def __post_init__(self) -> None:
+        if self.slot_minutes <= 0 or 1440 % self.slot_minutes:
+            raise ValueError("slot_minutes debe dividir el día (p. ej. 15, 30, 60)")
+        self._slots = 1440 // self.slot_minutes
+        self._slot_ns = self.slot_minutes * 60 * 10**9
+        self._offset_ns = timedelta_ns(self.utc_offset)
+        self._half_life_ns = max(self.days, 1) * _DAY_NS * log(2)
+        zeros = bytes(8 * self._slots)
+        self._mean = array("d", zeros)
+        self._mad = array("d", zeros)
+        self._weight = array("d", zeros)
+        self._last_ts = array("q", zeros)
+        self._days_seen = array("q", zeros)
+        self._last_day = array("q", [-1] * self._slots)
+        self._layout = ResultLayout(self.metric, _RESULT_FIELDS)
+
+    def window_size(self) -> int:
+        return self._count
+
+    def slot_of(self, ts_ns: int) -> int:
+        return ((ts_ns + self._offset_ns) // self._slot_ns) % self._slots
+
+    def evaluate(self, ts: TimestampLike, value: float | int | str | None) -> DetectorResult:
+        """Puntúa la lectura frente al perfil previo de su franja y lo actualiza."""
+        ts_ns = to_epoch_ns(ts)
+        slot = self.slot_of(ts_ns)
+        numeric_value = _safe_float(value)
+        if numeric_value is None:
+            return self._result(slot, self._mean[slot], self._mad[slot], 0.0, False, self._slot_ready(slot))
+
+        mean = self._mean[slot]
+        mad = self._mad[slot]
+        window_ready = self._slot_ready(slot)
+        spread = _MEAN_ABS_TO_STD * mad
+        if spread == 0.0:
+            diff = numeric_value - mean
+            score = 0.0 if diff == 0.0 or not window_ready else self.threshold + abs(diff)
+        else:
+            score = (numeric_value - mean) / spread
+        anomaly = window_ready and abs(score) >= self.threshold
+        update_value = numeric_value
+        if anomaly and spread:
+            limit = self.threshold * spread
+            update_value = mean + (limit if score > 0 else -limit)
+        if not self._weight[slot]:
+            mean = numeric_value
+        self._update(slot, ts_ns, update_value)
+        return self._result(slot, mean, mad, score, anomaly, window_ready)
+
+    def fit(self, ts_values: Iterable[Any], values: Iterable[Any]) -> int:
+        """Precalcula el perfil desde un histórico cronológico (sin puntuar)."""
+        ts_block, value_block = _batch.history_arrays(ts_values, values, _safe_float)
+        loaded = 0
+        for ts_ns, value in zip(ts_block, value_block):
+            self._update(self.slot_of(ts_ns), ts_ns, value)
+            loaded += 1
+        return loaded
+
+    load_history = fit
+
+    def profile(self) -> Tuple[array, array, array]:
+        """Copias de ``(media, MAD, peso)`` por franja, desde medianoche local."""
+        return array("d", self._mean), array("d", self._mad), array("d", self._weight)
+
+    def nbytes(self) -> int:
+        return 8 * 6 * self._slots
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(_FORMAT_VERSION, self._slots, self._first_ts, self._latest_ts, self._count)
+        blocks = (self._mean, self._mad, self._weight, self._last_ts, self._days_seen, self._last_day)
+        return header + b"".join(block.tobytes() for block in blocks)
+
+    def restore(self, blob: bytes) -> None:
+        if len(blob) < _HEADER.size:
+            raise ValueError("Perfil estacional truncado")
+        version, slots, first_ts, latest_ts, count = _HEADER.unpack_from(blob)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Versión de perfil estacional no soportada: {version}")
+        if slots != self._slots:
+            raise ValueError("El perfil guardado usa otra resolución de franjas")
+        offset = _HEADER.size
+        size = 8 * slots
+        if len(blob) != offset + 6 * size:
+            raise ValueError("Perfil estacional truncado")
+        for name in ("_mean", "_mad", "_weight", "_last_ts", "_days_seen", "_last_day"):
+            block = array(getattr(self, name).typecode)
+            block.frombytes(blob[offset:offset + size])
+            setattr(self, name, block)
+            offset += size
+        self._first_ts, self._latest_ts, self._count = first_ts, latest_ts, count
+
+    def _slot_ready(self, slot: int) -> bool:
+        return self._weight[slot] >= self.min_samples and self._days_seen[slot] >= self.min_days
+
+    def _update(self, slot: int, ts_ns: int, value: float) -> None:
+        weight = self._weight[slot]
+        if weight and ts_ns > self._last_ts[slot]:
+            weight *= 2.0 ** (-(ts_ns - self._last_ts[slot]) / self._half_life_ns)
+        weight += 1.0
+        share = 1.0 / weight
+        mean = self._mean[slot]
+        if weight == 1.0:
+            mean, mad = value, 0.0
+        else:
+            mad = self._mad[slot] + share * (abs(value - mean) - self._mad[slot])
+            mean += share * (value - mean)
+        self._mean[slot] = mean
+        self._mad[slot] = mad
+        self._weight[slot] = weight
+        self._last_ts[slot] = max(self._last_ts[slot], ts_ns)
+        day = (ts_ns + self._offset_ns) // _DAY_NS
+        if day != self._last_day[slot]:
+            self._last_day[slot] = day
+            self._days_seen[slot] += 1
+        if not self._count:
+            self._first_ts = ts_ns
+        self._latest_ts = max(self._latest_ts, ts_ns)
+        self._count += 1
+
+    def _window_hours(self) -> float:
+        if self._count < 2:
+            return 0.0
+        return max((self._latest_ts - self._first_ts) / 3.6e12, 0.0)
+
+    def _result(
+        self,
+        slot: int,
+        mean: float,
+        mad: float,
+        score: float,
+        anomaly: bool,
+        window_ready: bool,
+    ) -> DetectorResult:
+        samples = int(self._weight[slot])
+        return self._layout.build(samples, self._window_hours(), slot, mean, mad, score, anomaly, window_ready)
+
+
+__all__ = ["SeasonalAnomalyDetector"]
@@ -0,0 +1,286 @@
+"""Approximate MAD detector for multi-week windows in fixed memory.
+
+The window is split into ``buckets`` time sub-windows. The open bucket feeds
+a :class:`QuantileSketch`; when time moves past it, the bucket is frozen to
+``summary_points`` equally spaced quantiles (each weighted ``count /
+points``). Closed buckets expire whole once they fall out of the window, so
+the effective window spans between ``window`` and ``window + window /
+buckets``.
+
+Error bound: a frozen bucket of ``n`` samples misplaces any rank by at most
+``n / (2 * summary_points)``, and the open sketch adds a typical ``1.7 / k``
+relative rank error. The median/MAD therefore sit within a normalized rank
+error of about ``1 / (2 * summary_points) + 1.7 / k`` (≈4% with the defaults);
+in value terms this is that rank error times the local spread of the data.
+Memory is ``buckets * summary_points + 3 * k`` floats plus the Python object
+overhead of each bucket (~15 KB by default, see ``nbytes``), independent of
+the sampling rate and window length.
+
+A multi-week median barely moves between consecutive readings, so the
+estimate is refreshed every ``refresh_every`` samples (and whenever a bucket
+closes or expires, or the window is still filling); each reading is scored
+against the latest estimate. ``refresh_every=1`` re-queries on every sample.
+"""
+
+from __future__ import annotations
+
+import struct
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from math import isnan
+from typing import Any, Deque, Iterable, List
+
+from src.timeutils import TimestampLike, timedelta_ns, to_epoch_ns
+
+from . import batch as _batch
+from .mad_anomaly import _RESULT_FIELDS
+from .quantile_sketch import ARRAY_OVERHEAD_BYTES, QuantileSketch, WeightedValues
+from .result import DetectorResult, ResultLayout
+
+_STATE_HEADER = struct.Struct("<BIqqqIBIIdd")
+_BUCKET_HEADER = struct.Struct("<qqII")
+_LEVEL_HEADER = struct.Struct("<I")
+_FORMAT_VERSION = 1
+# A frozen bucket besides its values: the ``_Bucket`` object, its three ints
+# and the array header (CPython, 64-bit).
+_BUCKET_OVERHEAD_BYTES = 64 + 3 * 36 + ARRAY_OVERHEAD_BYTES
+# ``deque`` of closed buckets (a single 64-slot block up to 64 buckets).
+_DEQUE_BYTES = 760
+
+
+def _safe_float(value: float | int | str | None) -> float | None:
+    try:
+        numeric = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return None if isnan(numeric) else numeric
+
+
+class _Bucket:
+    __slots__ = ("bucket_id", "first_ts", "count", "values")
+
+    def __init__(self, bucket_id: int, first_ts: int, count: int, values: array) -> None:
+        self.bucket_id = bucket_id
+        self.first_ts = first_ts
+        self.count = count
+        self.values = values
+
+
+@dataclass(slots=True)
+class SketchMadAnomalyDetector:
+    """MAD anomaly detector over time-bucketed quantile sketches.
+
+    Emits the same ``{metric}_mad_*`` keys as ``RollingMadAnomalyDetector``.
+    """
+
+    metric: str
+    window: timedelta = timedelta(days=21)
+    min_samples: int = 48
+    mad_threshold: float = 3.5
+    buckets: int = 24
+    summary_points: int = 32
+    k: int = 64
+    refresh_every: int = 32
+    scale_factor: float = 1.4826
+    _window_ns: int = field(init=False)
+    _bucket_ns: int = field(init=False)
+    _closed: Deque[_Bucket] = field(default_factory=deque, init=False)
+    _closed_version: int = field(default=0, init=False)
+    _closed_count: int = field(default=0, init=False)
+    _open: QuantileSketch = field(init=False)
+    _open_id: int = field(default=0, init=False)
+    _open_first_ts: int = field(default=0, init=False)
+    _last_ts: int = field(default=0, init=False)
+    _estimate: tuple[float, float] = field(default=(0.0, 0.0), init=False)
+    _estimate_version: int = field(default=-1, init=False)
+    _pending: int = field(default=0, init=False)
+    _layout: ResultLayout = field(init=False)
+
+    def __post_init__(self) -> None:
+        if self.buckets <= 0 or self.summary_points <= 0:
+            raise ValueError("buckets and summary_points must be > 0")
+        self._window_ns = timedelta_ns(self.window)
+        self._bucket_ns = max(self._window_ns // self.buckets, 1)
+        self._open = QuantileSketch(self.k)
+        self._layout = ResultLayout(self.metric, _RESULT_FIELDS)
+
+    def window_size(self) -> int:
+        return self._closed_count + self._open.count
+
+    def evaluate(self, ts: TimestampLike, value: float | int | str | None) -> DetectorResult:
+        numeric_value = _safe_float(value)
+        if numeric_value is None:
+            return self._empty_state(self.window_size(), self._window_hours())
+
+        self._add(to_epoch_ns(ts), numeric_value)
+        self._pending += 1
+        if (
+            self._pending >= self.refresh_every
+            or self._estimate_version != self._closed_version
+            or self.window_size() <= self.min_samples
+        ):
+            self._estimate = self.median_and_mad()
+            self._estimate_version = self._closed_version
+            self._pending = 0
+        med, mad = self._estimate
+        scaled = self.scale_factor * mad
+        if scaled == 0.0:
+            diff = numeric_value - med
+            mad_score = 0.0 if diff == 0.0 else self.mad_threshold + abs(diff)
+        else:
+            mad_score = (numeric_value - med) / scaled
+        samples = self.window_size()
+        window_ready = samples >= self.min_samples
+        anomaly = window_ready and abs(mad_score) >= self.mad_threshold
+        return self._layout.build(samples, self._window_hours(), med, mad, mad_score, anomaly, window_ready)
+
+    def median_and_mad(self) -> tuple[float, float]:
+        """Approximate ``(median, MAD)`` of the current window."""
+        view = WeightedValues.from_items(self._items())
+        if not view.total:
+            return 0.0, 0.0
+        med = view.median()
+        return med, view.mad(med)
+
+    def load_history(self, ts_values: Iterable[Any], values: Iterable[Any]) -> int:
+        """Bulk-load a chronological history without scoring each sample."""
+        ts_block, value_block = _batch.history_arrays(ts_values, values, _safe_float)
+        loaded = 0
+        for ts_ns, value in zip(ts_block, value_block):
+            if ts_ns < self._last_ts:
+                continue
+            self._add(ts_ns, value)
+            loaded += 1
+        return loaded
+
+    def nbytes(self) -> int:
+        """Upper bound of the retained memory in bytes, Python overhead included.
+
+        Up to ``buckets + 1`` frozen buckets live at once (the window spans
+        up to ``window + window / buckets``), plus the open sketch.
+        """
+        per_bucket = 8 * self.summary_points + _BUCKET_OVERHEAD_BYTES
+        blocks = 1 + self.buckets // 64
+        return (self.buckets + 1) * per_bucket + blocks * _DEQUE_BYTES + self._open.nbytes()
+
+    def to_bytes(self) -> bytes:
+        flip, levels = self._open.state()
+        parts = [
+            _STATE_HEADER.pack(
+                _FORMAT_VERSION,
+                len(self._closed),
+                self._open_id,
+                self._open_first_ts,
+                self._last_ts,
+                self._open.count,
+                flip,
+                len(levels),
+                self._pending,
+                *self._estimate,
+            )
+        ]
+        for bucket in self._closed:
+            parts.append(_BUCKET_HEADER.pack(bucket.bucket_id, bucket.first_ts, bucket.count, len(bucket.values)))
+            parts.append(bucket.values.tobytes())
+        for level in levels:
+            parts.append(_LEVEL_HEADER.pack(len(level)))
+            parts.append(level.tobytes())
+        return b"".join(parts)
+
+    def restore(self, blob: bytes) -> None:
+        (
+            version,
+            closed,
+            open_id,
+            open_first,
+            last_ts,
+            open_count,
+            flip,
+            level_count,
+            pending,
+            med,
+            mad,
+        ) = _STATE_HEADER.unpack_from(blob)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch state version: {version}")
+        offset = _STATE_HEADER.size
+        buckets: Deque[_Bucket] = deque()
+        for _ in range(closed):
+            bucket_id, first_ts, count, size = _BUCKET_HEADER.unpack_from(blob, offset)
+            offset += _BUCKET_HEADER.size
+            values = array("d")
+            values.frombytes(blob[offset:offset + 8 * size])
+            offset += 8 * size
+            buckets.append(_Bucket(bucket_id, first_ts, count, values))
+        levels: List[array] = []
+        for _ in range(level_count):
+            (size,) = _LEVEL_HEADER.unpack_from(blob, offset)
+            offset += _LEVEL_HEADER.size
+            level = array("d")
+            level.frombytes(blob[offset:offset + 8 * size])
+            offset += 8 * size
+            levels.append(level)
+        if offset != len(blob):
+            raise ValueError("Truncated sketch state")
+        self._closed = buckets
+        self._closed_count = sum(bucket.count for bucket in buckets)
+        self._closed_version += 1
+        self._open.load_state(open_count, flip, levels)
+        self._open_id = open_id
+        self._open_first_ts = open_first
+        self._last_ts = last_ts
+        self._estimate = (med, mad)
+        self._estimate_version = self._closed_version
+        self._pending = pending
+
+    def _add(self, ts_ns: int, value: float) -> None:
+        bucket_id = ts_ns // self._bucket_ns
+        if self._open.count and bucket_id > self._open_id:
+            self._close_open_bucket()
+        if not self._open.count:
+            self._open_id = max(bucket_id, self._open_id)
+            self._open_first_ts = ts_ns
+        self._open.update(value)
+        self._last_ts = max(self._last_ts, ts_ns)
+        self._expire(ts_ns)
+
+    def _close_open_bucket(self) -> None:
+        sketch = self._open
+        if sketch.count <= self.summary_points and sketch.retained() == sketch.count:
+            values = array("d", sorted(value for value, _ in sketch.items()))
+        else:
+            values = sketch.quantiles(self.summary_points)
+        self._closed.append(_Bucket(self._open_id, self._open_first_ts, sketch.count, values))
+        self._closed_count += sketch.count
+        self._closed_version += 1
+        sketch.clear()
+
+    def _expire(self, current_ts_ns: int) -> None:
+        cutoff = current_ts_ns - self._window_ns
+        while self._closed and (self._closed[0].bucket_id + 1) * self._bucket_ns <= cutoff:
+            expired = self._closed.popleft()
+            self._closed_count -= expired.count
+            self._closed_version += 1
+
+    def _items(self) -> Iterable[tuple[float, float]]:
+        # Nothing is cached beyond the frozen arrays: each bucket is already
+        # sorted, so the query-time sort only merges ``buckets + 1`` runs.
+        for bucket in self._closed:
+            weight = bucket.count / len(bucket.values)
+            for value in bucket.values:
+                yield value, weight
+        yield from self._open.items()
+
+    def _window_hours(self) -> float:
+        first_ts = self._closed[0].first_ts if self._closed else self._open_first_ts
+        if self.window_size() < 2:
+            return 0.0
+        return max((self._last_ts - first_ts) / 3.6e12, 0.0)
+
+    def _empty_state(self, samples: int, hours: float) -> DetectorResult:
+        return self._layout.build(samples, hours, 0.0, 0.0, 0.0, False, samples >= self.min_samples)
+
+
+__all__ = ["SketchMadAnomalyDetector"]
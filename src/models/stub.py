@@ -2,52 +2,269 @@
 
 from __future__ import annotations
 
-from datetime import UTC, datetime, timedelta
-from typing import Dict
+import logging
+from concurrent.futures import Future
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
 
-from .mad_anomaly import RollingMadAnomalyDetector
-from .zscore_anomaly import RollingAnomalyDetector
+from src.config import load_settings
+from src.timeutils import iso_now
 
-_soil_detector = RollingAnomalyDetector(
-    metric="soil_moisture_pct",
-    window=timedelta(days=3),
-    min_samples=72,
-    z_threshold=2.5,
-    max_samples=4096,
-)
+from .batch import np, round_like_python
+from .detector_bank import DetectorBank, DetectorConfig
+from .result import ResultChain
 
-_temp_detector = RollingMadAnomalyDetector(
-    metric="air_temp_c",
-    window=timedelta(hours=12),
-    min_samples=60,
-    mad_threshold=3.0,
-    max_samples=2048,
-)
+logger = logging.getLogger(__name__)
 
+_settings = load_settings()
 
-def _iso_now() -> str:
-    return datetime.now(UTC).isoformat().replace("+00:00", "") + "Z"
+# Umbral de suelo seco (el mismo que ``dry_alert`` en ``processing``).
+SOIL_DRY_PCT = 30.0
 
+# Detectores por métrica; el banco crea uno por nodo bajo demanda.
+DEFAULT_DETECTORS: Dict[str, tuple[DetectorConfig, ...]] = {
+    "soil_moisture_pct": (
+        DetectorConfig(method="zscore", window=timedelta(days=3), min_samples=72, threshold=2.5, max_samples=4096),
+        # Pronóstico de secado: pasos de 15 min, listo tras un día completo.
+        DetectorConfig(
+            method="holt_winters",
+            min_samples=96,
+            threshold=4.0,
+            slot_minutes=15,
+            utc_offset=timedelta(hours=_settings.detector_utc_offset_h),
+            horizon=timedelta(hours=6),
+            floor=SOIL_DRY_PCT,
+        ),
+    ),
+    "air_temp_c": (
+        DetectorConfig(method="mad", window=timedelta(hours=12), min_samples=60, threshold=3.0, max_samples=2048),
+        # Perfil por hora del día: no confunde el amanecer con una anomalía.
+        DetectorConfig(
+            method="seasonal",
+            window=timedelta(days=14),
+            min_samples=30,
+            threshold=3.5,
+            utc_offset=timedelta(hours=_settings.detector_utc_offset_h),
+        ),
+    ),
+}
 
-def predict(sample: Dict[str, float]) -> Dict[str, float]:
-    """Enriquece la muestra con inferencias ligeras."""
+if np is not None:
+    # Vector conjunto suelo/aire: detecta sensores fijos o incoherentes con el resto.
+    DEFAULT_DETECTORS["env"] = (
+        DetectorConfig(
+            method="mahalanobis",
+            window=timedelta(hours=12),
+            min_samples=360,
+            threshold=4.5,
+            max_samples=4096,
+            metrics=("soil_moisture_pct", "air_temp_c", "air_humidity_pct"),
+        ),
+    )
 
-    ts = sample.get("ts") or _iso_now()
-    soil_pct = sample.get("soil_moisture_pct")
-    soil_anomaly = _soil_detector.evaluate(ts, soil_pct)
 
-    temp_val = sample.get("air_temp_c")
-    temp_anomaly = _temp_detector.evaluate(ts, temp_val)
+def _build_bank(settings) -> DetectorBank:
+    fallback = ()
+    if settings.detector_fallback_method:
+        # Métricas sin configuración propia (p. ej. en ``predict_many`` con
+        # formato largo): detector de memoria constante.
+        fallback = (DetectorConfig(method=settings.detector_fallback_method, window=timedelta(days=3)),)
+    return DetectorBank(
+        DEFAULT_DETECTORS,
+        memory_budget_bytes=int(settings.detector_memory_budget_mb * 1024 * 1024),
+        idle_timeout_s=settings.detector_idle_timeout_s or None,
+        default_node_id=settings.node_id,
+        fallback=fallback,
+    )
+
+
+_bank = _build_bank(_settings)
+_state_store: Optional[Any] = None
+_checkpoint_interval_s = _settings.detector_checkpoint_interval_s
+_model_runner: Optional[Any] = None
+_model_runner_failed = False
+# Última predicción ONNX completada por nodo (la inferencia es asíncrona).
+_latest_predictions: Dict[str, Any] = {}
+
+
+def get_bank() -> DetectorBank:
+    return _bank
+
+
+def attach_state_store(store: Optional[Any]) -> int:
+    """Restaura las ventanas guardadas y activa los checkpoints periódicos.
+
+    Devuelve el número de detectores restaurados (0 sin store o sin estado).
+    """
+    global _state_store
+    _state_store = store
+    if store is None:
+        return 0
+    try:
+        restored = _bank.restore(store)
+    except ValueError as exc:
+        logger.warning("Estado de detectores descartado: %s", exc)
+        return 0
+    logger.info("Detectores restaurados desde state store: %s", restored)
+    return restored
+
+
+def warm_up_from_database(database: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+    """Precarga las ventanas desde ``SensorDatabase`` (si existe) y devuelve el informe."""
+    from .warmup import warm_up
+
+    if database is None:
+        from src.acquisition.db import DEFAULT_DB_PATH, get_database
+
+        if not Path(DEFAULT_DB_PATH).exists():
+            logger.debug("Sin base de datos de sensores para warm-up")
+            return None
+        database = get_database(DEFAULT_DB_PATH)
+    return warm_up(_bank, database).as_dict()
+
+
+def checkpoint_state() -> Optional[int]:
+    """Guarda inmediatamente las ventanas (p. ej. al apagar el nodo)."""
+    if _state_store is None:
+        return None
+    return _bank.checkpoint(_state_store)
+
+
+def get_model_runner() -> Optional[Any]:
+    """``OnnxModelRunner`` del modelo configurado (``NAIRA_ONNX_MODEL``), creado una vez.
+
+    Devuelve ``None`` si no hay modelo, falta ``onnxruntime`` o la carga falla.
+    """
+    global _model_runner, _model_runner_failed
+    if _model_runner is not None or _model_runner_failed or not _settings.onnx_model_path:
+        return _model_runner
+    from .onnx_runner import OnnxModelRunner
+
+    try:
+        _model_runner = OnnxModelRunner(
+            _settings.onnx_model_path,
+            feature_names=[name.strip() for name in _settings.onnx_features.split(",") if name.strip()],
+            batch_size=_settings.onnx_batch_size,
+            max_latency_s=_settings.onnx_batch_latency_ms / 1000.0,
+            threads=_settings.onnx_threads,
+        )
+    except (OSError, RuntimeError, ValueError) as exc:
+        _model_runner_failed = True
+        logger.warning("Modelo ONNX desactivado: %s", exc)
+    return _model_runner
 
+
+def predict_async(sample: Mapping[str, Any]) -> Optional[Future]:
+    """Encola la muestra en el modelo ONNX; el ``Future`` trae su predicción."""
+    runner = get_model_runner()
+    if runner is None:
+        return None
+    node_id = sample.get("node_id") or _settings.node_id
+    future = runner.submit(sample)
+    future.add_done_callback(lambda done: _store_prediction(node_id, done))
+    return future
+
+
+def _store_prediction(node_id: str, future: Future) -> None:
+    if future.exception() is None:
+        _latest_predictions[node_id] = future.result()
+
+
+def _maybe_checkpoint() -> None:
+    if _state_store is None or _checkpoint_interval_s <= 0:
+        return
+    try:
+        _bank.maybe_checkpoint(_state_store, _checkpoint_interval_s)
+    except Exception as exc:  # noqa: BLE001 - la inferencia no debe caer por el checkpoint
+        logger.warning("No se pudo guardar el estado de detectores: %s", exc)
+
+
+def _enrich(sample: Mapping[str, Any], detector_outputs: ResultChain) -> ResultChain:
+    soil_pct = sample.get("soil_moisture_pct")
     soil_value = float(soil_pct) if soil_pct is not None else 50.0
+    dry_in_h = None
+    if detector_outputs.get("soil_moisture_pct_hw_window_ready"):
+        # El riesgo considera también el valor previsto a 6 h.
+        soil_value = min(soil_value, detector_outputs["soil_moisture_pct_hw_forecast"])
+        hours = detector_outputs["soil_moisture_pct_hw_dry_in_h"]
+        dry_in_h = hours if hours >= 0 else None
     risk_score = max(0.0, (50.0 - soil_value) / 50.0)
 
-    result = dict(soil_anomaly)
-    result.update(temp_anomaly)
-    result["risk_score"] = round(risk_score, 3)
-    result["ts_model"] = ts
-    result["temp_alert"] = bool(temp_anomaly.get("air_temp_c_mad_anomaly"))
+    detector_outputs["risk_score"] = round(risk_score, 3)
+    detector_outputs["soil_dry_in_h"] = dry_in_h
+    detector_outputs["ts_model"] = sample.get("ts") or iso_now()
+    # El perfil estacional manda en cuanto su franja horaria está lista.
+    if detector_outputs.get("air_temp_c_seasonal_window_ready"):
+        detector_outputs["temp_alert"] = bool(detector_outputs.get("air_temp_c_seasonal_anomaly"))
+    else:
+        detector_outputs["temp_alert"] = bool(detector_outputs.get("air_temp_c_mad_anomaly"))
+    # Incoherencia entre sensores co-ubicados (p. ej. uno atascado).
+    detector_outputs["joint_alert"] = bool(detector_outputs.get("env_mahal_anomaly"))
+    return detector_outputs
+
+
+def predict(sample: Mapping[str, Any]) -> ResultChain:
+    """Enriquece la muestra con inferencias ligeras."""
+
+    result = _enrich(sample, _bank.evaluate_sample(sample))
+    if predict_async(sample) is not None:
+        # No se espera al lote en curso: se adjunta la última predicción disponible.
+        result["model_prediction"] = _latest_predictions.get(sample.get("node_id") or _settings.node_id)
+    _maybe_checkpoint()
     return result
 
 
-__all__ = ["predict"]
+def predict_columns(node_ids: Any, metrics: Any, ts_ns: Any, values: Any, soil_pct: Any) -> Dict[str, Any]:
+    """``predict`` columnar para lecturas en formato largo (sin modelo ONNX).
+
+    ``soil_pct`` es el % de humedad de suelo de cada fila (NaN si no aplica).
+    Devuelve las columnas de los detectores más ``risk_score``,
+    ``soil_dry_in_h`` (NaN si no hay pronóstico), ``temp_alert`` y ``joint_alert``.
+    """
+    columns = _bank.evaluate_columns(node_ids, metrics, ts_ns, values)
+    rows = len(ts_ns)
+    no_flags = np.zeros(rows, dtype=bool)
+    soil_value = np.where(np.isnan(soil_pct), 50.0, soil_pct)
+    dry_in_h = np.full(rows, np.nan)
+    forecast_ready = columns.get("soil_moisture_pct_hw_window_ready")
+    if forecast_ready is not None:
+        soil_value = np.where(
+            forecast_ready, np.minimum(soil_value, columns["soil_moisture_pct_hw_forecast"]), soil_value
+        )
+        hours = columns["soil_moisture_pct_hw_dry_in_h"]
+        dry_in_h = np.where(forecast_ready & (hours >= 0), hours, np.nan)
+    columns["risk_score"] = round_like_python(np.maximum(0.0, (50.0 - soil_value) / 50.0), 3)
+    columns["soil_dry_in_h"] = dry_in_h
+    columns["temp_alert"] = np.where(
+        columns.get("air_temp_c_seasonal_window_ready", no_flags),
+        columns.get("air_temp_c_seasonal_anomaly", no_flags),
+        columns.get("air_temp_c_mad_anomaly", no_flags),
+    )
+    columns["joint_alert"] = columns.get("env_mahal_anomaly", no_flags).copy()
+    _maybe_checkpoint()
+    return columns
+
+
+def predict_many(samples: Iterable[Mapping[str, Any]]) -> List[ResultChain]:
+    """``predict`` para un lote de muestras de uno o varios nodos."""
+
+    batch = list(samples)
+    results = [_enrich(sample, outputs) for sample, outputs in zip(batch, _bank.predict_many(batch))]
+    _maybe_checkpoint()
+    return results
+
+
+__all__ = [
+    "DEFAULT_DETECTORS",
+    "SOIL_DRY_PCT",
+    "attach_state_store",
+    "checkpoint_state",
+    "get_bank",
+    "get_model_runner",
+    "predict",
+    "predict_async",
+    "predict_columns",
+    "predict_many",
+    "warm_up_from_database",
+]
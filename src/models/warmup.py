@@ -0,0 +1,109 @@
+"""Warm-up de los detectores desde el histórico de ``SensorDatabase``.
+
+Alternativa al checkpoint binario para nodos que ya guardan
+``sensor_samples``: al arrancar se lee la última ventana de cada métrica
+con una consulta por rango y se carga en bloque en el banco, sin calcular
+puntuaciones muestra a muestra.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+from src.timeutils import iso_from_ns, now_ns, parse_iso_ns, timedelta_ns
+
+from .detector_bank import DetectorBank
+
+logger = logging.getLogger(__name__)
+
+# Métrica del detector -> métrica almacenada por el colector en SQLite.
+# Sólo métricas con la misma unidad: ``humedad_suelo`` guarda cuentas ADC
+# (0-1023), no el % de ``soil_moisture_pct``, así que no se precarga.
+DEFAULT_METRIC_MAP: Dict[str, str] = {
+    "air_temp_c": "temp_aire",
+}
+
+
+@dataclass
+class WarmupReport:
+    """Resumen del warm-up (muestras por métrica y tiempo hasta detectores listos)."""
+
+    samples: Dict[str, int] = field(default_factory=dict)
+    detectors: int = 0
+    ready: int = 0
+    elapsed_s: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "samples": dict(self.samples),
+            "detectors": self.detectors,
+            "ready": self.ready,
+            "elapsed_s": round(self.elapsed_s, 3),
+        }
+
+
+def warm_up(
+    bank: DetectorBank,
+    database: Any,
+    *,
+    node_id: Optional[str] = None,
+    metric_map: Mapping[str, str] = DEFAULT_METRIC_MAP,
+    reference_ns: Optional[int] = None,
+) -> WarmupReport:
+    """Carga en ``bank`` la última ventana de cada métrica configurada.
+
+    Args:
+        bank: Banco de detectores a precargar
+        database: ``SensorDatabase`` (o cualquier objeto con ``iter_metric_window``)
+        node_id: Limitar a un nodo; por defecto se cargan todos los presentes
+        metric_map: Traducción métrica del detector -> métrica en SQLite
+        reference_ns: Instante final de la ventana (ahora por defecto)
+    """
+    started = time.perf_counter()
+    end_ns = reference_ns if reference_ns is not None else now_ns()
+    report = WarmupReport()
+    for metric, configs in bank.configs.items():
+        if not configs:
+            continue
+        db_metric = metric_map.get(metric, metric)
+        # Una consulta por ventana distinta: cada detector lee sólo su ventana.
+        by_window: Dict[int, List[Any]] = defaultdict(list)
+        for config in configs:
+            by_window[timedelta_ns(config.window)].append(config)
+        count = 0
+        for window_ns, window_configs in sorted(by_window.items()):
+            series: Dict[str, tuple[List[int], List[float]]] = defaultdict(lambda: ([], []))
+            rows = 0
+            for row_node, ts, value in database.iter_metric_window(db_metric, iso_from_ns(end_ns - window_ns), node_id):
+                ts_ns = parse_iso_ns(ts)
+                if ts_ns is None or ts_ns > end_ns:
+                    continue
+                ts_list, value_list = series[row_node]
+                ts_list.append(ts_ns)
+                value_list.append(value)
+                rows += 1
+            count = max(count, rows)
+            for row_node, (ts_list, value_list) in series.items():
+                for config in window_configs:
+                    detector = bank.get(row_node, metric, config)
+                    detector.load_history(ts_list, value_list)
+                    report.detectors += 1
+                    report.ready += detector.window_size() >= config.min_samples
+        report.samples[metric] = count
+
+    report.elapsed_s = time.perf_counter() - started
+    logger.info(
+        "Warm-up de detectores: %s muestras, %s/%s listos en %.2fs",
+        sum(report.samples.values()),
+        report.ready,
+        report.detectors,
+        report.elapsed_s,
+    )
+    return report
+
+
+__all__ = ["DEFAULT_METRIC_MAP", "WarmupReport", "warm_up"]
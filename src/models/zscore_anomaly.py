@@ -2,31 +2,35 @@
 
 Este módulo implementa un detector basado en una ventana móvil y 
 una métrica tipo *z-score*. Está pensado para ejecutarse en hardware
-limitado (RPi) sin dependencias externas.
+limitado (RPi): media y desviación se mantienen de forma incremental, con
+coste constante por muestra. NumPy es opcional y solo lo necesita
+``evaluate_batch``; ``evaluate`` funciona con la biblioteca estándar.
 """
 
 from __future__ import annotations
 
-from collections import deque
 from dataclasses import dataclass, field
-from datetime import UTC, datetime, timedelta
+from datetime import timedelta
 from math import isnan
-from statistics import fmean, pstdev
-from typing import Deque, Dict, Iterable, Tuple
+from typing import Any, Dict, Iterable, Tuple
 
+from src.timeutils import TimestampLike, timedelta_ns, to_epoch_ns
 
-def _ensure_dt(ts: str | datetime | None) -> datetime:
-    """Convierte una marca de tiempo en datetime (UTC)."""
-    if isinstance(ts, datetime):
-        return ts.astimezone(UTC)
-    if isinstance(ts, str):
-        value = ts.replace("Z", "+00:00")
-        try:
-            parsed = datetime.fromisoformat(value)
-            return parsed.astimezone(UTC)
-        except ValueError:
-            pass
-    return datetime.now(UTC)
+from . import batch as _batch
+from .batch import BatchEvaluation, np
+from .result import DetectorResult, ResultLayout
+from .ring_buffer import TimeSeriesRing
+from .rolling_stats import RollingMoments
+
+_RESULT_FIELDS = (
+    ("window_samples", None),
+    ("window_hours", 2),
+    ("rolling_mean", 3),
+    ("rolling_std", 3),
+    ("zscore", 3),
+    ("anomaly", None),
+    ("window_ready", None),
+)
 
 
 def _safe_float(value: float | int | str | None) -> float | None:
@@ -46,67 +50,182 @@ class RollingAnomalyDetector:
     min_samples: int = 48
     z_threshold: float = 3.0
     max_samples: int = 2048
-    _samples: Deque[Tuple[datetime, float]] = field(default_factory=deque, init=False)
+    _samples: TimeSeriesRing = field(init=False)
+    _window_ns: int = field(init=False)
+    _moments: RollingMoments = field(init=False)
+    _layout: ResultLayout = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._samples = TimeSeriesRing(max(self.max_samples, 1))
+        self._window_ns = timedelta_ns(self.window)
+        self._moments = RollingMoments.for_capacity(self._samples.capacity)
+        self._layout = ResultLayout(self.metric, _RESULT_FIELDS)
+
+    def window_size(self) -> int:
+        return len(self._samples)
 
-    def evaluate(self, ts: str | datetime | None, value: float | int | str | None) -> Dict[str, float | int | bool]:
+    def evaluate(self, ts: TimestampLike, value: float | int | str | None) -> DetectorResult:
         """Actualiza la ventana y devuelve métricas de anomalía."""
         numeric_value = _safe_float(value)
         if numeric_value is None:
             return self._empty_result()
 
-        ts_dt = _ensure_dt(ts)
-        self._trim(ts_dt)
-        self._samples.append((ts_dt, numeric_value))
-        if len(self._samples) > self.max_samples:
-            self._samples.popleft()
+        ts_ns = to_epoch_ns(ts)
+        self._trim(ts_ns)
+        if len(self._samples) >= self._samples.capacity:
+            self._evict()
+        self._samples.append(ts_ns, numeric_value)
+        self._moments.push(numeric_value)
+        if self._moments.needs_reanchor():
+            self._moments.reanchor(self._samples.values())
 
-        avg, std_dev = self._stats()
+        avg, std_dev = self._moments.stats()
         zscore = 0.0 if std_dev == 0.0 else (numeric_value - avg) / std_dev
         window_ready = len(self._samples) >= self.min_samples
         anomaly = window_ready and abs(zscore) >= self.z_threshold
-
-        return {
-            f"{self.metric}_window_samples": len(self._samples),
-            f"{self.metric}_window_hours": round(self._window_hours(), 2),
-            f"{self.metric}_rolling_mean": round(avg, 3),
-            f"{self.metric}_rolling_std": round(std_dev, 3),
-            f"{self.metric}_zscore": round(zscore, 3),
-            f"{self.metric}_anomaly": anomaly,
-            f"{self.metric}_window_ready": window_ready,
-        }
-
-    def _trim(self, current_ts: datetime) -> None:
-        cutoff = current_ts - self.window
-        while self._samples and self._samples[0][0] < cutoff:
-            self._samples.popleft()
-
-    def _stats(self) -> Tuple[float, float]:
-        values: Iterable[float] = (sample[1] for sample in self._samples)
-        values_list = list(values)
-        if not values_list:
-            return 0.0, 0.0
-        if len(values_list) == 1:
-            return values_list[0], 0.0
-        avg = fmean(values_list)
-        std_dev = pstdev(values_list)
-        return avg, std_dev
+        return self._result(len(self._samples), self._window_hours(), avg, std_dev, zscore, anomaly, window_ready)
+
+    def load_history(self, ts_values: Iterable[Any], values: Iterable[Any]) -> int:
+        """Precarga un histórico cronológico sin calcular puntuaciones.
+
+        Devuelve el número de muestras válidas consideradas.
+        """
+        ts_block, value_block = _batch.history_arrays(ts_values, values, _safe_float)
+        loaded = self._samples.extend_history(ts_block, value_block, self._window_ns)
+        self._moments.reanchor(self._samples.values())
+        return loaded
+
+    def evaluate_batch(self, ts_array: Any, values_array: Any) -> BatchEvaluation:
+        """Evalúa una serie histórica completa con NumPy.
+
+        Equivale a llamar ``evaluate`` muestra a muestra (las marcas de tiempo
+        deben venir en orden cronológico) y deja la ventana en el mismo
+        estado, pero devuelve arrays columnares en lugar de un dict por fila.
+        Media y desviación se obtienen repitiendo las actualizaciones de
+        ``RollingMoments`` del camino escalar, así que coinciden exactamente.
+        """
+        _batch.require_numpy()
+        values = _batch.as_float_values(values_array, _safe_float)
+        ts_ns = _batch.as_epoch_ns(ts_array)
+        if ts_ns.size != values.size:
+            raise ValueError("ts_array y values_array deben tener la misma longitud")
+
+        valid = ~np.isnan(values)
+        prior_len = len(self._samples)
+        prior_hours = self._window_hours()
+        all_ts, all_values = _batch.concat_window(
+            *self._samples.to_arrays(),
+            ts_ns[valid],
+            values[valid],
+        )
+        positions = prior_len + np.arange(int(valid.sum()))
+        starts = _batch.window_starts(all_ts, positions, timedelta_ns(self.window), self.max_samples)
+        lengths = positions - starts + 1
+
+        # Misma secuencia de bajas/altas/recálculos que ``evaluate``: la media y
+        # la desviación salen del mismo estado incremental, bit a bit.
+        window_values = all_values.tolist()
+        avg = np.empty(positions.size, dtype=np.float64)
+        std_dev = np.empty(positions.size, dtype=np.float64)
+        moments = self._moments
+        oldest = 0
+        for row, (pos, start) in enumerate(zip(positions.tolist(), starts.tolist())):
+            for old_value in window_values[oldest:start]:
+                moments.pop(old_value)
+            oldest = start
+            moments.push(window_values[pos])
+            if moments.needs_reanchor():
+                moments.reanchor(window_values[start:pos + 1])
+            avg[row], std_dev[row] = moments.stats()
+        current = all_values[positions]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zscore = np.where(std_dev == 0.0, 0.0, (current - avg) / std_dev)
+        ready = lengths >= self.min_samples
+        anomaly = ready & (np.abs(zscore) >= self.z_threshold)
+
+        row_len, row_hours = _batch.expand_to_rows(
+            valid, prior_len, prior_hours, lengths, _batch.window_hours(all_ts, starts, positions)
+        )
+        if positions.size:
+            self._samples.load(all_ts[starts[-1]:], all_values[starts[-1]:])
+        return BatchEvaluation(
+            valid=valid,
+            window_samples=row_len,
+            window_hours=row_hours,
+            center=_batch.scatter(valid, avg, 0.0, np.float64),
+            spread=_batch.scatter(valid, std_dev, 0.0, np.float64),
+            score=_batch.scatter(valid, zscore, 0.0, np.float64),
+            anomaly=_batch.scatter(valid, anomaly, False, bool),
+            window_ready=row_len >= self.min_samples,
+        )
+
+    def result_at(self, batch: BatchEvaluation, idx: int) -> DetectorResult:
+        """Resultado equivalente al que ``evaluate`` habría devuelto en la fila ``idx``."""
+        samples = int(batch.window_samples[idx])
+        if not batch.valid[idx]:
+            return self._empty_state(samples, float(batch.window_hours[idx]))
+        return self._result(
+            samples,
+            float(batch.window_hours[idx]),
+            float(batch.center[idx]),
+            float(batch.spread[idx]),
+            float(batch.score[idx]),
+            bool(batch.anomaly[idx]),
+            bool(batch.window_ready[idx]),
+        )
+
+    def batch_columns(self, batch: BatchEvaluation) -> Dict[str, Any]:
+        """Columnas de ``evaluate_batch`` con las claves y el redondeo de ``evaluate``."""
+        return _batch.result_columns(self._layout, batch)
+
+    def _result(
+        self,
+        samples: int,
+        hours: float,
+        avg: float,
+        std_dev: float,
+        zscore: float,
+        anomaly: bool,
+        window_ready: bool,
+    ) -> DetectorResult:
+        return self._layout.build(samples, hours, avg, std_dev, zscore, anomaly, window_ready)
+
+    def nbytes(self) -> int:
+        """Tamaño aproximado de los buffers de la ventana (bytes)."""
+        return self._samples.nbytes()
+
+    def to_bytes(self) -> bytes:
+        """Ventana serializada para ``StateStore`` (16 bytes por muestra)."""
+        return self._samples.to_bytes()
+
+    def restore(self, blob: bytes) -> None:
+        """Recupera la ventana guardada con ``to_bytes`` y recalcula los momentos.
+
+        Un bloque truncado lanza ``ValueError`` antes de tocar la ventana.
+        """
+        self._samples.load_bytes(blob)
+        self._moments.reanchor(self._samples.values())
+
+    def _trim(self, current_ts_ns: int) -> None:
+        cutoff = current_ts_ns - self._window_ns
+        while self._samples and self._samples.first_ts < cutoff:
+            self._evict()
+
+    def _evict(self) -> None:
+        _, value = self._samples.popleft()
+        self._moments.pop(value)
 
     def _window_hours(self) -> float:
         if len(self._samples) < 2:
             return 0.0
-        delta = self._samples[-1][0] - self._samples[0][0]
-        return max(delta.total_seconds() / 3600.0, 0.0)
-
-    def _empty_result(self) -> Dict[str, float | int | bool]:
-        return {
-            f"{self.metric}_window_samples": len(self._samples),
-            f"{self.metric}_window_hours": self._window_hours(),
-            f"{self.metric}_rolling_mean": 0.0,
-            f"{self.metric}_rolling_std": 0.0,
-            f"{self.metric}_zscore": 0.0,
-            f"{self.metric}_anomaly": False,
-            f"{self.metric}_window_ready": len(self._samples) >= self.min_samples,
-        }
+        delta_ns = self._samples.last_ts - self._samples.first_ts
+        return max(delta_ns / 3.6e12, 0.0)
+
+    def _empty_result(self) -> DetectorResult:
+        return self._empty_state(len(self._samples), self._window_hours())
+
+    def _empty_state(self, samples: int, hours: float) -> DetectorResult:
+        return self._layout.build(samples, hours, 0.0, 0.0, 0.0, False, samples >= self.min_samples)
 
 
 __all__ = ["RollingAnomalyDetector"]
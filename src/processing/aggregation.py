@@ -0,0 +1,188 @@
+"""Agregación incremental por ventanas fijas (tumbling) de cada ``(node_id, metric)``.
+
+Cada lectura actualiza en O(1) los acumuladores (número, suma, mínimo,
+máximo y último valor) de todas las anchuras configuradas (p. ej. 1 min,
+15 min y 1 h). Cuando llega una lectura de la ventana siguiente, la anterior
+se cierra y sale aguas abajo como una muestra más, en formato largo::
+
+    {"ts": <inicio>, "node_id", "metric", "value": <media>, "value_min",
+     "value_max", "value_count", "value_last", "window_s", "aggregate": True}
+
+Así un sink puede enviar sólo agregados por enlaces de datos medidos y
+dejar los datos crudos en local. Las lecturas que llegan cuando su ventana
+ya se cerró se cuentan en ``late`` y no alteran agregados ya emitidos.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+from math import isnan
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.timeutils import iso_from_ns, sample_ts_ns, timedelta_ns
+
+from .pipeline import Stage
+
+DEFAULT_WIDTHS = (timedelta(minutes=1), timedelta(minutes=15), timedelta(hours=1))
+
+
+def _safe_float(value: float | int | str | None) -> float | None:
+    try:
+        numeric = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return None if isnan(numeric) else numeric
+
+
+@dataclass(slots=True)
+class WindowState:
+    """Acumuladores de una ventana abierta."""
+
+    start_ns: int
+    count: int = 0
+    total: float = 0.0
+    minimum: float = 0.0
+    maximum: float = 0.0
+    last: float = 0.0
+
+    def add(self, value: float) -> None:
+        if self.count:
+            if value < self.minimum:
+                self.minimum = value
+            elif value > self.maximum:
+                self.maximum = value
+        else:
+            self.minimum = self.maximum = value
+        self.count += 1
+        self.total += value
+        self.last = value
+
+
+class TumblingAggregator(Stage):
+    """Etapa que emite el agregado de cada ventana al cerrarse.
+
+    Trabaja con muestras en formato largo (``metric``/``value``) o, si se
+    indica ``metrics``, con muestras anchas (una columna por métrica). Con
+    ``emit_raw`` la muestra original también sigue aguas abajo.
+    """
+
+    name = "aggregate"
+    reads = ("ts_ns", "node_id", "metric", "value")
+    fanout = True
+
+    def __init__(
+        self,
+        widths: Sequence[timedelta] = DEFAULT_WIDTHS,
+        *,
+        emit_raw: bool = True,
+        metrics: Optional[Sequence[str]] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        if not widths:
+            raise ValueError("TumblingAggregator necesita al menos una anchura de ventana")
+        self.widths_ns: Tuple[int, ...] = tuple(sorted({timedelta_ns(width) for width in widths}))
+        if self.widths_ns[0] <= 0:
+            raise ValueError("Las ventanas deben tener anchura positiva")
+        self.emit_raw = emit_raw
+        self.metrics = tuple(metrics) if metrics else None
+        if name:
+            self.name = name
+        if self.metrics:
+            self.reads = ("ts_ns", "node_id", *self.metrics)
+        self._open: Dict[Tuple[str, str], List[Optional[WindowState]]] = {}
+        self._tags: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.late = 0
+        self.closed = 0
+
+    def process(self, sample: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ts_ns = sample_ts_ns(sample)
+        node_id = sample.get("node_id") or ""
+        closed: List[Dict[str, Any]] = []
+        if self.metrics is None:
+            value = _safe_float(sample.get("value"))
+            if value is not None:
+                self._add((node_id, sample.get("metric") or ""), ts_ns, value, sample, closed)
+        else:
+            for metric in self.metrics:
+                value = _safe_float(sample.get(metric))
+                if value is not None:
+                    self._add((node_id, metric), ts_ns, value, None, closed)
+        if self.emit_raw:
+            closed.insert(0, sample)
+        return closed
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Cierra todas las ventanas abiertas (p. ej. al parar el colector)."""
+        closed = [
+            self._emit(key, width_ns, window)
+            for key, windows in self._open.items()
+            for width_ns, window in zip(self.widths_ns, windows)
+            if window is not None and window.count
+        ]
+        self._open.clear()
+        closed.sort(key=lambda item: (item["ts_ns"], item["window_s"]))
+        return closed
+
+    def open_windows(self) -> int:
+        return sum(window is not None for windows in self._open.values() for window in windows)
+
+    def _add(
+        self,
+        key: Tuple[str, str],
+        ts_ns: int,
+        value: float,
+        sample: Optional[Dict[str, Any]],
+        closed: List[Dict[str, Any]],
+    ) -> None:
+        windows = self._open.get(key)
+        if windows is None:
+            windows = self._open[key] = [None] * len(self.widths_ns)
+            if sample is not None:
+                self._tags[key] = {name: sample[name] for name in ("source", "unit") if name in sample}
+        for pos, width_ns in enumerate(self.widths_ns):
+            start_ns = ts_ns - ts_ns % width_ns
+            window = windows[pos]
+            if window is None or start_ns > window.start_ns:
+                if window is not None:
+                    closed.append(self._emit(key, width_ns, window))
+                window = windows[pos] = WindowState(start_ns)
+            elif start_ns < window.start_ns:
+                self.late += 1
+                continue
+            window.add(value)
+
+    def _emit(self, key: Tuple[str, str], width_ns: int, window: WindowState) -> Dict[str, Any]:
+        node_id, metric = key
+        self.closed += 1
+        aggregate = {
+            "ts": iso_from_ns(window.start_ns),
+            "ts_ns": window.start_ns,
+            "node_id": node_id,
+            "metric": metric,
+            "value": window.total / window.count,
+            "value_min": window.minimum,
+            "value_max": window.maximum,
+            "value_count": window.count,
+            "value_last": window.last,
+            "window_s": width_ns // 1_000_000_000,
+            "aggregate": True,
+        }
+        aggregate.update(self._tags.get(key, ()))
+        return aggregate
+
+
+def widths_from_setting(raw: str) -> Tuple[timedelta, ...]:
+    """``"60,900,3600"`` → anchuras en segundos (se ignoran entradas no válidas)."""
+    widths = []
+    for item in raw.split(","):
+        try:
+            seconds = int(item.strip())
+        except ValueError:
+            continue
+        if seconds > 0:
+            widths.append(timedelta(seconds=seconds))
+    return tuple(widths) or DEFAULT_WIDTHS
+
+
+__all__ = ["DEFAULT_WIDTHS", "TumblingAggregator", "WindowState", "widths_from_setting"]
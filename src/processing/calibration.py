@@ -0,0 +1,309 @@
+"""Calibración de lecturas ADC crudas mediante tablas precalculadas.
+
+Cada sensor (métrica) tiene una curva de calibración, lineal a tramos o
+polinómica, que se evalúa una sola vez al arrancar para los ``size`` valores
+posibles del ADC (1024 en el Arduino de 10 bits). Convertir una lectura es
+después indexar la tabla: O(1) por muestra y un ``take`` de NumPy por lote.
+
+Las curvas se cargan de un JSON::
+
+    {
+      "version": "suelo-v1",
+      "adc_size": 1024,
+      "sensors": {
+        "humedad_suelo": {"kind": "piecewise", "points": [[250, 100], [1023, 0]], "unit": "%"},
+        "luminosidad": {"kind": "polynomial", "coefficients": [0, 0.5, 0.01], "unit": "lux",
+                        "clip": [0, 20000]}
+      }
+    }
+
+``points`` son pares ``[cuentas, valor]`` (fuera del rango se mantiene el
+extremo) y ``coefficients`` van de menor a mayor grado. La huella SHA-256
+del JSON canónico identifica la versión en ``config_versions``. No hay
+curvas por defecto: cada sitio debe aportar su fichero.
+
+Las lecturas que no son cuentas del ADC (p. ej. la fracción de humedad
+``soil_moisture``) usan las mismas curvas evaluadas directamente
+(``evaluate`` / ``evaluate_array``) en lugar de una tabla;
+``SOIL_FRACTION_CURVE`` es la conversión fracción → %.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from src.models.batch import np, require_numpy
+
+from .pipeline import Stage
+
+logger = logging.getLogger(__name__)
+
+ADC_SIZE = 1024
+CURVE_KINDS = ("piecewise", "polynomial")
+
+
+def _safe_float(value: Any) -> Optional[float]:
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        return None
+    return numeric if math.isfinite(numeric) else None
+
+
+@dataclass(frozen=True, slots=True)
+class CalibrationCurve:
+    """Curva de un sensor: ``points`` (a tramos) o ``coefficients`` (polinomio)."""
+
+    kind: str = "piecewise"
+    points: Tuple[Tuple[float, float], ...] = ()
+    coefficients: Tuple[float, ...] = ()
+    unit: Optional[str] = None
+    clip: Optional[Tuple[float, float]] = None
+
+    def __post_init__(self) -> None:
+        if self.kind not in CURVE_KINDS:
+            raise ValueError(f"Curva desconocida: {self.kind!r} (usa {', '.join(CURVE_KINDS)})")
+        if self.kind == "piecewise":
+            xs = [x for x, _ in self.points]
+            if len(xs) < 2 or any(b <= a for a, b in zip(xs, xs[1:])):
+                raise ValueError("Una curva a tramos necesita >= 2 puntos con cuentas crecientes")
+        elif not self.coefficients:
+            raise ValueError("Una curva polinómica necesita coeficientes")
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "CalibrationCurve":
+        clip = raw.get("clip")
+        return cls(
+            kind=raw.get("kind", "piecewise"),
+            points=tuple((float(x), float(y)) for x, y in raw.get("points", ())),
+            coefficients=tuple(float(c) for c in raw.get("coefficients", ())),
+            unit=raw.get("unit"),
+            clip=(float(clip[0]), float(clip[1])) if clip else None,
+        )
+
+    def evaluate(self, counts: float) -> float:
+        if self.kind == "piecewise":
+            value = self._interpolate(counts)
+        else:
+            value = 0.0
+            for coefficient in reversed(self.coefficients):
+                value = value * counts + coefficient
+        if self.clip is not None:
+            value = min(max(value, self.clip[0]), self.clip[1])
+        return value
+
+    def evaluate_array(self, raw: Any) -> Any:
+        """``evaluate`` vectorizado (mismas operaciones, mismo resultado); NaN se mantiene NaN."""
+        require_numpy()
+        counts = np.asarray(raw, dtype=np.float64)
+        if self.kind == "piecewise":
+            xs = np.array([x for x, _ in self.points])
+            ys = np.array([y for _, y in self.points])
+            pos = np.clip(np.searchsorted(xs, counts, side="right"), 1, xs.size - 1)
+            x0, y0, x1, y1 = xs[pos - 1], ys[pos - 1], xs[pos], ys[pos]
+            values = y0 + (y1 - y0) * (counts - x0) / (x1 - x0)
+            values = np.where(counts <= xs[0], ys[0], np.where(counts >= xs[-1], ys[-1], values))
+        else:
+            values = np.zeros_like(counts)
+            for coefficient in reversed(self.coefficients):
+                values = values * counts + coefficient
+        if self.clip is not None:
+            values = np.clip(values, self.clip[0], self.clip[1])
+        return values
+
+    def _interpolate(self, counts: float) -> float:
+        points = self.points
+        if counts <= points[0][0]:
+            return points[0][1]
+        if counts >= points[-1][0]:
+            return points[-1][1]
+        pos = bisect_right([x for x, _ in points], counts)
+        (x0, y0), (x1, y1) = points[pos - 1], points[pos]
+        return y0 + (y1 - y0) * (counts - x0) / (x1 - x0)
+
+
+# Fracción de humedad de suelo (0-1) → % acotado a [0, 100].
+SOIL_FRACTION_CURVE = CalibrationCurve(kind="polynomial", coefficients=(0.0, 100.0), unit="%", clip=(0.0, 100.0))
+
+
+class CalibrationTable:
+    """Tabla densa ``cuentas → valor`` de una curva."""
+
+    __slots__ = ("curve", "table", "_array")
+
+    def __init__(self, curve: CalibrationCurve, size: int = ADC_SIZE) -> None:
+        self.curve = curve
+        self.table = array("d", (curve.evaluate(float(counts)) for counts in range(size)))
+        self._array = np.frombuffer(self.table, dtype=np.float64) if np is not None else None
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def convert(self, raw: Any) -> Optional[float]:
+        """Valor calibrado de una lectura (se redondea a la cuenta más cercana y se acota)."""
+        counts = _safe_float(raw)
+        if counts is None:
+            return None
+        last = len(self.table) - 1
+        idx = int(counts + 0.5) if counts > 0 else 0
+        return self.table[idx if idx < last else last]
+
+    def convert_array(self, raw: Any) -> Any:
+        """``convert`` vectorizado; NaN e infinitos dan NaN (``None`` en ``convert``)."""
+        require_numpy()
+        counts = np.asarray(raw, dtype=np.float64)
+        missing = ~np.isfinite(counts)
+        idx = np.clip(np.floor(np.where(missing, 0.0, counts) + 0.5), 0, len(self.table) - 1).astype(np.intp)
+        values = self._array.take(idx)
+        values[missing] = np.nan
+        return values
+
+
+class CalibrationSet:
+    """Tablas de todos los sensores configurados más su versión."""
+
+    def __init__(self, curves: Mapping[str, CalibrationCurve], *, size: int = ADC_SIZE, version: Optional[str] = None) -> None:
+        self.curves = dict(curves)
+        self.size = size
+        self.tables: Dict[str, CalibrationTable] = {name: CalibrationTable(curve, size) for name, curve in self.curves.items()}
+        self.sha256 = hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()
+        self.version = version or f"calibration-{self.sha256[:12]}"
+
+    def __contains__(self, metric: object) -> bool:
+        return metric in self.tables
+
+    def __bool__(self) -> bool:
+        return bool(self.tables)
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "CalibrationSet":
+        curves = {name: CalibrationCurve.from_dict(spec) for name, spec in raw.get("sensors", {}).items()}
+        return cls(curves, size=int(raw.get("adc_size", ADC_SIZE)), version=raw.get("version"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        sensors: Dict[str, Any] = {}
+        for name, curve in self.curves.items():
+            spec: Dict[str, Any] = {"kind": curve.kind, "unit": curve.unit}
+            if curve.kind == "piecewise":
+                spec["points"] = [list(point) for point in curve.points]
+            else:
+                spec["coefficients"] = list(curve.coefficients)
+            if curve.clip is not None:
+                spec["clip"] = list(curve.clip)
+            sensors[name] = spec
+        return {"adc_size": self.size, "sensors": sensors}
+
+    def convert(self, metric: str, raw: Any) -> Optional[float]:
+        table = self.tables.get(metric)
+        return table.convert(raw) if table is not None else _safe_float(raw)
+
+    def convert_columns(self, metrics: Any, values: Any) -> Any:
+        """Calibra las filas (formato largo) de las métricas con tabla.
+
+        Como ``convert``, una lectura no finita queda NaN aunque no haya tabla.
+        """
+        require_numpy()
+        metrics = np.asarray(metrics, dtype=object)
+        values = np.array(values, dtype=np.float64)
+        values[~np.isfinite(values)] = np.nan
+        for name, table in self.tables.items():
+            rows = metrics == name
+            if rows.any():
+                values[rows] = table.convert_array(values[rows])
+        return values
+
+    def apply(self, sample: Dict[str, Any]) -> Dict[str, Any]:
+        """Calibra una muestra en formato largo: ``value`` calibrado y ``value_adc`` con las cuentas.
+
+        Las muestras que ya traen ``value_adc`` se consideran calibradas.
+        """
+        table = self.tables.get(sample.get("metric"))  # type: ignore[arg-type]
+        if table is None or "value_adc" in sample:
+            return sample
+        raw = sample.get("value")
+        sample["value_adc"] = raw
+        sample["value"] = table.convert(raw)
+        if table.curve.unit:
+            sample["unit"] = table.curve.unit
+        return sample
+
+    def record_version(self, store: Any, node_id: Optional[str] = None) -> Optional[int]:
+        """Registra la versión en ``config_versions`` si su huella aún no está."""
+        if store is None or store.find_config_version(self.sha256):
+            return None
+        payload: Dict[str, Any] = {
+            "version_tag": self.version,
+            "sha256": self.sha256,
+            "payload": {"calibration": self.to_dict()},
+            "notes": f"calibración: {', '.join(sorted(self.tables))}",
+        }
+        if node_id:
+            payload["node_id"] = node_id
+        return store.save_config_version(payload)
+
+
+class CalibrationStage(Stage):
+    """Etapa que calibra lecturas crudas (formato largo o columnas anchas)."""
+
+    name = "calibration"
+
+    def __init__(self, calibration: CalibrationSet) -> None:
+        self.calibration = calibration
+        self.reads = ("metric", "value", *calibration.tables)
+        self.writes = ("value", "value_adc", "unit", *calibration.tables, *(f"{name}_adc" for name in calibration.tables))
+
+    def process(self, sample: Dict[str, Any]) -> Dict[str, Any]:
+        if "metric" in sample and "value" in sample:
+            return self.calibration.apply(sample)
+        for name, table in self.calibration.tables.items():
+            if name in sample and f"{name}_adc" not in sample:
+                sample[f"{name}_adc"] = sample[name]
+                sample[name] = table.convert(sample[name])
+        return sample
+
+
+def load_calibration(path: Optional[str]) -> CalibrationSet:
+    """Carga las curvas de ``path``; sin fichero (o inválido) no se calibra nada."""
+    if not path:
+        return CalibrationSet({})
+    try:
+        raw = json.loads(Path(path).read_text(encoding="utf-8"))
+        return CalibrationSet.from_dict(raw)
+    except FileNotFoundError:
+        logger.info("Sin fichero de calibración en %s; se publican cuentas crudas", path)
+    except (OSError, ValueError, TypeError) as exc:
+        logger.warning("Calibración %s descartada: %s", path, exc)
+    return CalibrationSet({})
+
+
+_calibration: Optional[CalibrationSet] = None
+
+
+def get_calibration() -> CalibrationSet:
+    """Calibración compartida (colector y procesamiento), cargada una vez."""
+    global _calibration
+    if _calibration is None:
+        from src.config import load_settings
+
+        _calibration = load_calibration(load_settings().calibration_path)
+    return _calibration
+
+
+__all__ = [
+    "ADC_SIZE",
+    "CalibrationCurve",
+    "CalibrationSet",
+    "CalibrationStage",
+    "CalibrationTable",
+    "SOIL_FRACTION_CURVE",
+    "get_calibration",
+    "load_calibration",
+]
@@ -0,0 +1,134 @@
+"""Filtro de banda muerta (report-by-exception) antes de publicar.
+
+Una lectura sólo sigue aguas abajo si difiere de la última *publicada* del
+mismo ``(node_id, metric)`` en más de ``absolute`` unidades o ``relative``
+(fracción del último valor), si cambia su ``quality``, o si han pasado
+``max_silence`` sin publicar nada (latido). El resto se descarta, ahorrando
+escrituras en la SD, puntos en Influx y bytes por enlaces móviles.
+
+``latest()`` conserva el último valor *leído* (publicado o no) para los
+consumidores locales, y ``stats()`` da la tasa de supresión.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from src.timeutils import sample_ts_ns, timedelta_ns
+
+from .pipeline import Stage
+
+
+@dataclass(frozen=True, slots=True)
+class DeadbandRule:
+    """Umbrales de una métrica; sin ``absolute`` ni ``relative`` publica todo."""
+
+    absolute: Optional[float] = None
+    relative: Optional[float] = None
+    max_silence: timedelta = timedelta(minutes=15)
+
+    def exceeded(self, previous: float, value: float) -> bool:
+        if self.absolute is None and self.relative is None:
+            return True
+        delta = abs(value - previous)
+        if self.absolute is not None and delta > self.absolute:
+            return True
+        return self.relative is not None and delta > self.relative * abs(previous)
+
+
+@dataclass(slots=True)
+class _LastPublished:
+    value: float
+    ts_ns: int
+    quality: Any
+
+
+def _safe_float(value: Any) -> Optional[float]:
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(numeric) else numeric
+
+
+class DeadbandFilter(Stage):
+    """Etapa que descarta lecturas sin cambio significativo (formato largo).
+
+    ``rules`` asigna una ``DeadbandRule`` por métrica; las demás usan
+    ``default`` (``None``: se publican siempre). Las muestras sin
+    ``metric``/``value`` numérico pasan sin filtrar.
+    """
+
+    name = "deadband"
+    reads = ("ts_ns", "node_id", "metric", "value", "quality")
+
+    def __init__(self, rules: Optional[Mapping[str, DeadbandRule]] = None, *, default: Optional[DeadbandRule] = None) -> None:
+        self.rules: Dict[str, DeadbandRule] = dict(rules or {})
+        self.default = default
+        self._published: Dict[Tuple[str, str], _LastPublished] = {}
+        self._latest: Dict[Tuple[str, str], Any] = {}
+        self.passed = 0
+        self.suppressed = 0
+        self.heartbeats = 0
+
+    def process(self, sample: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        metric = sample.get("metric")
+        value = _safe_float(sample.get("value"))
+        if metric is None or value is None:
+            self.passed += 1
+            return sample
+        key = (sample.get("node_id") or "", metric)
+        self._latest[key] = sample.get("value")
+        rule = self.rules.get(metric, self.default)
+        ts_ns = sample_ts_ns(sample)
+        quality = sample.get("quality")
+        last = self._published.get(key)
+        if rule is not None and last is not None and quality == last.quality:
+            if ts_ns - last.ts_ns >= timedelta_ns(rule.max_silence):
+                self.heartbeats += 1
+            elif not rule.exceeded(last.value, value):
+                self.suppressed += 1
+                return None
+        if last is None:
+            self._published[key] = _LastPublished(value, ts_ns, quality)
+        else:
+            last.value, last.ts_ns, last.quality = value, ts_ns, quality
+        self.passed += 1
+        return sample
+
+    def latest(self, node_id: Optional[str] = None) -> Dict[str, Any]:
+        """Último valor leído por métrica (de ``node_id`` o de todos los nodos)."""
+        return {metric: value for (node, metric), value in self._latest.items() if node_id is None or node == node_id}
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.passed + self.suppressed
+        return {
+            "passed": self.passed,
+            "suppressed": self.suppressed,
+            "heartbeats": self.heartbeats,
+            "suppression_ratio": round(self.suppressed / total, 4) if total else 0.0,
+        }
+
+
+def rules_from_setting(raw: str, *, max_silence: timedelta = timedelta(minutes=15)) -> Dict[str, DeadbandRule]:
+    """``"temp_aire:0.2,luminosidad:5%"`` → reglas absolutas o relativas (``%``) por métrica."""
+    rules: Dict[str, DeadbandRule] = {}
+    for item in raw.split(","):
+        metric, _, threshold = item.strip().partition(":")
+        threshold = threshold.strip()
+        if not metric or not threshold:
+            continue
+        try:
+            if threshold.endswith("%"):
+                rules[metric] = DeadbandRule(relative=float(threshold[:-1]) / 100.0, max_silence=max_silence)
+            else:
+                rules[metric] = DeadbandRule(absolute=float(threshold), max_silence=max_silence)
+        except ValueError:
+            continue
+    return rules
+
+
+__all__ = ["DeadbandFilter", "DeadbandRule", "rules_from_setting"]
@@ -0,0 +1,295 @@
+"""Filtros de ruido por ``(node_id, metric)`` con coste constante por muestra.
+
+* ``median``: mediana móvil de las últimas ``window`` lecturas. La ventana
+  se guarda en orden de llegada (para saber qué valor sale) y ordenada en un
+  ``SortedWindow`` (inserción y borrado O(log k) + ``memmove``), así que la
+  mediana es un acceso directo. Elimina picos aislados del ADC.
+* ``kalman``: filtro de Kalman escalar con modelo de paseo aleatorio
+  (``q``: varianza del proceso por muestra, ``r``: varianza de la medida).
+  Dos multiplicaciones y una división por lectura.
+
+Cada métrica elige con ``output`` dónde va la señal filtrada: ``"value"``
+sustituye la lectura (la cruda queda en ``value_raw`` o ``<métrica>_raw``)
+para que los detectores trabajen sobre la señal limpia; ``"filtered"`` la
+añade en ``value_filtered`` o ``<métrica>_filtered`` sin tocar la original.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from src.models.batch import np, require_numpy
+from src.models.order_stats import SortedWindow
+
+from .pipeline import Stage
+
+FILTER_KINDS = ("median", "kalman")
+OUTPUTS = ("value", "filtered")
+
+_MAGIC = b"NDF1"
+_COUNT = struct.Struct("<I")
+_NAME = struct.Struct("<H")
+_KALMAN = struct.Struct("<dd")
+
+
+def _safe_float(value: Any) -> Optional[float]:
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(numeric) else numeric
+
+
+@dataclass(frozen=True, slots=True)
+class FilterSpec:
+    """Configuración del filtro de una métrica."""
+
+    kind: str = "median"
+    window: int = 5
+    q: float = 1.0
+    r: float = 16.0
+    output: str = "value"
+
+    def __post_init__(self) -> None:
+        if self.kind not in FILTER_KINDS:
+            raise ValueError(f"Filtro desconocido: {self.kind!r} (usa {', '.join(FILTER_KINDS)})")
+        if self.output not in OUTPUTS:
+            raise ValueError(f"Salida desconocida: {self.output!r} (usa {', '.join(OUTPUTS)})")
+        if self.window < 1:
+            raise ValueError("La mediana móvil necesita window >= 1")
+        if self.q < 0 or self.r <= 0:
+            raise ValueError("Kalman necesita q >= 0 y r > 0")
+
+    def build(self) -> Union["RunningMedian", "ScalarKalman"]:
+        if self.kind == "median":
+            return RunningMedian(self.window)
+        return ScalarKalman(self.q, self.r)
+
+
+class RunningMedian:
+    """Mediana de las últimas ``window`` lecturas en O(log k)."""
+
+    __slots__ = ("window", "_arrivals", "_sorted")
+
+    kind = "median"
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._arrivals: Deque[float] = deque()
+        self._sorted = SortedWindow()
+
+    def update(self, value: float) -> float:
+        self._arrivals.append(value)
+        self._sorted.add(value)
+        if len(self._arrivals) > self.window:
+            self._sorted.remove(self._arrivals.popleft())
+        return self._sorted.median()
+
+    def to_bytes(self) -> bytes:
+        return _COUNT.pack(len(self._arrivals)) + array("d", self._arrivals).tobytes()
+
+    def restore(self, blob: bytes, offset: int) -> int:
+        (count,) = _COUNT.unpack_from(blob, offset)
+        offset += _COUNT.size
+        values = array("d")
+        values.frombytes(blob[offset:offset + 8 * count])
+        kept = values.tolist()[-self.window:]
+        self._arrivals = deque(kept)
+        self._sorted = SortedWindow(kept)
+        return offset + 8 * count
+
+
+class ScalarKalman:
+    """Kalman 1-D con modelo de paseo aleatorio; arranca en la primera lectura."""
+
+    __slots__ = ("q", "r", "estimate", "variance")
+
+    kind = "kalman"
+
+    def __init__(self, q: float, r: float) -> None:
+        self.q = q
+        self.r = r
+        self.estimate = math.nan
+        self.variance = math.nan
+
+    def update(self, value: float) -> float:
+        if math.isnan(self.estimate):
+            self.estimate, self.variance = value, self.r
+            return value
+        predicted = self.variance + self.q
+        gain = predicted / (predicted + self.r)
+        self.estimate += gain * (value - self.estimate)
+        self.variance = (1.0 - gain) * predicted
+        return self.estimate
+
+    def to_bytes(self) -> bytes:
+        return _KALMAN.pack(self.estimate, self.variance)
+
+    def restore(self, blob: bytes, offset: int) -> int:
+        self.estimate, self.variance = _KALMAN.unpack_from(blob, offset)
+        return offset + _KALMAN.size
+
+
+class DenoiseStage(Stage):
+    """Etapa que filtra las métricas configuradas en ``specs``.
+
+    En formato largo filtra ``value`` cuando ``metric`` está en ``specs``; en
+    muestras anchas, cada columna configurada presente en la muestra.
+    """
+
+    name = "denoise"
+
+    def __init__(self, specs: Mapping[str, FilterSpec]) -> None:
+        self.specs: Dict[str, FilterSpec] = dict(specs)
+        self.reads = ("node_id", "metric", "value", *self.specs)
+        self.writes = ("value", "value_raw", "value_filtered", *self._wide_writes())
+        self._filters: Dict[Tuple[str, str], Union[RunningMedian, ScalarKalman]] = {}
+
+    def _wide_writes(self) -> List[str]:
+        names = []
+        for metric, spec in self.specs.items():
+            names += [metric, f"{metric}_raw"] if spec.output == "value" else [f"{metric}_filtered"]
+        return names
+
+    def update(self, node_id: str, metric: str, value: float) -> float:
+        """Filtra una lectura (la métrica debe estar en ``specs``)."""
+        key = (node_id, metric)
+        state = self._filters.get(key)
+        if state is None:
+            state = self._filters[key] = self.specs[metric].build()
+        return state.update(value)
+
+    def process(self, sample: Dict[str, Any]) -> Dict[str, Any]:
+        node_id = sample.get("node_id") or ""
+        metric = sample.get("metric")
+        if isinstance(metric, str) and "value" in sample:
+            spec = self.specs.get(metric)
+            value = _safe_float(sample["value"]) if spec is not None else None
+            if value is not None:
+                self._write(sample, "value", spec, value, self.update(node_id, metric, value))
+            return sample
+        for metric, spec in self.specs.items():
+            value = _safe_float(sample.get(metric))
+            if value is not None:
+                self._write(sample, metric, spec, value, self.update(node_id, metric, value))
+        return sample
+
+    def filter_columns(self, node_ids: Sequence[Any], metrics: Sequence[Any], values: Any) -> Dict[str, Any]:
+        """Versión por columnas del formato largo, fila a fila en el orden dado.
+
+        Devuelve ``value`` (con las métricas ``output="value"`` ya filtradas)
+        y, si alguna métrica las usa, ``value_raw`` y ``value_filtered``
+        (NaN en las filas sin filtro ``"filtered"``).
+        """
+        require_numpy()
+        values = np.asarray(values, dtype=np.float64)
+        rows = np.flatnonzero(np.isin(metrics, list(self.specs)) & ~np.isnan(values))
+        filtered = values.copy()
+        side = np.full(values.size, np.nan)
+        replaced = False
+        for idx, node_id, metric, value in zip(
+            rows.tolist(), np.asarray(node_ids)[rows].tolist(), np.asarray(metrics)[rows].tolist(), values[rows].tolist()
+        ):
+            smooth = self.update(node_id or "", metric, value)
+            if self.specs[metric].output == "value":
+                filtered[idx] = smooth
+                replaced = True
+            else:
+                side[idx] = smooth
+        columns: Dict[str, Any] = {"value": filtered}
+        if replaced:
+            columns["value_raw"] = values
+        if not np.isnan(side).all():
+            columns["value_filtered"] = side
+        return columns
+
+    def reset(self) -> None:
+        self._filters.clear()
+
+    def to_bytes(self) -> bytes:
+        parts = [_MAGIC, _COUNT.pack(len(self._filters))]
+        for (node_id, metric), state in self._filters.items():
+            for name in (node_id, metric, state.kind):
+                encoded = name.encode("utf-8")
+                parts.append(_NAME.pack(len(encoded)) + encoded)
+            parts.append(state.to_bytes())
+        return b"".join(parts)
+
+    def restore_bytes(self, blob: bytes) -> int:
+        """Recupera los filtros guardados; descarta los de métricas o tipos ya no configurados."""
+        if blob[:4] != _MAGIC:
+            raise ValueError("Estado de filtros no reconocido")
+        (count,) = _COUNT.unpack_from(blob, 4)
+        offset = 4 + _COUNT.size
+        filters: Dict[Tuple[str, str], Union[RunningMedian, ScalarKalman]] = {}
+        for _ in range(count):
+            names = []
+            for _ in range(3):
+                (size,) = _NAME.unpack_from(blob, offset)
+                offset += _NAME.size
+                names.append(blob[offset:offset + size].decode("utf-8"))
+                offset += size
+            node_id, metric, kind = names
+            if kind not in FILTER_KINDS:
+                raise ValueError(f"Filtro guardado desconocido: {kind!r}")
+            spec = self.specs.get(metric)
+            keep = spec is not None and spec.kind == kind
+            state = (spec if keep else FilterSpec(kind=kind)).build()
+            offset = state.restore(blob, offset)
+            if keep:
+                filters[(node_id, metric)] = state
+        self._filters = filters
+        return len(filters)
+
+    @staticmethod
+    def _write(sample: Dict[str, Any], column: str, spec: FilterSpec, raw: float, smooth: float) -> None:
+        if spec.output == "value":
+            sample[f"{column}_raw"] = raw
+            sample[column] = smooth
+        else:
+            sample[f"{column}_filtered"] = smooth
+
+
+def specs_from_setting(raw: str) -> Dict[str, FilterSpec]:
+    """``"humedad_suelo:median:window=5,luminosidad:kalman:q=1:r=16:output=filtered"`` → filtros por métrica.
+
+    Las entradas mal formadas se ignoran.
+    """
+    specs: Dict[str, FilterSpec] = {}
+    for item in raw.split(","):
+        metric, _, rest = item.strip().partition(":")
+        if not metric or not rest:
+            continue
+        kind, *options = rest.split(":")
+        kwargs: Dict[str, Any] = {"kind": kind.strip()}
+        try:
+            for option in options:
+                key, _, value = option.partition("=")
+                key = key.strip()
+                if key == "window":
+                    kwargs[key] = int(value)
+                elif key in ("q", "r"):
+                    kwargs[key] = float(value)
+                elif key == "output":
+                    kwargs[key] = value.strip()
+                else:
+                    raise ValueError(key)
+            specs[metric] = FilterSpec(**kwargs)
+        except ValueError:
+            continue
+    return specs
+
+
+__all__ = [
+    "DenoiseStage",
+    "FILTER_KINDS",
+    "FilterSpec",
+    "RunningMedian",
+    "ScalarKalman",
+    "specs_from_setting",
+]
@@ -0,0 +1,292 @@
+"""Indicadores agronómicos: VPD, punto de rocío, grados-día (GDD) y ET0 FAO-56.
+
+Las fórmulas aceptan escalares (``math``) o arrays NumPy (vectorizadas), de
+modo que la misma función sirve muestra a muestra y por lotes:
+
+* Presión de vapor de saturación (FAO-56, ec. 11) y déficit ``VPD = es - ea``.
+* Punto de rocío con la fórmula de Magnus (mismas constantes).
+* GDD diario por el método de la media: ``max(0, (Tmax* + Tmin)/2 - Tbase)``
+  con ``Tmax*`` acotada a ``upper_c``; se acumula por nodo y día local.
+* ET0 horaria de Penman-Monteith (FAO-56, ec. 53) con radiación neta
+  aproximada ``Rn = 0.77·Rs`` y ``G = 0.1·Rn``; sin viento medido se usa
+  ``u2 = 2 m/s`` (recomendación FAO-56). El acumulado diario integra la tasa
+  entre muestras (huecos de más de ``max_gap`` no cuentan).
+
+``IndicatorStage`` añade los campos a las muestras anchas del pipeline y
+guarda los acumuladores diarios por nodo (``to_bytes``/``restore_bytes``)
+para conservarlos entre reinicios.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from src.models.batch import np
+from src.timeutils import sample_ts_ns, timedelta_ns
+
+from .pipeline import Stage
+
+DAY_NS = 86_400 * 1_000_000_000
+# Luz solar: ~126.7 lux por W/m² (aproximación habitual para radiación global).
+LUX_PER_WM2 = 126.7
+DEFAULT_WIND_MS = 2.0
+
+_MAGIC = b"NIX1"
+_COUNT = struct.Struct("<I")
+_NAME = struct.Struct("<H")
+_ENTRY = struct.Struct("<qqdddd")
+_ARRAY = np.ndarray if np is not None else ()
+
+
+def _exp(value: Any) -> Any:
+    return np.exp(value) if isinstance(value, _ARRAY) else math.exp(value)
+
+
+def _log(value: Any) -> Any:
+    return np.log(value) if isinstance(value, _ARRAY) else math.log(value)
+
+
+def _maximum(value: Any, floor: float) -> Any:
+    return np.maximum(value, floor) if isinstance(value, _ARRAY) else max(value, floor)
+
+
+def saturation_vapor_pressure(temp_c: Any) -> Any:
+    """``e°(T)`` en kPa (FAO-56, ec. 11)."""
+    return 0.6108 * _exp(17.27 * temp_c / (temp_c + 237.3))
+
+
+def vapor_pressure_deficit(temp_c: Any, rh_pct: Any) -> Any:
+    """Déficit de presión de vapor (kPa)."""
+    return saturation_vapor_pressure(temp_c) * (1.0 - rh_pct / 100.0)
+
+
+def dew_point(temp_c: Any, rh_pct: Any) -> Any:
+    """Punto de rocío (°C) por Magnus; la humedad se acota a [1, 100] %."""
+    if isinstance(rh_pct, _ARRAY):
+        rh_pct = np.clip(rh_pct, 1.0, 100.0)
+    else:
+        rh_pct = min(max(rh_pct, 1.0), 100.0)
+    gamma = _log(rh_pct / 100.0) + 17.27 * temp_c / (temp_c + 237.3)
+    return 237.3 * gamma / (17.27 - gamma)
+
+
+def growing_degree_days(tmin_c: Any, tmax_c: Any, base_c: float = 10.0, upper_c: float = 30.0) -> Any:
+    """GDD de un día por el método de la media con ``Tmax`` acotada a ``upper_c``."""
+    if isinstance(tmax_c, _ARRAY):
+        tmax_c = np.minimum(tmax_c, upper_c)
+    else:
+        tmax_c = min(tmax_c, upper_c)
+    return _maximum((tmax_c + tmin_c) / 2.0 - base_c, 0.0)
+
+
+def pressure_from_altitude(altitude_m: float) -> float:
+    """Presión atmosférica (kPa) a ``altitude_m`` (FAO-56, ec. 7)."""
+    return 101.3 * ((293.0 - 0.0065 * altitude_m) / 293.0) ** 5.26
+
+
+def et0_hourly(
+    temp_c: Any,
+    rh_pct: Any,
+    radiation_wm2: Any,
+    wind_ms: Any = DEFAULT_WIND_MS,
+    pressure_kpa: float = 101.3,
+) -> Any:
+    """ET0 de referencia (mm/h) por Penman-Monteith horario (FAO-56, ec. 53)."""
+    es = saturation_vapor_pressure(temp_c)
+    ea = es * rh_pct / 100.0
+    delta = 4098.0 * es / (temp_c + 237.3) ** 2
+    psychro = 0.000665 * pressure_kpa
+    # W/m² → MJ/(m²·h); albedo 0.23 y flujo de suelo diurno G = 0.1·Rn.
+    rn = 0.77 * radiation_wm2 * 0.0036
+    available = 0.9 * rn
+    numerator = 0.408 * delta * available + psychro * (37.0 / (temp_c + 273.0)) * wind_ms * (es - ea)
+    denominator = delta + psychro * (1.0 + 0.34 * wind_ms)
+    return _maximum(numerator / denominator, 0.0)
+
+
+def compute(
+    temp_c: Any,
+    rh_pct: Any,
+    radiation_wm2: Any = None,
+    wind_ms: Any = None,
+    *,
+    pressure_kpa: float = 101.3,
+) -> Dict[str, Any]:
+    """Indicadores instantáneos (escalares o arrays); ``et0_mm_h`` sólo con radiación."""
+    result = {
+        "vpd_kpa": vapor_pressure_deficit(temp_c, rh_pct),
+        "dew_point_c": dew_point(temp_c, rh_pct),
+        "et0_mm_h": None,
+    }
+    if radiation_wm2 is not None:
+        wind = DEFAULT_WIND_MS if wind_ms is None else wind_ms
+        result["et0_mm_h"] = et0_hourly(temp_c, rh_pct, radiation_wm2, wind, pressure_kpa)
+    return result
+
+
+def _safe_float(value: Any) -> Optional[float]:
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(numeric) else numeric
+
+
+def _radiation(sample: Dict[str, Any]) -> Optional[float]:
+    radiation = _safe_float(sample.get("solar_radiation_wm2"))
+    if radiation is None:
+        lux = _safe_float(sample.get("light_lux"))
+        radiation = None if lux is None else lux / LUX_PER_WM2
+    return None if radiation is None else max(radiation, 0.0)
+
+
+@dataclass(slots=True)
+class DailyAccumulator:
+    """Acumuladores de un nodo para el día local en curso."""
+
+    day: int
+    last_ts_ns: int
+    tmin: float = math.inf
+    tmax: float = -math.inf
+    gdd_closed: float = 0.0
+    et0_mm: float = 0.0
+
+    def gdd_today(self, base_c: float, upper_c: float) -> float:
+        if self.tmin > self.tmax:
+            return 0.0
+        return growing_degree_days(self.tmin, self.tmax, base_c, upper_c)
+
+
+class IndicatorStage(Stage):
+    """Añade VPD, punto de rocío, GDD y ET0 a las muestras anchas.
+
+    Necesita ``air_temp_c`` y ``air_humidity_pct``; la radiación se toma de
+    ``solar_radiation_wm2`` o ``light_lux`` y el viento de ``wind_speed_ms``.
+    Las muestras sin temperatura/humedad (p. ej. formato largo) pasan sin
+    cambios.
+    """
+
+    name = "indicators"
+    reads = ("ts_ns", "node_id", "air_temp_c", "air_humidity_pct", "solar_radiation_wm2", "light_lux", "wind_speed_ms")
+    writes = ("vpd_kpa", "dew_point_c", "gdd_today", "gdd_total", "et0_mm_h", "et0_today_mm")
+
+    def __init__(
+        self,
+        *,
+        base_c: float = 10.0,
+        upper_c: float = 30.0,
+        altitude_m: float = 0.0,
+        utc_offset: timedelta = timedelta(0),
+        max_gap: timedelta = timedelta(hours=1),
+    ) -> None:
+        self.base_c = base_c
+        self.upper_c = upper_c
+        self.pressure_kpa = pressure_from_altitude(altitude_m)
+        self._offset_ns = timedelta_ns(utc_offset)
+        self._max_gap_ns = timedelta_ns(max_gap)
+        self._days: Dict[str, DailyAccumulator] = {}
+
+    def process(self, sample: Dict[str, Any]) -> Dict[str, Any]:
+        temp = _safe_float(sample.get("air_temp_c"))
+        rh = _safe_float(sample.get("air_humidity_pct"))
+        if temp is None or rh is None:
+            return sample
+        wind = _safe_float(sample.get("wind_speed_ms"))
+        values = compute(temp, rh, _radiation(sample), wind, pressure_kpa=self.pressure_kpa)
+        self._write(sample, values["vpd_kpa"], values["dew_point_c"], values["et0_mm_h"], temp)
+        return sample
+
+    def process_batch(self, samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Calcula los indicadores instantáneos del lote con NumPy y acumula fila a fila."""
+        if np is None or len(samples) < 2:
+            return [self.process(sample) for sample in samples]
+        temp = np.array([_safe_float(sample.get("air_temp_c")) for sample in samples], dtype=np.float64)
+        rh = np.array([_safe_float(sample.get("air_humidity_pct")) for sample in samples], dtype=np.float64)
+        radiation = np.array([_radiation(sample) for sample in samples], dtype=np.float64)
+        wind = np.array([_safe_float(sample.get("wind_speed_ms")) for sample in samples], dtype=np.float64)
+        wind = np.where(np.isnan(wind), DEFAULT_WIND_MS, wind)
+        values = compute(temp, rh, np.nan_to_num(radiation), wind, pressure_kpa=self.pressure_kpa)
+        et0 = np.where(np.isnan(radiation), np.nan, values["et0_mm_h"])
+        rows = zip(samples, temp.tolist(), values["vpd_kpa"].tolist(), values["dew_point_c"].tolist(), et0.tolist())
+        for sample, row_temp, vpd, dew, rate in rows:
+            if not math.isnan(vpd):
+                self._write(sample, vpd, dew, None if math.isnan(rate) else rate, row_temp)
+        return samples
+
+    def accumulators(self, node_id: str) -> Optional[DailyAccumulator]:
+        return self._days.get(node_id)
+
+    def to_bytes(self) -> bytes:
+        parts = [_MAGIC, _COUNT.pack(len(self._days))]
+        for node_id, acc in self._days.items():
+            name = node_id.encode("utf-8")
+            parts.append(_NAME.pack(len(name)) + name)
+            parts.append(_ENTRY.pack(acc.day, acc.last_ts_ns, acc.tmin, acc.tmax, acc.gdd_closed, acc.et0_mm))
+        return b"".join(parts)
+
+    def restore_bytes(self, blob: bytes) -> int:
+        if blob[:4] != _MAGIC:
+            raise ValueError("Estado de indicadores no reconocido")
+        (count,) = _COUNT.unpack_from(blob, 4)
+        offset = 4 + _COUNT.size
+        days: Dict[str, DailyAccumulator] = {}
+        for _ in range(count):
+            (size,) = _NAME.unpack_from(blob, offset)
+            offset += _NAME.size
+            node_id = blob[offset:offset + size].decode("utf-8")
+            offset += size
+            days[node_id] = DailyAccumulator(*_ENTRY.unpack_from(blob, offset))
+            offset += _ENTRY.size
+        self._days = days
+        return count
+
+    def _write(self, sample: Dict[str, Any], vpd: float, dew: float, et0_rate: Optional[float], temp: float) -> None:
+        acc = self._accumulate(sample, temp, et0_rate)
+        gdd_today = acc.gdd_today(self.base_c, self.upper_c)
+        sample["vpd_kpa"] = round(vpd, 3)
+        sample["dew_point_c"] = round(dew, 2)
+        sample["gdd_today"] = round(gdd_today, 2)
+        sample["gdd_total"] = round(acc.gdd_closed + gdd_today, 2)
+        sample["et0_mm_h"] = None if et0_rate is None else round(et0_rate, 4)
+        sample["et0_today_mm"] = round(acc.et0_mm, 3)
+
+    def _accumulate(self, sample: Dict[str, Any], temp: float, et0_rate: Optional[float]) -> DailyAccumulator:
+        ts_ns = sample_ts_ns(sample)
+        node_id = sample.get("node_id") or ""
+        day = (ts_ns + self._offset_ns) // DAY_NS
+        acc = self._days.get(node_id)
+        if acc is None:
+            acc = self._days[node_id] = DailyAccumulator(day, ts_ns)
+        elif day > acc.day:
+            # Cierra el día anterior: su GDD pasa al acumulado de temporada.
+            acc.gdd_closed += acc.gdd_today(self.base_c, self.upper_c)
+            acc.day, acc.tmin, acc.tmax, acc.et0_mm = day, math.inf, -math.inf, 0.0
+        elif day < acc.day:
+            return acc  # muestra de un día ya cerrado: no altera los acumulados
+        if temp < acc.tmin:
+            acc.tmin = temp
+        if temp > acc.tmax:
+            acc.tmax = temp
+        elapsed = ts_ns - acc.last_ts_ns
+        if et0_rate is not None and 0 < elapsed <= self._max_gap_ns:
+            acc.et0_mm += et0_rate * elapsed / 3.6e12
+        if ts_ns > acc.last_ts_ns:
+            acc.last_ts_ns = ts_ns
+        return acc
+
+
+__all__ = [
+    "DailyAccumulator",
+    "IndicatorStage",
+    "compute",
+    "dew_point",
+    "et0_hourly",
+    "growing_degree_days",
+    "pressure_from_altitude",
+    "saturation_vapor_pressure",
+    "vapor_pressure_deficit",
+]
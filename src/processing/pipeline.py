@@ -0,0 +1,228 @@
+"""Pipeline de procesamiento por etapas encadenadas como generadores.
+
+Cada etapa (``Stage``) se declara una vez con los campos que lee
+(``reads``) y escribe (``writes``) y transforma la muestra *en sitio*: añadir
+un indicador sólo cuesta su propio cálculo, sin copiar el dict. ``Pipeline``
+encadena las etapas sobre un flujo de muestras (``run``), sobre micro-lotes
+(``run_batches``) o muestra a muestra (``process``/``feed``), y lleva
+contadores de tiempo por etapa (``stats``).
+
+Una etapa puede descartar la muestra devolviendo ``None``; las que retienen
+muestras (p. ej. ventanas o buffers de reordenación) declaran
+``fanout = True``, devuelven una lista de 0..n muestras y entregan lo
+pendiente en ``flush``.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Sample = Any
+
+
+class Stage:
+    """Etapa base: ``process`` recibe una muestra y devuelve la misma (o ``None``)."""
+
+    name: str = ""
+    reads: Tuple[str, ...] = ()
+    writes: Tuple[str, ...] = ()
+    fanout: bool = False
+
+    def process(self, sample: Sample) -> Any:
+        return sample
+
+    def process_batch(self, samples: List[Sample]) -> List[Sample]:
+        """Micro-lote; las etapas vectorizables pueden sobrescribirlo."""
+        process = self.process
+        if self.fanout:
+            return [out for sample in samples for out in process(sample)]
+        return [out for out in map(process, samples) if out is not None]
+
+    def flush(self) -> List[Sample]:
+        """Muestras retenidas que deben salir al cerrar el flujo."""
+        return []
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class FunctionStage(Stage):
+    """Etapa a partir de una función ``sample -> sample | None``."""
+
+    def __init__(
+        self,
+        func: Callable[[Sample], Any],
+        *,
+        name: Optional[str] = None,
+        reads: Sequence[str] = (),
+        writes: Sequence[str] = (),
+    ) -> None:
+        self.func = func
+        self.name = name or func.__name__.lstrip("_")
+        self.reads = tuple(reads)
+        self.writes = tuple(writes)
+
+    def process(self, sample: Sample) -> Any:
+        return self.func(sample)
+
+
+def stage(
+    *, name: Optional[str] = None, reads: Sequence[str] = (), writes: Sequence[str] = ()
+) -> Callable[[Callable[[Sample], Any]], FunctionStage]:
+    """Decorador que convierte una función en ``FunctionStage``."""
+
+    def wrap(func: Callable[[Sample], Any]) -> FunctionStage:
+        return FunctionStage(func, name=name, reads=reads, writes=writes)
+
+    return wrap
+
+
+@dataclass(slots=True)
+class StageStats:
+    """Contadores de una etapa: muestras recibidas/emitidas y tiempo acumulado."""
+
+    name: str
+    received: int = 0
+    emitted: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "emitted": self.emitted,
+            "dropped": max(self.received - self.emitted, 0),
+            "seconds": round(self.seconds, 6),
+            "us_per_sample": round(self.seconds / self.received * 1e6, 3) if self.received else 0.0,
+        }
+
+
+class Pipeline:
+    """Cadena de etapas con validación de campos y contadores por etapa.
+
+    Si se indica ``inputs`` (campos que trae la muestra de entrada), cada
+    etapa debe leer sólo campos de ``inputs`` o escritos por etapas previas.
+    """
+
+    def __init__(self, stages: Iterable[Stage], *, inputs: Optional[Iterable[str]] = None) -> None:
+        self.stages: Tuple[Stage, ...] = tuple(stages)
+        names = [item.name for item in self.stages]
+        duplicated = sorted({name for name in names if names.count(name) > 1})
+        if duplicated:
+            raise ValueError(f"Etapas con nombre repetido: {', '.join(duplicated)}")
+        if inputs is not None:
+            available = set(inputs)
+            for item in self.stages:
+                missing = [field for field in item.reads if field not in available]
+                if missing:
+                    raise ValueError(f"La etapa {item.name!r} lee campos que nadie escribe: {', '.join(missing)}")
+                available.update(item.writes)
+        self._stats = [StageStats(item.name) for item in self.stages]
+        self._fanout = any(item.fanout for item in self.stages)
+
+    @property
+    def writes(self) -> Tuple[str, ...]:
+        """Campos que añade el pipeline completo, en orden de escritura."""
+        return tuple(dict.fromkeys(field for item in self.stages for field in item.writes))
+
+    def process(self, sample: Sample) -> Optional[Sample]:
+        """Pasa una muestra por todas las etapas (pipelines sin ``fanout``)."""
+        if self._fanout:
+            raise TypeError("El pipeline tiene etapas con fanout: usa feed()")
+        clock = time.perf_counter
+        for item, stats in zip(self.stages, self._stats):
+            started = clock()
+            sample = item.process(sample)
+            stats.seconds += clock() - started
+            stats.received += 1
+            if sample is None:
+                return None
+            stats.emitted += 1
+        return sample
+
+    def feed(self, sample: Sample) -> List[Sample]:
+        """Pasa una muestra y devuelve las que salen ya (0..n)."""
+        return self._push(0, [sample], batch=False)
+
+    def flush(self) -> List[Sample]:
+        """Vacía las etapas en orden: lo retenido en una pasa por las siguientes."""
+        emitted: List[Sample] = []
+        for index in range(len(self.stages)):
+            emitted.extend(self._push(index + 1, self._flush_stage(index), batch=False))
+        return emitted
+
+    def run(self, samples: Iterable[Sample]) -> Iterator[Sample]:
+        """Flujo de muestras procesadas; al agotarse la entrada se vacían las etapas."""
+        stream: Iterator[Sample] = iter(samples)
+        for item, stats in zip(self.stages, self._stats):
+            stream = self._stream(item, stats, stream)
+        return stream
+
+    def run_batches(self, batches: Iterable[Sequence[Sample]]) -> Iterator[List[Sample]]:
+        """Como ``run`` pero por micro-lotes (``Stage.process_batch``)."""
+        for batch in batches:
+            out = self._push(0, list(batch), batch=True)
+            if out:
+                yield out
+        tail = self.flush()
+        if tail:
+            yield tail
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stats.name: stats.as_dict() for stats in self._stats}
+
+    def reset_stats(self) -> None:
+        self._stats = [StageStats(item.name) for item in self.stages]
+
+    def _push(self, start: int, samples: List[Sample], *, batch: bool) -> List[Sample]:
+        clock = time.perf_counter
+        for index in range(start, len(self.stages)):
+            if not samples:
+                break
+            item, stats = self.stages[index], self._stats[index]
+            received = len(samples)
+            started = clock()
+            if batch or item.fanout:
+                samples = item.process_batch(samples)
+            else:
+                samples = [out for out in map(item.process, samples) if out is not None]
+            stats.seconds += clock() - started
+            stats.received += received
+            stats.emitted += len(samples)
+        return samples
+
+    def _flush_stage(self, index: int) -> List[Sample]:
+        started = time.perf_counter()
+        tail = self.stages[index].flush()
+        stats = self._stats[index]
+        stats.seconds += time.perf_counter() - started
+        stats.emitted += len(tail)
+        return tail
+
+    @staticmethod
+    def _stream(item: Stage, stats: StageStats, upstream: Iterator[Sample]) -> Iterator[Sample]:
+        clock = time.perf_counter
+        process = item.process
+        fanout = item.fanout
+        for sample in upstream:
+            started = clock()
+            out = process(sample)
+            stats.seconds += clock() - started
+            stats.received += 1
+            if out is None:
+                continue
+            if fanout:
+                stats.emitted += len(out)
+                yield from out
+            else:
+                stats.emitted += 1
+                yield out
+        started = clock()
+        tail = item.flush()
+        stats.seconds += clock() - started
+        stats.emitted += len(tail)
+        yield from tail
+
+
+__all__ = ["FunctionStage", "Pipeline", "Stage", "StageStats", "stage"]
@@ -0,0 +1,150 @@
+"""Buffer de reordenación por marca de agua (watermark).
+
+Las muestras pueden llegar desordenadas (reenvío de la cola offline, varios
+puertos serie), pero los detectores asumen tiempo monótono: una muestra
+atrasada les haría recortar la ventana entera. ``ReorderBuffer`` retiene las
+muestras en un montículo (inserción O(log n)) y sólo deja salir, en orden de
+``ts_ns``, las que quedan por debajo de la marca de agua::
+
+    watermark = max(ts visto) - allowed_lateness
+
+La marca de agua nunca baja de la última muestra emitida, así que la salida
+queda ordenada. Una muestra más antigua que la marca de agua llega tarde: va
+al canal lateral (``on_late`` o ``late_samples``) y no toca el estado de las
+etapas siguientes. Con más de ``max_pending`` muestras retenidas se adelanta
+la salida de la más antigua.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from datetime import timedelta
+from itertools import count
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.timeutils import sample_ts_ns, timedelta_ns
+
+from .pipeline import Stage
+
+
+class _Partition:
+    """Montículo y marcas de tiempo de una clave (o de todo el flujo)."""
+
+    __slots__ = ("heap", "max_ts_ns", "released_ns")
+
+    def __init__(self) -> None:
+        self.heap: List[Tuple[int, int, Dict[str, Any]]] = []
+        self.max_ts_ns: Optional[int] = None
+        self.released_ns: Optional[int] = None
+
+    def watermark(self, lateness_ns: int) -> Optional[int]:
+        if self.max_ts_ns is None:
+            return None
+        watermark = self.max_ts_ns - lateness_ns
+        return watermark if self.released_ns is None else max(watermark, self.released_ns)
+
+    def release(self) -> Dict[str, Any]:
+        ts_ns, _, sample = heapq.heappop(self.heap)
+        if self.released_ns is None or ts_ns > self.released_ns:
+            self.released_ns = ts_ns
+        return sample
+
+
+class ReorderBuffer(Stage):
+    """Etapa que emite las muestras ordenadas por tiempo con un retraso acotado.
+
+    Con ``key`` (p. ej. ``"node_id"``) cada valor de ese campo tiene su propia
+    marca de agua y su propio límite ``max_pending``: un nodo con el reloj
+    atrasado o un reenvío de otro nodo no marcan como tardías las muestras de
+    los demás. El orden de salida se garantiza entonces dentro de cada clave.
+    """
+
+    name = "reorder"
+    reads = ("ts_ns",)
+    fanout = True
+
+    def __init__(
+        self,
+        allowed_lateness: timedelta = timedelta(minutes=1),
+        *,
+        max_pending: int = 1000,
+        key: Optional[str] = None,
+        on_late: Optional[Callable[[Dict[str, Any]], None]] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        if max_pending < 1:
+            raise ValueError("ReorderBuffer necesita max_pending >= 1")
+        self.lateness_ns = timedelta_ns(allowed_lateness)
+        if self.lateness_ns < 0:
+            raise ValueError("allowed_lateness no puede ser negativo")
+        self.max_pending = max_pending
+        self.key = key
+        self.on_late = on_late
+        if name:
+            self.name = name
+        if key:
+            self.reads = ("ts_ns", key)
+        self.late_samples: Deque[Dict[str, Any]] = deque(maxlen=max_pending)
+        self._partitions: Dict[Any, _Partition] = {}
+        self._seq = count()
+        self.late = 0
+        self.forced = 0
+
+    def watermark(self, key: Any = None) -> Optional[int]:
+        """Marca de agua de ``key`` (None hasta su primera muestra)."""
+        partition = self._partitions.get(key)
+        return partition.watermark(self.lateness_ns) if partition is not None else None
+
+    def pending(self) -> int:
+        return sum(len(partition.heap) for partition in self._partitions.values())
+
+    def process(self, sample: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ts_ns = sample_ts_ns(sample)
+        key = sample.get(self.key) if self.key else None
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _Partition()
+        watermark = partition.watermark(self.lateness_ns)
+        if watermark is not None and ts_ns < watermark:
+            self._route_late(sample)
+            return []
+        heap = partition.heap
+        heapq.heappush(heap, (ts_ns, next(self._seq), sample))
+        if partition.max_ts_ns is None or ts_ns > partition.max_ts_ns:
+            partition.max_ts_ns = ts_ns
+        limit = partition.max_ts_ns - self.lateness_ns
+        out: List[Dict[str, Any]] = []
+        while heap and (heap[0][0] <= limit or len(heap) > self.max_pending):
+            if heap[0][0] > limit:
+                self.forced += 1
+            out.append(partition.release())
+        return out
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Entrega todo lo retenido en orden de tiempo (p. ej. al final de un reenvío)."""
+        entries = sorted(
+            (entry[0], entry[1], partition)
+            for partition in self._partitions.values()
+            for entry in partition.heap
+        )
+        return [partition.release() for _, _, partition in entries]
+
+    def drain_late(self) -> List[Dict[str, Any]]:
+        """Devuelve y vacía las muestras desviadas por llegar tarde."""
+        late = list(self.late_samples)
+        self.late_samples.clear()
+        return late
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": self.pending(), "late": self.late, "forced": self.forced, "keys": len(self._partitions)}
+
+    def _route_late(self, sample: Dict[str, Any]) -> None:
+        self.late += 1
+        if self.on_late is not None:
+            self.on_late(sample)
+        else:
+            self.late_samples.append(sample)
+
+
+__all__ = ["ReorderBuffer"]
@@ -2,38 +2,292 @@
 
 from __future__ import annotations
 
-from datetime import UTC, datetime
-from typing import Dict
+import logging
+import struct
+import time
+from datetime import timedelta
+from math import isnan
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
+from src.config import load_settings
 from src.models import stub as model_stub
+from src.models.batch import as_epoch_ns, as_float_values, np, require_numpy, round_like_python
+from src.models.result import ResultChain
+from src.timeutils import iso_from_ns, now_ns, sample_ts_ns
 
+from .calibration import SOIL_FRACTION_CURVE, CalibrationStage, get_calibration
+from .denoise import DenoiseStage, specs_from_setting
+from .indicators import IndicatorStage
+from .pipeline import Pipeline, stage
+from .reorder import ReorderBuffer
 
-def _iso_now() -> str:
-    return datetime.now(UTC).isoformat().replace("+00:00", "") + "Z"
+logger = logging.getLogger(__name__)
 
+_settings = load_settings()
 
-def process_sample(sample: Dict[str, float]) -> Dict[str, float]:
-    """Procesa una muestra y añade indicadores básicos + IA ligera."""
+# En formato largo, las lecturas ``soil_moisture`` (fracción) conservan ``metric``/``value``
+# y añaden el campo ``soil_moisture_pct``; los detectores de humedad trabajan en %.
+SOIL_RAW_METRIC = "soil_moisture"
+SOIL_PCT_METRIC = "soil_moisture_pct"
+DRY_THRESHOLD_PCT = 30.0
 
-    if not sample:
-        return {}
-
-    processed = dict(sample)
-    processed.setdefault("ts", _iso_now())
 
-    soil_raw = sample.get("soil_moisture", 0.0)
+def _safe_float(value: Any) -> float | None:
     try:
-        soil_pct = float(soil_raw) * 100.0
+        numeric = float(value)
     except (TypeError, ValueError):
-        soil_pct = 0.0
-    processed["soil_moisture_pct"] = round(min(max(soil_pct, 0.0), 100.0), 1)
-    processed["dry_alert"] = processed["soil_moisture_pct"] < 30.0
+        return None
+    return None if isnan(numeric) else numeric
+
+
+def soil_percent(raw: Any) -> float:
+    """Fracción de humedad → % acotado a [0, 100] con un decimal (0.0 si no es numérica)."""
+    fraction = _safe_float(raw)
+    if fraction is None:
+        return 0.0
+    return round(SOIL_FRACTION_CURVE.evaluate(fraction), 1)
+
+
+@stage(reads=("ts",), writes=("ts", "ts_ns"))
+def _timestamp(sample: Dict[str, Any]) -> Dict[str, Any]:
+    if sample.get("ts") or isinstance(sample.get("ts_ns"), int):
+        sample["ts_ns"] = sample_ts_ns(sample)
+    else:
+        sample["ts_ns"] = now_ns()
+    if not sample.get("ts"):
+        sample["ts"] = iso_from_ns(sample["ts_ns"])
+    return sample
 
+
+@stage(reads=("soil_moisture",), writes=("soil_moisture_pct", "dry_alert"))
+def _soil_percent(sample: Dict[str, Any]) -> Dict[str, Any]:
+    if "metric" in sample and "value" in sample:
+        # Formato largo: sólo las lecturas de humedad de suelo se convierten.
+        if sample["metric"] != SOIL_RAW_METRIC:
+            return sample
+        soil_pct = soil_percent(sample["value"])
+    else:
+        soil_pct = soil_percent(sample.get("soil_moisture", 0.0))
+    sample["soil_moisture_pct"] = soil_pct
+    sample["dry_alert"] = soil_pct < DRY_THRESHOLD_PCT
+    return sample
+
+
+@stage(name="models", reads=("soil_moisture_pct",), writes=("anomaly_detected", "risk_score"))
+def _models(sample: Dict[str, Any]) -> ResultChain:
     # Enriquecemos la muestra con el detector temporal
-    model_outputs = model_stub.predict(processed)
-    processed.update(model_outputs)
-    processed["anomaly_detected"] = bool(processed.get("soil_moisture_pct_anomaly", False))
-    return processed
+    detector_input = sample
+    if sample.get("metric") == SOIL_RAW_METRIC and "value" in sample:
+        # La muestra publicada conserva la fracción; los detectores ven el %.
+        detector_input = {**sample, "metric": SOIL_PCT_METRIC, "value": sample["soil_moisture_pct"]}
+    result = ResultChain((sample, model_stub.predict(detector_input)))
+    result["anomaly_detected"] = bool(result.get("soil_moisture_pct_anomaly", False))
+    return result
+
+
+def _build_indicators(settings) -> IndicatorStage:
+    return IndicatorStage(
+        base_c=settings.indicator_gdd_base_c,
+        upper_c=settings.indicator_gdd_upper_c,
+        altitude_m=settings.site_altitude_m,
+        utc_offset=timedelta(hours=settings.detector_utc_offset_h),
+    )
+
+
+def build_pipeline(indicators: Optional[IndicatorStage] = None, denoise: Optional[DenoiseStage] = None) -> Pipeline:
+    """Pipeline por defecto: marca temporal, calibración, % de humedad de suelo, filtros, indicadores y modelos."""
+    calibration = CalibrationStage(get_calibration())
+    denoise = denoise or DenoiseStage(specs_from_setting(_settings.denoise_filters))
+    return Pipeline(
+        (_timestamp, calibration, _soil_percent, denoise, indicators or _build_indicators(_settings), _models),
+        inputs=("ts", "soil_moisture", *calibration.reads, *denoise.reads, *IndicatorStage.reads),
+    )
+
+
+_indicators = _build_indicators(_settings)
+_denoise = DenoiseStage(specs_from_setting(_settings.denoise_filters))
+_pipeline = build_pipeline(_indicators, _denoise)
+# Flujos desordenados: el buffer de reordenación (una marca de agua por nodo) delante de las mismas etapas
+_reorder = ReorderBuffer(
+    timedelta(seconds=_settings.reorder_allowed_lateness_s),
+    max_pending=_settings.reorder_max_pending,
+    key="node_id",
+)
+_stream_pipeline = Pipeline((_reorder, *_pipeline.stages))
+# Etapas con estado que se guardan en el state store (nombre → etapa)
+_stateful = {"indicators": _indicators, "denoise": _denoise}
+_state_store: Optional[Any] = None
+_last_checkpoint = time.monotonic()
+
+
+def get_pipeline() -> Pipeline:
+    return _pipeline
+
+
+def attach_state_store(store: Optional[Any]) -> bool:
+    """Recupera los acumuladores de indicadores y los filtros, y activa su checkpoint.
+
+    Devuelve True si se recuperó el estado de alguna etapa.
+    """
+    global _state_store
+    _state_store = store
+    if store is None:
+        return False
+    restored = False
+    for name, item in _stateful.items():
+        blob = store.load_detector_state(name)
+        if not blob:
+            continue
+        try:
+            item.restore_bytes(blob)
+        except (ValueError, UnicodeDecodeError, struct.error) as exc:
+            logger.warning("Estado de %s descartado: %s", name, exc)
+            continue
+        restored = True
+    return restored
+
+
+def checkpoint_state() -> Optional[int]:
+    """Guarda el estado de indicadores y filtros (p. ej. al apagar el nodo)."""
+    global _last_checkpoint
+    if _state_store is None:
+        return None
+    size = 0
+    for name, item in _stateful.items():
+        blob = item.to_bytes()
+        _state_store.save_detector_state(name, blob, kind=name)
+        size += len(blob)
+    _last_checkpoint = time.monotonic()
+    return size
+
+
+def _maybe_checkpoint() -> None:
+    interval_s = _settings.detector_checkpoint_interval_s
+    if _state_store is None or interval_s <= 0 or time.monotonic() - _last_checkpoint < interval_s:
+        return
+    try:
+        checkpoint_state()
+    except Exception as exc:  # noqa: BLE001 - el procesamiento no debe caer por el checkpoint
+        logger.warning("No se pudo guardar el estado de procesamiento: %s", exc)
+
+
+def process_sample(sample: Dict[str, Any]) -> ResultChain:
+    """Procesa una muestra y añade indicadores básicos + IA ligera.
+
+    Devuelve una vista encadenada (muestra + salidas de los detectores) que
+    se convierte a dict con ``to_dict()`` sólo al publicar.
+    """
+
+    if not sample:
+        return ResultChain()
+    result = _pipeline.process(dict(sample))
+    _maybe_checkpoint()
+    return result
+
+
+def feed_sample(sample: Dict[str, Any]) -> List[ResultChain]:
+    """Procesa una muestra que puede llegar desordenada.
+
+    Pasa por el buffer de reordenación y devuelve las muestras (0..n) que ya
+    quedan por debajo de la marca de agua, procesadas y en orden de tiempo.
+    Las que llegan demasiado tarde no alcanzan a los detectores: se recogen
+    con ``drain_late_samples``.
+    """
+    if not sample:
+        return []
+    results = _stream_pipeline.feed(dict(sample))
+    _maybe_checkpoint()
+    return results
+
+
+def process_stream(samples: Iterable[Dict[str, Any]]) -> Iterator[ResultChain]:
+    """``feed_sample`` sobre un flujo finito (p. ej. un reenvío); al final vacía el buffer."""
+    for sample in samples:
+        yield from feed_sample(sample)
+    yield from flush_stream()
+
+
+def flush_stream() -> List[ResultChain]:
+    """Procesa lo retenido en el buffer de reordenación."""
+    return _stream_pipeline.flush()
+
+
+def drain_late_samples() -> List[Dict[str, Any]]:
+    """Muestras descartadas por llegar después de la marca de agua."""
+    return _reorder.drain_late()
+
+
+def process_batch(ts: Any, node_id: Any, metric: Any, value: Any) -> Dict[str, Any]:
+    """Procesa lecturas en formato largo dadas como columnas (arrays o secuencias).
+
+    ``node_id`` puede ser un único nombre para todas las filas. La calibración
+    de cuentas ADC (tablas precalculadas), la conversión de humedad de suelo,
+    el recorte y ``dry_alert`` se hacen con NumPy, los filtros de ruido
+    avanzan fila a fila y los detectores usan su camino por lotes; el
+    resultado fila a fila coincide con ``process_sample`` (salvo ``ts``/``ts_model`` y la predicción ONNX)
+    y se devuelve como un dict de columnas NumPy. ``soil_moisture_pct`` es
+    NaN y ``dry_alert`` ``False`` en las filas de otras métricas.
+    """
+    require_numpy()
+    ts_ns = as_epoch_ns(ts)
+    rows = ts_ns.size
+    if isinstance(node_id, str):
+        node_ids = np.full(rows, node_id, dtype=object)
+    else:
+        node_ids = np.asarray(node_id, dtype=object)
+    metrics = np.asarray(metric, dtype=object)
+    values = as_float_values(np.asarray(value, dtype=object), _safe_float)
+    if not (node_ids.size == metrics.size == values.size == rows):
+        raise ValueError("ts, node_id, metric y value deben tener la misma longitud")
+    calibration = get_calibration()
+    calibrated = np.isin(metrics, list(calibration.tables))
+    adc = values
+    if calibrated.any():
+        values = calibration.convert_columns(metrics, values)
+
+    is_soil = metrics == SOIL_RAW_METRIC
+    soil_pct = np.full(rows, np.nan)
+    fraction = np.nan_to_num(values[is_soil], nan=0.0)
+    soil_pct[is_soil] = round_like_python(SOIL_FRACTION_CURVE.evaluate_array(fraction), 1)
+    filtered = _denoise.filter_columns(node_ids, metrics, values)
+    values = filtered.pop("value")
+
+    columns: Dict[str, Any] = {
+        "ts_ns": ts_ns,
+        "node_id": node_ids,
+        "metric": metrics,
+        "value": values,
+        **filtered,
+        "soil_moisture_pct": soil_pct,
+        "dry_alert": is_soil & (soil_pct < DRY_THRESHOLD_PCT),
+    }
+    if calibrated.any():
+        columns["value_adc"] = np.where(calibrated, adc, np.nan)
+    # Como en ``_models``: los detectores evalúan la humedad de suelo en %.
+    detector_metrics = np.where(is_soil, SOIL_PCT_METRIC, metrics)
+    detector_values = np.where(is_soil, soil_pct, values)
+    columns.update(model_stub.predict_columns(node_ids, detector_metrics, ts_ns, detector_values, soil_pct))
+    columns["anomaly_detected"] = columns.get("soil_moisture_pct_anomaly", np.zeros(rows, dtype=bool)).astype(bool)
+    return columns
+
+
+def columns_to_rows(columns: Dict[str, Sequence[Any]]) -> list[Dict[str, Any]]:
+    """Filas (dicts) a partir de la salida de ``process_batch``, p. ej. para publicar."""
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*(columns[name].tolist() for name in names))]
 
 
-__all__ = ["process_sample"]
+__all__ = [
+    "attach_state_store",
+    "build_pipeline",
+    "checkpoint_state",
+    "columns_to_rows",
+    "drain_late_samples",
+    "feed_sample",
+    "flush_stream",
+    "get_pipeline",
+    "process_batch",
+    "process_sample",
+    "process_stream",
+    "soil_percent",
+]
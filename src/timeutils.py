@@ -0,0 +1,128 @@
+"""Marcas de tiempo compartidas por adquisición, procesamiento y modelos.
+
+El contrato de datos mantiene ``ts`` como texto ISO-8601 UTC, pero dentro
+del nodo se propaga además ``ts_ns`` (epoch en nanosegundos, ``int``) para
+no volver a parsear la misma cadena en cada etapa. ``to_epoch_ns`` acepta
+cadenas ISO, ``datetime``, epoch numérico (incluidos los escalares NumPy) o
+``None`` y recuerda la última cadena parseada (varias métricas de una
+lectura comparten ``ts``). Un ``datetime`` o una cadena sin zona horaria se
+interpreta en hora local, como hacían los detectores con ``astimezone``.
+"""
+
+from __future__ import annotations
+
+import math
+import numbers
+import time
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_ONE_US = timedelta(microseconds=1)
+
+# Umbrales para inferir la unidad de un epoch numérico (s, ms, us o ns).
+EPOCH_MS_MIN = 10**11
+EPOCH_US_MIN = 10**14
+EPOCH_NS_MIN = 10**17
+
+TimestampLike = str | datetime | int | float | None
+
+
+def now_ns() -> int:
+    return time.time_ns()
+
+
+def iso_from_ns(ts_ns: int) -> str:
+    """Formato del contrato: ``2025-01-01T10:00:00.123456Z``."""
+    return ns_to_datetime(ts_ns).replace(tzinfo=None).isoformat() + "Z"
+
+
+def iso_now() -> str:
+    return iso_from_ns(now_ns())
+
+
+def ns_to_datetime(ts_ns: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(ts_ns) // 1000)
+
+
+def datetime_to_ns(value: datetime) -> int:
+    """Epoch ns de un ``datetime``; sin zona horaria se interpreta en hora local."""
+    if value.tzinfo is None:
+        value = value.astimezone(UTC)
+    return ((value - EPOCH) // _ONE_US) * 1000
+
+
+def timedelta_ns(delta: timedelta) -> int:
+    return (delta // _ONE_US) * 1000
+
+
+def numeric_epoch_to_ns(value: int | float) -> int:
+    """Convierte un epoch en s/ms/us/ns (inferido por magnitud) a ns."""
+    magnitude = abs(value)
+    if magnitude >= EPOCH_NS_MIN:
+        return int(value)
+    if magnitude >= EPOCH_US_MIN:
+        return int(value * 1_000)
+    if magnitude >= EPOCH_MS_MIN:
+        return int(value * 1_000_000)
+    return int(value * 1_000_000_000)
+
+
+@lru_cache(maxsize=1)
+def parse_iso_ns(value: str) -> Optional[int]:
+    """Parsea ISO-8601 a epoch ns; ``None`` si no es válida.
+
+    La caché de la última cadena (``lru_cache``) es segura entre hilos: el
+    colector asíncrono parsea desde un hilo por puerto.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return datetime_to_ns(parsed)
+
+
+def to_epoch_ns(ts: TimestampLike) -> int:
+    """Normaliza cualquier marca de tiempo soportada a epoch ns.
+
+    ``None``, una cadena no ISO o un epoch no finito valen "ahora"; un tipo
+    no soportado (``bool`` incluido) lanza ``TypeError``.
+    """
+    if isinstance(ts, int) and not isinstance(ts, bool):
+        return numeric_epoch_to_ns(ts)
+    if isinstance(ts, str):
+        parsed = parse_iso_ns(ts)
+        return parsed if parsed is not None else now_ns()
+    if isinstance(ts, datetime):
+        return datetime_to_ns(ts)
+    if ts is None:
+        return now_ns()
+    if isinstance(ts, numbers.Integral) and not isinstance(ts, bool):
+        return numeric_epoch_to_ns(int(ts))
+    if isinstance(ts, numbers.Real) and not isinstance(ts, bool):
+        numeric = float(ts)
+        return numeric_epoch_to_ns(numeric) if math.isfinite(numeric) else now_ns()
+    raise TypeError(f"marca de tiempo no soportada: {type(ts).__name__}")
+
+
+def sample_ts_ns(sample: dict) -> int:
+    """``ts_ns`` de una muestra normalizada, derivado de ``ts`` si falta."""
+    ts_ns = sample.get("ts_ns")
+    if isinstance(ts_ns, int):
+        return ts_ns
+    return to_epoch_ns(sample.get("ts"))
+
+
+__all__ = [
+    "datetime_to_ns",
+    "iso_from_ns",
+    "iso_now",
+    "now_ns",
+    "ns_to_datetime",
+    "numeric_epoch_to_ns",
+    "parse_iso_ns",
+    "sample_ts_ns",
+    "timedelta_ns",
+    "to_epoch_ns",
+]
@@ -0,0 +1,356 @@
+"""Parallel parameter sweep / backtest of the anomaly detectors.
+
+The history is loaded once (CSV, SQLite ``SensorDatabase`` or InfluxDB) and
+written to ``.npy`` files that every worker memory-maps read-only, so the
+series is shared through the page cache instead of being pickled per task.
+Each grid point (method × threshold × window × min_samples) runs the batch
+detector path (``evaluate_batch``; per-sample ``evaluate`` for detectors
+without it) in a ``ProcessPoolExecutor`` and reports anomaly count,
+precision/recall against labelled events and wall-clock time.
+
+Labels are a CSV with ``start,end`` columns (ISO or epoch timestamps). A
+flag is a true positive when it falls inside an event (± ``--tolerance-min``);
+recall counts events with at least one flag.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.models.batch import np, require_numpy
+from src.models.detector_bank import (
+    MULTIVARIATE_METHODS,
+    UNIVARIATE_METHODS,
+    DetectorConfig,
+    build_detector,
+    result_keys,
+)
+from src.timeutils import iso_from_ns, now_ns, to_epoch_ns
+
+logger = logging.getLogger(__name__)
+
+REPORT_FIELDS = (
+    "method",
+    "window_hours",
+    "min_samples",
+    "threshold",
+    "anomalies",
+    "precision",
+    "recall",
+    "f1",
+    "seconds",
+)
+
+# Per-worker state, filled by ``_init_worker``.
+_SERIES: Dict[str, Any] = {}
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV history with ts,value columns (optional node_id)")
+    source.add_argument("--sqlite", help="SensorDatabase file to read the metric from")
+    source.add_argument("--influx", action="store_true", help="read the metric from InfluxDB (settings)")
+    parser.add_argument("--metric", required=True, help="metric name in the source")
+    parser.add_argument("--node", help="optional node_id filter")
+    parser.add_argument("--days", type=float, default=30.0, help="history to read for SQLite/Influx (days)")
+    parser.add_argument("--labels", help="CSV of labelled events with start,end columns")
+    parser.add_argument("--tolerance-min", type=float, default=0.0, help="slack around labelled events (minutes)")
+    parser.add_argument("--methods", nargs="+", choices=UNIVARIATE_METHODS, default=["zscore", "mad"])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[2.5, 3.0, 3.5, 4.0])
+    parser.add_argument("--window-hours", type=float, nargs="+", default=[12.0, 24.0, 72.0])
+    parser.add_argument("--min-samples", type=int, nargs="+", default=[48])
+    parser.add_argument("--max-samples", type=int, default=4096, help="window capacity for zscore/mad")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (1 = inline)")
+    parser.add_argument("--top", type=int, default=20, help="rows to print (best first)")
+    parser.add_argument("--output", help="write the full report as CSV")
+    parser.add_argument("--log", default="INFO", help="logging level (DEBUG, INFO, ...)")
+    return parser.parse_args(argv)
+
+
+def load_csv_series(path: str, *, node_id: str | None = None) -> Tuple["np.ndarray", "np.ndarray"]:
+    """``(ts_ns, values)`` from a CSV with ``ts``/``value`` columns."""
+    ts_values: List[int] = []
+    values: List[float] = []
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            if node_id and row.get("node_id") not in (None, "", node_id):
+                continue
+            try:
+                value = float(row["value"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            ts_values.append(to_epoch_ns(_csv_ts(row["ts"])))
+            values.append(value)
+    return _sorted_series(ts_values, values)
+
+
+def load_sqlite_series(
+    path: str, metric: str, *, days: float, node_id: str | None = None
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    from src.acquisition.db import SensorDatabase
+
+    start_ts = iso_from_ns(now_ns() - int(days * 86400e9))
+    ts_values: List[int] = []
+    values: List[float] = []
+    for _, ts, value in SensorDatabase(path).iter_metric_window(metric, start_ts, node_id):
+        ts_values.append(to_epoch_ns(ts))
+        values.append(value)
+    return _sorted_series(ts_values, values)
+
+
+def load_influx_series(metric: str, *, days: float, node_id: str | None = None) -> Tuple["np.ndarray", "np.ndarray"]:
+    from src.config import load_settings
+    from src.tools import influx_anomaly
+
+    if influx_anomaly.InfluxDBClient is None:
+        raise RuntimeError("influxdb-client is not installed. Run 'pip install influxdb-client'.")
+    settings = load_settings()
+    bucket = settings.influx_bucket_telemetry or settings.influx_bucket
+    with influx_anomaly.InfluxDBClient(
+        url=settings.influx_url, token=settings.influx_token, org=settings.influx_org
+    ) as client:
+        samples = influx_anomaly.fetch_metric_samples(
+            client=client,
+            org=settings.influx_org,
+            bucket=bucket,
+            measurement="naira_samples",
+            metric=metric,
+            hours=days * 24,
+            limit=int(days * 8640 * 2),
+            node_id=node_id,
+        )
+    return _sorted_series([to_epoch_ns(item["ts"]) for item in samples], [item["value"] for item in samples])
+
+
+def load_labels(path: str) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Sorted ``(starts_ns, ends_ns)`` of the labelled events."""
+    spans: List[Tuple[int, int]] = []
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            start = to_epoch_ns(_csv_ts(row["start"]))
+            end = to_epoch_ns(_csv_ts(row.get("end") or row["start"]))
+            spans.append((min(start, end), max(start, end)))
+    spans.sort()
+    starts = np.array([span[0] for span in spans], dtype=np.int64)
+    ends = np.array([span[1] for span in spans], dtype=np.int64)
+    return starts, ends
+
+
+def build_grid(
+    methods: Sequence[str],
+    thresholds: Sequence[float],
+    window_hours: Sequence[float],
+    min_samples: Sequence[int],
+    *,
+    max_samples: int = 4096,
+) -> List[DetectorConfig]:
+    multivariate = sorted(MULTIVARIATE_METHODS.intersection(methods))
+    if multivariate:
+        raise ValueError(f"Backtesting replays a single series; unsupported methods: {', '.join(multivariate)}")
+    return [
+        DetectorConfig(
+            method=method,
+            window=timedelta(hours=hours),
+            min_samples=samples,
+            threshold=threshold,
+            max_samples=max(max_samples, samples),
+        )
+        for method, hours, samples, threshold in itertools.product(methods, window_hours, min_samples, thresholds)
+    ]
+
+
+def anomaly_flags(metric: str, config: DetectorConfig, ts_ns: "np.ndarray", values: "np.ndarray") -> "np.ndarray":
+    """Boolean anomaly flag per sample for one configuration."""
+    detector = build_detector(metric, config)
+    if hasattr(detector, "evaluate_batch"):
+        return np.asarray(detector.evaluate_batch(ts_ns, values).anomaly, dtype=bool)
+    key = result_keys(metric, config.method)["anomaly"]
+    evaluate = detector.evaluate
+    return np.fromiter(
+        (evaluate(ts, value)[key] for ts, value in zip(ts_ns.tolist(), values.tolist())),
+        dtype=bool,
+        count=values.size,
+    )
+
+
+def score_flags(
+    ts_ns: "np.ndarray",
+    flags: "np.ndarray",
+    starts: "np.ndarray",
+    ends: "np.ndarray",
+    tolerance_ns: int = 0,
+) -> Dict[str, Optional[float]]:
+    """Precision/recall/F1 of the flags against labelled events (``None`` without labels)."""
+    if not starts.size:
+        return {"precision": None, "recall": None, "f1": None}
+    hits = ts_ns[flags]
+    event = np.searchsorted(starts - tolerance_ns, hits, side="right") - 1
+    inside = (event >= 0) & (hits <= ends[np.clip(event, 0, None)] + tolerance_ns)
+    precision = float(inside.sum()) / hits.size if hits.size else 0.0
+    recall = np.unique(event[inside]).size / starts.size
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def run_backtest(
+    ts_ns: "np.ndarray",
+    values: "np.ndarray",
+    grid: Sequence[DetectorConfig],
+    *,
+    metric: str = "backtest",
+    labels: Optional[Tuple["np.ndarray", "np.ndarray"]] = None,
+    tolerance: timedelta = timedelta(0),
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    """Evaluate every configuration and return one report row per grid point."""
+    require_numpy()
+    starts, ends = labels if labels is not None else (np.empty(0, np.int64), np.empty(0, np.int64))
+    tolerance_ns = int(tolerance.total_seconds() * 1e9)
+    if workers <= 1:
+        _SERIES.update(
+            metric=metric, ts=ts_ns, values=values, starts=starts, ends=ends, tolerance_ns=tolerance_ns
+        )
+        try:
+            return [_evaluate_config(config) for config in grid]
+        finally:
+            _SERIES.clear()
+
+    with tempfile.TemporaryDirectory(prefix="naira-backtest-") as tmp:
+        paths = []
+        for name, array in (("ts", ts_ns), ("values", values), ("starts", starts), ("ends", ends)):
+            path = Path(tmp) / f"{name}.npy"
+            np.save(path, np.ascontiguousarray(array))
+            paths.append(str(path))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(metric, tolerance_ns, *paths)
+        ) as pool:
+            chunksize = max(1, len(grid) // (workers * 4))
+            return list(pool.map(_evaluate_config, grid, chunksize=chunksize))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=getattr(logging, args.log.upper(), logging.INFO),
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    if np is None:
+        logger.error("numpy is required for backtesting. Run 'pip install numpy'.")
+        return 2
+
+    start = time.perf_counter()
+    if args.csv:
+        ts_ns, values = load_csv_series(args.csv, node_id=args.node)
+    elif args.sqlite:
+        ts_ns, values = load_sqlite_series(args.sqlite, args.metric, days=args.days, node_id=args.node)
+    else:
+        ts_ns, values = load_influx_series(args.metric, days=args.days, node_id=args.node)
+    if not values.size:
+        logger.warning("No samples found for metric=%s", args.metric)
+        return 1
+    labels = load_labels(args.labels) if args.labels else None
+    logger.info("Loaded %d samples in %.2fs", values.size, time.perf_counter() - start)
+
+    grid = build_grid(
+        args.methods, args.thresholds, args.window_hours, args.min_samples, max_samples=args.max_samples
+    )
+    start = time.perf_counter()
+    rows = run_backtest(
+        ts_ns,
+        values,
+        grid,
+        metric=args.metric,
+        labels=labels,
+        tolerance=timedelta(minutes=args.tolerance_min),
+        workers=args.workers,
+    )
+    logger.info("Evaluated %d configurations in %.1fs (%d workers)", len(rows), time.perf_counter() - start, args.workers)
+
+    rows.sort(key=_rank_key)
+    print_report(rows[: args.top])
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+def print_report(rows: Sequence[Dict[str, Any]]) -> None:
+    print(
+        f"{'method':>10} {'win_h':>6} {'min_n':>6} {'thr':>5} {'anom':>7} "
+        f"{'prec':>6} {'recall':>6} {'f1':>6} {'sec':>7}"
+    )
+    for row in rows:
+        print(
+            f"{row['method']:>10} {row['window_hours']:>6g} {row['min_samples']:>6} {row['threshold']:>5g} "
+            f"{row['anomalies']:>7} {_fmt(row['precision'])} {_fmt(row['recall'])} {_fmt(row['f1'])} "
+            f"{row['seconds']:>7.2f}"
+        )
+
+
+def _init_worker(metric: str, tolerance_ns: int, ts_path: str, values_path: str, starts_path: str, ends_path: str) -> None:
+    _SERIES.update(
+        metric=metric,
+        ts=np.load(ts_path, mmap_mode="r"),
+        values=np.load(values_path, mmap_mode="r"),
+        starts=np.load(starts_path),
+        ends=np.load(ends_path),
+        tolerance_ns=tolerance_ns,
+    )
+
+
+def _evaluate_config(config: DetectorConfig) -> Dict[str, Any]:
+    ts_ns, values = _SERIES["ts"], _SERIES["values"]
+    start = time.perf_counter()
+    flags = anomaly_flags(_SERIES["metric"], config, ts_ns, values)
+    elapsed = time.perf_counter() - start
+    row: Dict[str, Any] = {
+        "method": config.method,
+        "window_hours": config.window.total_seconds() / 3600,
+        "min_samples": config.min_samples,
+        "threshold": config.threshold,
+        "anomalies": int(flags.sum()),
+        "seconds": elapsed,
+    }
+    row.update(score_flags(np.asarray(ts_ns), flags, _SERIES["starts"], _SERIES["ends"], _SERIES["tolerance_ns"]))
+    return row
+
+
+def _rank_key(row: Dict[str, Any]) -> Tuple[float, int]:
+    # Best F1 first when labels exist; otherwise the quietest configurations.
+    return (-(row["f1"] or 0.0), row["anomalies"])
+
+
+def _fmt(value: Optional[float]) -> str:
+    return f"{'-':>6}" if value is None else f"{value:>6.3f}"
+
+
+def _csv_ts(raw: str) -> Any:
+    try:
+        return float(raw) if "." in raw else int(raw)
+    except ValueError:
+        return raw
+
+
+def _sorted_series(ts_values: Sequence[int], values: Sequence[Any]) -> Tuple["np.ndarray", "np.ndarray"]:
+    require_numpy()
+    ts_ns = np.asarray(ts_values, dtype=np.int64)
+    numeric = np.asarray(values, dtype=np.float64)
+    order = np.argsort(ts_ns, kind="stable")
+    return ts_ns[order], numeric[order]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
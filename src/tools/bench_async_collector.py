@@ -0,0 +1,104 @@
+"""Throughput of ``AsyncSerialCollector`` over pseudo-terminals (Linux/macOS).
+
+Each port is a pty pair: a writer thread pushes ``--lines`` sensor lines as
+fast as it can into the master side while the collector reads the slave
+side. Publishing is replaced by an in-memory counter, so the figure is the
+read → parse → calibrate → queue → publish-task path without Influx. The
+rate is measured from the first write until every line has been published.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+import tty
+from typing import Any, Dict, List, Sequence
+
+from src.acquisition.async_collector import AsyncSerialCollector, PortSpec
+from src.acquisition.collector import SerialCollector
+
+LINES = ("temperature {:.2f}", "light {:.0f}", "moisture {:.0f}")
+
+
+class _CountingCollector(SerialCollector):
+    """Port collector that counts published samples instead of sending them."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.state_store = None
+        self.influx = None
+        self.deadband = None
+        self.published = 0
+
+    def _publish_sample(self, sample: Dict[str, Any]) -> bool:
+        self.published += 1
+        return True
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ports", type=int, default=3, help="pseudo-terminals read in parallel")
+    parser.add_argument("--lines", type=int, default=2000, help="lines written per port")
+    parser.add_argument("--process", action="store_true", help="also run the processing task (detectors)")
+    return parser.parse_args(argv)
+
+
+def _write_lines(master: int, count: int, offset: int) -> None:
+    for idx in range(count):
+        template = LINES[(idx + offset) % len(LINES)]
+        os.write(master, (template.format(20 + idx % 50) + "\r\n").encode())
+
+
+async def _run(ports: List[tuple], lines: int, process: bool) -> Dict[str, Any]:
+    collector = AsyncSerialCollector(
+        [PortSpec(name, node_id=f"bench-{idx}") for idx, (_, _, name) in enumerate(ports)],
+        process=process,
+        collector_factory=_CountingCollector,
+    )
+    task = asyncio.create_task(collector.run())
+    await asyncio.sleep(0.3)  # let the readers open their ports first
+    total = lines * len(ports)
+    writers = [
+        threading.Thread(target=_write_lines, args=(master, lines, idx)) for idx, (master, _, _) in enumerate(ports)
+    ]
+    started = time.perf_counter()
+    for writer in writers:
+        writer.start()
+    while collector.stats()["published"] < total and time.perf_counter() - started < 120:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    collector.stop()
+    stats = await task
+    for writer in writers:
+        writer.join()
+    return {"lines": stats["published"], "seconds": elapsed, "lines_per_s": stats["published"] / elapsed}
+
+
+def bench(ports: int, lines: int, *, process: bool = False) -> Dict[str, Any]:
+    """Return ``lines`` published, wall-clock ``seconds`` and ``lines_per_s``."""
+    opened = []
+    try:
+        for _ in range(ports):
+            master, slave = os.openpty()
+            tty.setraw(slave)
+            opened.append((master, slave, os.ttyname(slave)))
+        return asyncio.run(_run(opened, lines, process))
+    finally:
+        for master, slave, _ in opened:
+            os.close(master)
+            os.close(slave)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = bench(args.ports, args.lines, process=args.process)
+    print(f"ports={args.ports} lines/port={args.lines} process={args.process}")
+    print(f"{report['lines']} lines in {report['seconds']:.2f}s → {report['lines_per_s']:.0f} lines/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
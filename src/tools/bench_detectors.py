@@ -0,0 +1,206 @@
+"""Micro-benchmark of per-sample detector cost across window sizes.
+
+The per-sample cost of the windowed detectors should stay flat as
+``max_samples`` grows; the run fails when the slowest size costs more than
+``--max-ratio`` times the fastest one.
+
+``--sketch-days`` also compares the approximate ``mad_sketch`` detector with
+the exact MAD detector over a long window (accuracy, CPU and memory).
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Callable, Dict, List, Sequence
+
+from src.models.mad_anomaly import RollingMadAnomalyDetector
+from src.models.seasonal_anomaly import SeasonalAnomalyDetector
+from src.models.sketch_mad import SketchMadAnomalyDetector
+from src.models.zscore_anomaly import RollingAnomalyDetector
+
+DetectorFactory = Callable[[int], object]
+
+DETECTORS: Dict[str, DetectorFactory] = {
+    "zscore": lambda size: RollingAnomalyDetector(
+        metric="bench",
+        window=timedelta(days=365),
+        min_samples=1,
+        max_samples=size,
+    ),
+    "mad": lambda size: RollingMadAnomalyDetector(
+        metric="bench",
+        window=timedelta(days=365),
+        min_samples=1,
+        max_samples=size,
+    ),
+    # fixed memory: ``size`` does not apply
+    "mad_sketch": lambda size: SketchMadAnomalyDetector(
+        metric="bench",
+        window=timedelta(days=365),
+        min_samples=1,
+    ),
+    # per-slot daily profile: ``size`` does not apply
+    "seasonal": lambda size: SeasonalAnomalyDetector(metric="bench", min_samples=1, min_days=1),
+}
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--method",
+        choices=sorted(DETECTORS),
+        default="zscore",
+        help="detector to benchmark",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[256, 1024, 4096, 16384],
+        help="max_samples values to compare",
+    )
+    parser.add_argument("--samples", type=int, default=20000, help="timed samples per size")
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=2.0,
+        help="fail if the slowest size costs more than this times the fastest (0 disables)",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the synthetic series")
+    parser.add_argument(
+        "--backfill-days",
+        type=float,
+        default=0.0,
+        help="also time evaluate_batch over N days of 10 s data",
+    )
+    parser.add_argument(
+        "--sketch-days",
+        type=float,
+        default=0.0,
+        help="compare mad_sketch against exact MAD over an N-day window of 10 s data",
+    )
+    return parser.parse_args(argv)
+
+
+def synthetic_series(count: int, *, seed: int = 42, step_s: float = 10.0) -> tuple[List[datetime], List[float]]:
+    """Daily-cycle series with noise, sampled every ``step_s`` seconds."""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    timestamps = [base + timedelta(seconds=idx * step_s) for idx in range(count)]
+    values = [
+        20.0 + 6.0 * math.sin(2 * math.pi * idx * step_s / 86400.0) + rng.gauss(0.0, 0.4)
+        for idx in range(count)
+    ]
+    return timestamps, values
+
+
+def bench_per_sample(method: str, size: int, samples: int, *, seed: int = 42) -> float:
+    """Return the mean cost in microseconds of ``evaluate`` with a full window."""
+    detector = DETECTORS[method](size)
+    timestamps, values = synthetic_series(size + samples, seed=seed)
+    for ts, value in zip(timestamps[:size], values[:size]):
+        detector.evaluate(ts, value)  # type: ignore[attr-defined]
+
+    start = time.perf_counter()
+    for ts, value in zip(timestamps[size:], values[size:]):
+        detector.evaluate(ts, value)  # type: ignore[attr-defined]
+    elapsed = time.perf_counter() - start
+    return elapsed / samples * 1e6
+
+
+def cost_ratio(costs: Sequence[float]) -> float:
+    """Slowest over fastest per-sample cost; 1.0 means perfectly flat."""
+    return max(costs) / min(costs) if costs and min(costs) > 0 else 1.0
+
+
+def bench_backfill(method: str, size: int, days: float, *, seed: int = 42) -> tuple[int, float]:
+    """Return ``(samples, seconds)`` for one ``evaluate_batch`` call."""
+    detector = DETECTORS[method](size)
+    timestamps, values = synthetic_series(int(days * 8640), seed=seed)
+    start = time.perf_counter()
+    detector.evaluate_batch(timestamps, values)  # type: ignore[attr-defined]
+    return len(values), time.perf_counter() - start
+
+
+def bench_sketch_accuracy(days: float, *, seed: int = 42) -> Dict[str, float]:
+    """Run exact and sketch MAD over the same ``days``-long window and compare them.
+
+    Errors are reported relative to the exact MAD (the natural scale of the
+    score), after the first full window.
+    """
+    count = int(days * 8640)
+    timestamps, values = synthetic_series(2 * count, seed=seed)
+    window = timedelta(days=days)
+    exact = RollingMadAnomalyDetector(metric="bench", window=window, min_samples=1, max_samples=count + 1)
+    sketch = SketchMadAnomalyDetector(metric="bench", window=window, min_samples=1)
+    med_key, mad_key = "bench_mad_median", "bench_mad_deviation"
+    med_err: List[float] = []
+    mad_err: List[float] = []
+    exact_s = sketch_s = 0.0
+    for idx, (ts, value) in enumerate(zip(timestamps, values)):
+        start = time.perf_counter()
+        ref = exact.evaluate(ts, value)
+        mid = time.perf_counter()
+        approx = sketch.evaluate(ts, value)
+        sketch_s += time.perf_counter() - mid
+        exact_s += mid - start
+        if idx >= count and ref[mad_key]:
+            med_err.append(abs(approx[med_key] - ref[med_key]) / ref[mad_key])
+            mad_err.append(abs(approx[mad_key] - ref[mad_key]) / ref[mad_key])
+    samples = len(values)
+    return {
+        "samples": samples,
+        "exact_us": exact_s / samples * 1e6,
+        "sketch_us": sketch_s / samples * 1e6,
+        "exact_kb": exact.nbytes() / 1024,
+        "sketch_kb": sketch.nbytes() / 1024,
+        "median_err_mean": sum(med_err) / max(len(med_err), 1),
+        "median_err_max": max(med_err, default=0.0),
+        "mad_err_mean": sum(mad_err) / max(len(mad_err), 1),
+        "mad_err_max": max(mad_err, default=0.0),
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    print(f"method={args.method} samples={args.samples}")
+    print(f"{'max_samples':>12}  {'us/sample':>10}")
+    costs: List[float] = []
+    for size in args.sizes:
+        cost = bench_per_sample(args.method, size, args.samples, seed=args.seed)
+        costs.append(cost)
+        print(f"{size:>12}  {cost:>10.2f}")
+    ratio = cost_ratio(costs)
+    print(f"slowest/fastest: {ratio:.2f}")
+    status = 0
+    if args.max_ratio > 0 and ratio > args.max_ratio:
+        print(f"per-sample cost is not flat across sizes (ratio {ratio:.2f} > {args.max_ratio:g})")
+        status = 1
+    if args.backfill_days > 0:
+        print(f"{'max_samples':>12}  {'samples':>10}  {'batch ms':>10}")
+        for size in args.sizes:
+            if not hasattr(DETECTORS[args.method](1), "evaluate_batch"):
+                print(f"{args.method} has no evaluate_batch; skipping backfill")
+                break
+            count, elapsed = bench_backfill(args.method, size, args.backfill_days, seed=args.seed)
+            print(f"{size:>12}  {count:>10}  {elapsed * 1e3:>10.1f}")
+    if args.sketch_days > 0:
+        report = bench_sketch_accuracy(args.sketch_days, seed=args.seed)
+        print(f"mad vs mad_sketch over {args.sketch_days:g} days ({report['samples']} samples)")
+        print(f"{'':>8}  {'us/sample':>10}  {'KB':>8}")
+        print(f"{'exact':>8}  {report['exact_us']:>10.2f}  {report['exact_kb']:>8.1f}")
+        print(f"{'sketch':>8}  {report['sketch_us']:>10.2f}  {report['sketch_kb']:>8.1f}")
+        print(
+            "error / exact MAD: "
+            f"median mean={report['median_err_mean']:.4f} max={report['median_err_max']:.4f}, "
+            f"MAD mean={report['mad_err_mean']:.4f} max={report['mad_err_max']:.4f}"
+        )
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
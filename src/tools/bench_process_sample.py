@@ -0,0 +1,140 @@
+"""Micro-benchmark of ``process_sample``: time and allocations per sample.
+
+Allocations are measured with ``tracemalloc`` (peak traced bytes while one
+sample is processed, and net blocks still alive afterwards). ``--to-dict``
+also flattens each result as the publish step does, to show what the lazy
+``ResultChain`` saves on samples that are never published. The per-stage
+timing counters of the processing pipeline are printed for the timed run.
+``--batch`` compares per-row ``process_sample`` with the columnar
+``process_batch`` on the same long-format readings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import UTC, datetime, timedelta
+from typing import Any, Dict, List, Sequence
+
+from src.processing.stub import get_pipeline, process_batch, process_sample
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=5000, help="timed samples")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed samples to fill the windows")
+    parser.add_argument("--to-dict", action="store_true", help="flatten every result with to_dict()")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the synthetic readings")
+    parser.add_argument("--batch", action="store_true", help="compare process_sample with process_batch per row")
+    return parser.parse_args(argv)
+
+
+def synthetic_samples(count: int, *, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    return [
+        {
+            "ts": (base + timedelta(seconds=10 * idx)).isoformat(),
+            "node_id": "bench",
+            "soil_moisture": 0.4 + rng.gauss(0.0, 0.02),
+            "air_temp_c": 20.0 + rng.gauss(0.0, 0.5),
+        }
+        for idx in range(count)
+    ]
+
+
+def long_rows(count: int, *, seed: int = 42) -> List[Dict[str, Any]]:
+    """Long-format readings (``metric``/``value``) alternating soil and air temperature."""
+    rows = []
+    for idx, sample in enumerate(synthetic_samples((count + 1) // 2, seed=seed)):
+        for metric in ("soil_moisture", "air_temp_c"):
+            rows.append({"ts_ns": 1_735_689_600 * 10**9 + idx * 10**10, "node_id": sample["node_id"],
+                         "metric": metric, "value": sample[metric]})
+    return rows[:count]
+
+
+def bench_batch(rows: int, *, seed: int = 42) -> Dict[str, float]:
+    """``us_per_row`` of ``process_sample`` and ``process_batch`` on the same readings.
+
+    Each path uses its own node id, so both start from empty windows.
+    """
+    readings = long_rows(rows, seed=seed)
+    start = time.perf_counter()
+    for row in readings:
+        process_sample({**row, "node_id": "bench-row"})
+    per_row = time.perf_counter() - start
+
+    start = time.perf_counter()
+    process_batch(
+        [row["ts_ns"] for row in readings],
+        "bench-batch",
+        [row["metric"] for row in readings],
+        [row["value"] for row in readings],
+    )
+    batch = time.perf_counter() - start
+    return {"process_sample": per_row / rows * 1e6, "process_batch": batch / rows * 1e6}
+
+
+def bench(samples: int, *, warmup: int = 200, to_dict: bool = False, seed: int = 42) -> Dict[str, Any]:
+    """Return ``us_per_sample``, ``peak_bytes`` and ``live_blocks`` averages plus ``stages``."""
+    batch = synthetic_samples(warmup + samples, seed=seed)
+    for sample in batch[:warmup]:
+        process_sample(sample)
+
+    timed = batch[warmup:]
+    pipeline = get_pipeline()
+    pipeline.reset_stats()
+    start = time.perf_counter()
+    for sample in timed:
+        result = process_sample(sample)
+        if to_dict:
+            result.to_dict()
+    elapsed = time.perf_counter() - start
+    stages = pipeline.stats()
+
+    tracemalloc.start()
+    peak_total = 0
+    try:
+        before = len(tracemalloc.take_snapshot().traces)
+        for sample in timed:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            result = process_sample(sample)
+            if to_dict:
+                result.to_dict()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - base
+        del result
+        live = len(tracemalloc.take_snapshot().traces) - before
+    finally:
+        tracemalloc.stop()
+    return {
+        "us_per_sample": elapsed / samples * 1e6,
+        "peak_bytes": peak_total / samples,
+        "live_blocks": live / samples,
+        "stages": stages,
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.batch:
+        timings = bench_batch(args.samples, seed=args.seed)
+        print(f"rows={args.samples}")
+        for name, us_per_row in timings.items():
+            print(f"{name:<16}  {us_per_row:>10.2f} us/row")
+        return 0
+    report = bench(args.samples, warmup=args.warmup, to_dict=args.to_dict, seed=args.seed)
+    print(f"samples={args.samples} to_dict={args.to_dict}")
+    print(f"{'us/sample':>10}  {'peak B/sample':>14}  {'live blocks/sample':>18}")
+    print(f"{report['us_per_sample']:>10.2f}  {report['peak_bytes']:>14.0f}  {report['live_blocks']:>18.2f}")
+    print(f"{'stage':<16}  {'us/sample':>10}")
+    for name, stats in report["stages"].items():
+        print(f"{name:<16}  {stats['us_per_sample']:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
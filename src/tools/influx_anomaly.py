@@ -6,11 +6,17 @@ import argparse
 import json
 import logging
 from datetime import UTC, timedelta
-from typing import Any, Dict, Iterable, List, Sequence
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
 
 from src.config import load_settings
-from src.models.mad_anomaly import RollingMadAnomalyDetector
-from src.models.zscore_anomaly import RollingAnomalyDetector
+from src.models.batch import np
+from src.models.detector_bank import (
+    MULTIVARIATE_METHODS,
+    UNIVARIATE_METHODS,
+    DetectorConfig,
+    build_detector,
+    result_keys,
+)
 
 try:  # optional import, keeps the script importable without Influx deps
     from influxdb_client import InfluxDBClient
@@ -61,9 +67,15 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         default=3.5,
         help="median absolute deviation threshold for MAD mode",
     )
+    parser.add_argument(
+        "--half-life-hours",
+        type=float,
+        default=6.0,
+        help="half-life of the weights for EWMA mode (hours)",
+    )
     parser.add_argument(
         "--method",
-        choices=["zscore", "mad"],
+        choices=UNIVARIATE_METHODS,
         default="zscore",
         help="anomaly detection technique to use",
     )
@@ -127,14 +139,11 @@ def main(argv: Sequence[str] | None = None) -> int:
         z_threshold=args.z_threshold,
         mad_threshold=args.mad_threshold,
         method=args.method,
+        half_life_hours=args.half_life_hours,
     )
 
-    ready_key = (
-        f"{args.metric}_window_ready"
-        if args.method == "zscore"
-        else f"{args.metric}_mad_window_ready"
-    )
-    score_key = f"{args.metric}_zscore" if args.method == "zscore" else f"{args.metric}_mad_score"
+    keys = result_keys(args.metric, args.method)
+    ready_key, score_key = keys["ready"], keys["score"]
     logger.info(
         "Evaluated %d samples; window_ready=%s, score=%.3f",
         len(samples),
@@ -142,7 +151,6 @@ def main(argv: Sequence[str] | None = None) -> int:
         last_state.get(score_key, 0.0),
     )
 
-    anomaly_key = f"{args.metric}_anomaly" if args.method == "zscore" else f"{args.metric}_mad_anomaly"
     if anomalies:
         for entry in anomalies:
             logger.warning(
@@ -213,34 +221,44 @@ def detect_anomalies(
     z_threshold: float,
     mad_threshold: float,
     method: str,
+    half_life_hours: float = 6.0,
 ) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    if method == "mad":
-        detector = RollingMadAnomalyDetector(
-            metric=metric,
-            window=timedelta(hours=window_hours),
-            min_samples=min_samples,
-            mad_threshold=mad_threshold,
-            max_samples=max(window_samples, min_samples),
-        )
-        anomaly_key = f"{metric}_mad_anomaly"
-    else:
-        detector = RollingAnomalyDetector(
-            metric=metric,
-            window=timedelta(hours=window_hours),
-            min_samples=min_samples,
-            z_threshold=z_threshold,
-            max_samples=max(window_samples, min_samples),
-        )
-        anomaly_key = f"{metric}_anomaly"
+    if method in MULTIVARIATE_METHODS:
+        raise ValueError(f"{method!r} combines several metrics and cannot score a single series")
+    config = DetectorConfig(
+        method=method,
+        window=timedelta(hours=window_hours),
+        min_samples=min_samples,
+        threshold=mad_threshold if method.startswith("mad") else z_threshold,
+        max_samples=max(window_samples, min_samples),
+        half_life=timedelta(hours=half_life_hours),
+    )
+    detector = build_detector(metric, config)
+    anomaly_key = result_keys(metric, method)["anomaly"]
     anomalies: List[Dict[str, Any]] = []
-    last_state: Dict[str, Any] = {}
-    for sample in samples:
-        last_state = detector.evaluate(sample.get("ts"), sample.get("value"))
-        if last_state.get(anomaly_key):
-            enriched = dict(sample)
-            enriched.update(last_state)
-            anomalies.append(enriched)
-    return anomalies, last_state
+    last_state: Mapping[str, Any] = {}
+    samples = list(samples)
+    if np is None or not hasattr(detector, "evaluate_batch"):  # camino escalar, muestra a muestra
+        for sample in samples:
+            last_state = detector.evaluate(sample.get("ts"), sample.get("value"))
+            if last_state.get(anomaly_key):
+                enriched = dict(sample)
+                enriched.update(last_state)
+                anomalies.append(enriched)
+        return anomalies, dict(last_state)
+
+    if not samples:
+        return anomalies, last_state
+    batch = detector.evaluate_batch(
+        [sample.get("ts") for sample in samples],
+        [sample.get("value") for sample in samples],
+    )
+    for idx in np.flatnonzero(batch.anomaly).tolist():
+        enriched = dict(samples[idx])
+        enriched.update(detector.result_at(batch, idx))
+        anomalies.append(enriched)
+    last_state = detector.result_at(batch, len(samples) - 1)
+    return anomalies, dict(last_state)
 
 
 def _build_flux_query(
@@ -12,12 +12,14 @@ import streamlit as st
 
 try:
     from src.config import Settings, load_settings
+    from src.models.detector_bank import UNIVARIATE_METHODS, result_keys
     from src.tools import influx_anomaly
 except ModuleNotFoundError:  # pragma: no cover - Streamlit runner safeguard
     PROJECT_ROOT = Path(__file__).resolve().parents[2]
     if str(PROJECT_ROOT) not in sys.path:
         sys.path.append(str(PROJECT_ROOT))
     from src.config import Settings, load_settings
+    from src.models.detector_bank import UNIVARIATE_METHODS, result_keys
     from src.tools import influx_anomaly
 
 logger = logging.getLogger(__name__)
@@ -37,6 +39,7 @@ def _fetch_and_detect(
     min_samples: int,
     z_threshold: float,
     mad_threshold: float,
+    half_life_hours: float = 6.0,
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
     client_cls = influx_anomaly.InfluxDBClient
     if client_cls is None:  # pragma: no cover - safeguarded in UI
@@ -63,6 +66,7 @@ def _fetch_and_detect(
         z_threshold=z_threshold,
         mad_threshold=mad_threshold,
         method=method,
+        half_life_hours=half_life_hours,
     )
     return samples, anomalies, last_state
 
@@ -119,16 +123,19 @@ with st.sidebar:
     hours = st.slider("Ventana de lectura (h)", min_value=1, max_value=168, value=24)
     limit = st.number_input("Límite de filas", min_value=100, max_value=20000, value=5000, step=100)
     st.header("Detector")
-    method = st.selectbox("Método", options=("zscore", "mad"), index=0)
+    method = st.selectbox("Método", options=UNIVARIATE_METHODS, index=UNIVARIATE_METHODS.index("zscore"))
     window_hours = st.slider("Ventana rolling (h)", min_value=6, max_value=240, value=72, step=6)
     min_samples = st.number_input("Mínimo muestras en ventana", min_value=10, max_value=2000, value=72, step=2)
     window_samples = st.number_input("Máximo muestras almacenadas", min_value=100, max_value=10000, value=720, step=20)
-    if method == "zscore":
-        z_threshold = st.slider("Umbral z-score", min_value=1.0, max_value=6.0, value=2.5, step=0.1)
-        mad_threshold = 3.5
-    else:
+    half_life_hours = 6.0
+    if method.startswith("mad"):
         mad_threshold = st.slider("Umbral MAD", min_value=1.0, max_value=10.0, value=3.5, step=0.5)
         z_threshold = 2.5
+    else:
+        z_threshold = st.slider("Umbral z-score", min_value=1.0, max_value=6.0, value=2.5, step=0.1)
+        mad_threshold = 3.5
+    if method == "ewma":
+        half_life_hours = st.slider("Semivida EWMA (h)", min_value=1, max_value=72, value=6)
 
 if not metric.strip():
     st.info("Define una métrica para consultar InfluxDB.")
@@ -155,6 +162,7 @@ try:
                 min_samples=int(min_samples),
                 z_threshold=float(z_threshold),
                 mad_threshold=float(mad_threshold),
+                half_life_hours=float(half_life_hours),
             )
 except Exception as exc:  # pragma: no cover - interactive UI
     logger.exception("Error consultando InfluxDB")
@@ -165,9 +173,8 @@ if not samples:
     st.warning("No se encontraron muestras para la métrica seleccionada en la ventana solicitada.")
     st.stop()
 
-ready_key = f"{metric}_window_ready" if method == "zscore" else f"{metric}_mad_window_ready"
-score_key = f"{metric}_zscore" if method == "zscore" else f"{metric}_mad_score"
-anomaly_key = f"{metric}_anomaly" if method == "zscore" else f"{metric}_mad_anomaly"
+keys = result_keys(metric, method)
+ready_key, score_key, anomaly_key = keys["ready"], keys["score"], keys["anomaly"]
 
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Muestras leídas", len(samples))
@@ -210,6 +217,7 @@ def _fetch_and_detect(
     min_samples: int,
     z_threshold: float,
     mad_threshold: float,
+    half_life_hours: float = 6.0,
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
     client_cls = influx_anomaly.InfluxDBClient
     if client_cls is None:  # pragma: no cover - safeguarded in UI
@@ -236,6 +244,7 @@ def _fetch_and_detect(
         z_threshold=z_threshold,
         mad_threshold=mad_threshold,
         method=method,
+        half_life_hours=half_life_hours,
     )
     return samples, anomalies, last_state
 
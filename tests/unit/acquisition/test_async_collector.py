@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+import time
+import tty
+from functools import partial
+
+import pytest
+
+from src.acquisition.async_collector import AsyncSerialCollector, PortSpec
+from src.acquisition.collector import SerialCollector
+
+LINES = ("temperature {:.2f}", "light {:.0f}", "moisture {:.0f}")
+
+
+class RecordingCollector(SerialCollector):
+    """Colector de un puerto que anota lo publicado en ``published`` (una lista por test)."""
+
+    def __init__(self, published: list, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.state_store = None
+        self.influx = None
+        self.deadband = None
+        self.published = published
+
+    def _publish_sample(self, sample) -> bool:
+        self.published.append(sample)
+        return True
+
+
+def _open_pty():
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+
+def _write_lines(master: int, count: int, offset: int) -> None:
+    for idx in range(count):
+        template = LINES[(idx + offset) % len(LINES)]
+        os.write(master, (template.format(20 + idx % 50) + "\r\n").encode())
+
+
+async def _collect(ports, total: int, published: list, **kwargs) -> tuple:
+    collector = AsyncSerialCollector(
+        [PortSpec(name, node_id=f"node-{idx}") for idx, (_, _, name) in enumerate(ports)],
+        collector_factory=partial(RecordingCollector, published),
+        **kwargs,
+    )
+    task = asyncio.create_task(collector.run())
+    await asyncio.sleep(0.3)
+    writers = [
+        threading.Thread(target=_write_lines, args=(master, total, idx)) for idx, (master, _, _) in enumerate(ports)
+    ]
+    for writer in writers:
+        writer.start()
+    deadline = time.monotonic() + 20
+    while collector.stats()["published"] < total * len(ports) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    collector.stop()
+    stats = await task
+    for writer in writers:
+        writer.join()
+    return collector, stats
+
+
+@pytest.fixture
+def ptys():
+    created = [_open_pty() for _ in range(3)]
+    yield created
+    for master, slave, _ in created:
+        os.close(master)
+        os.close(slave)
+
+
+def test_reads_several_ptys_concurrently(ptys) -> None:
+    total = 400
+    published = []
+    collector, stats = asyncio.run(_collect(ptys, total, published))
+    assert stats["lines"] == stats["published"] == len(published) == total * len(ptys)
+    assert stats["dropped"] == 0 and all(port["invalid"] == 0 for port in stats["ports"].values())
+    nodes = {sample["node_id"] for sample in published}
+    assert nodes == {"node-0", "node-1", "node-2"}
+    per_node = [[s["ts_ns"] for s in published if s["node_id"] == node] for node in sorted(nodes)]
+    assert [len(stamps) for stamps in per_node] == [total] * len(ptys)
+    assert all(stamps == sorted(stamps) for stamps in per_node)
+    assert set(collector.get_last_values()[ptys[0][2]]) == {"temp_aire", "luminosidad", "humedad_suelo"}
+
+
+def test_processing_task_receives_samples(ptys) -> None:
+    results = []
+    published = []
+    _, stats = asyncio.run(_collect(ptys[:1], 60, published, process=True, on_result=results.append))
+    assert stats["published"] == len(published) == 60
+    assert stats["processed"] == len(results) == 60
+    assert all("ts_ns" in result for result in results)
@@ -0,0 +1,83 @@
+import subprocess
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+from src.acquisition.collector import SerialCollector
+from src.acquisition.db import SensorDatabase
+from src.processing.aggregation import TumblingAggregator
+from src.processing.deadband import DeadbandFilter, DeadbandRule
+
+BASE_NS = 1_735_689_600 * 10**9
+
+
+class AggregatesCollector(SerialCollector):
+    def __init__(self, database: SensorDatabase) -> None:
+        super().__init__(port="/dev/null")
+        self.state_store = None
+        self.influx = None
+        self.deadband = None
+        self.publish_mode = "aggregates"
+        self.aggregator = TumblingAggregator((timedelta(minutes=1),), emit_raw=False)
+        self.database = database
+        self.published = []
+
+    def _publish_sample(self, sample) -> bool:
+        self.published.append(sample)
+        return True
+
+
+def test_aggregates_mode_keeps_raw_samples_in_local_database(tmp_path) -> None:
+    database = SensorDatabase(str(tmp_path / "sensors.db"))
+    database.influx = None
+    collector = AggregatesCollector(database)
+
+    for idx in range(3):
+        sample = collector.sample_from_line(f"temperature {20 + idx}", ts_ns=BASE_NS + idx * 30 * 10**9)
+        assert collector.store_sample(sample) is True
+
+    assert [row["value"] for row in database.get_samples("temp_aire")] == [22.0, 21.0, 20.0]
+    # Sólo sale el agregado del primer minuto cerrado; lo crudo no se publica.
+    assert [(item["aggregate"], item["value_count"]) for item in collector.published] == [(True, 2)]
+
+
+def test_aggregates_mode_reports_lost_samples_without_database() -> None:
+    collector = AggregatesCollector(None)
+    sample = collector.sample_from_line("temperature 20", ts_ns=BASE_NS)
+    assert collector.store_sample(sample) is False
+    assert collector.published == []
+
+
+class RawCollector(SerialCollector):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(port="/dev/null", **kwargs)
+        self.state_store = None
+        self.influx = None
+        self.publish_mode = "raw"
+        self.aggregator = None
+        self.published = []
+
+    def _publish_sample(self, sample) -> bool:
+        self.published.append(sample)
+        return True
+
+
+def test_injected_deadband_filters_the_publish_stage() -> None:
+    deadband = DeadbandFilter({"temp_aire": DeadbandRule(absolute=0.5)})
+    collector = RawCollector(deadband=deadband)
+
+    results = []
+    for idx, value in enumerate((20.0, 20.2, 20.9)):
+        sample = collector.sample_from_line(f"temperature {value}", ts_ns=BASE_NS + idx * 10**9)
+        results.append(collector.store_sample(sample))
+
+    assert results == [True, False, True]
+    assert [item["value"] for item in collector.published] == [20.0, 20.9]
+    assert collector.get_last_values() == {"temp_aire": 20.9}
+    assert collector.get_deadband_stats()["suppressed"] == 1
+
+
+def test_collector_runs_as_a_script() -> None:
+    script = Path(__file__).resolve().parents[3] / "src" / "acquisition" / "collector.py"
+    done = subprocess.run([sys.executable, str(script), "--help"], cwd="/", capture_output=True, text=True, timeout=120)
+    assert done.returncode == 0, done.stderr
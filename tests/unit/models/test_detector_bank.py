@@ -0,0 +1,127 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models.detector_bank import DetectorBank, DetectorConfig
+from src.models.zscore_anomaly import RollingAnomalyDetector
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+CONFIGS = {
+    "soil": (DetectorConfig(method="zscore", window=timedelta(hours=2), min_samples=5, threshold=3.0, max_samples=64),),
+    "temp": (DetectorConfig(method="mad", window=timedelta(hours=2), min_samples=5, threshold=3.0, max_samples=64),),
+}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bank_keeps_separate_windows_per_node() -> None:
+    bank = DetectorBank(CONFIGS)
+    reference = RollingAnomalyDetector(metric="soil", window=timedelta(hours=2), min_samples=5, max_samples=64)
+
+    for idx in range(10):
+        ts = BASE + timedelta(minutes=idx)
+        a = bank.evaluate("node-a", "soil", ts, 20.0 + idx % 3)
+        bank.evaluate("node-b", "soil", ts, 80.0)
+        assert a == reference.evaluate(ts, 20.0 + idx % 3)
+
+    assert len(bank) == 2
+    assert a["soil_window_samples"] == 10
+
+
+def test_predict_many_accepts_long_and_wide_samples() -> None:
+    bank = DetectorBank(CONFIGS, default_node_id="gw")
+    outputs = bank.predict_many(
+        [
+            {"ts": "2025-01-01T00:00:00Z", "node_id": "n1", "metric": "temp", "value": 18.0},
+            {"ts": "2025-01-01T00:00:00Z", "soil": 30.0, "temp": 19.0},
+        ]
+    )
+
+    assert set(outputs[0]) == {key for key in outputs[1] if key.startswith("temp_")}
+    assert "soil_rolling_mean" in outputs[1]
+    assert set(bank.keys()) == {("n1", "temp", "mad"), ("gw", "soil", "zscore"), ("gw", "temp", "mad")}
+
+
+def test_bank_evicts_idle_and_least_recently_used() -> None:
+    clock = FakeClock()
+    config = CONFIGS["soil"][0]
+    bank = DetectorBank(CONFIGS, idle_timeout_s=60, clock=clock)
+    bank.get("a", "soil", config)
+    clock.now = 30.0
+    bank.get("b", "soil", config)
+    clock.now = 70.0
+    bank.get("c", "soil", config)
+    assert bank.keys() == [("b", "soil", "zscore"), ("c", "soil", "zscore")]
+
+    per_entry = bank.stats()["nbytes"] // 2
+    bank.memory_budget_bytes = 2 * per_entry
+    bank.get("b", "soil", config)
+    bank.get("d", "soil", config)
+    assert bank.keys() == [("b", "soil", "zscore"), ("d", "soil", "zscore")]
+    stats = bank.stats()
+    assert stats["evicted_idle"] == 1
+    assert stats["evicted_memory"] == 1
+    assert stats["nbytes"] <= bank.memory_budget_bytes
+
+
+def test_unknown_method_is_rejected() -> None:
+    bank = DetectorBank({"soil": (DetectorConfig(method="nope"),)})
+    with pytest.raises(ValueError):
+        bank.evaluate("n", "soil", BASE, 1.0)
+
+
+def test_checkpoint_roundtrip_through_state_store(tmp_path) -> None:
+    from src.acquisition.state_store import StateStore
+
+    store = StateStore(db_path=str(tmp_path / "state.db"))
+    bank = DetectorBank(CONFIGS)
+    for idx in range(30):
+        ts = BASE + timedelta(minutes=idx)
+        bank.evaluate("n1", "soil", ts, 20.0 + idx % 4)
+        bank.evaluate("n2", "temp", ts, 15.0 + idx % 5)
+    assert bank.checkpoint(store) > 0
+
+    restored = DetectorBank(CONFIGS)
+    assert restored.restore(store) == 2
+    assert restored.keys() == bank.keys()
+    next_ts = BASE + timedelta(minutes=31)
+    assert restored.evaluate("n1", "soil", next_ts, 40.0) == bank.evaluate("n1", "soil", next_ts, 40.0)
+    assert restored.evaluate("n2", "temp", next_ts, 40.0) == bank.evaluate("n2", "temp", next_ts, 40.0)
+
+
+def test_maybe_checkpoint_respects_interval() -> None:
+    class MemoryStore:
+        def __init__(self) -> None:
+            self.saved = []
+
+        def save_detector_state(self, name, blob) -> None:
+            self.saved.append((name, blob))
+
+    clock = FakeClock()
+    store = MemoryStore()
+    bank = DetectorBank(CONFIGS, clock=clock)
+    assert bank.maybe_checkpoint(store, 60) is False
+    clock.now = 59.0
+    assert bank.maybe_checkpoint(store, 60) is False
+    clock.now = 61.0
+    assert bank.maybe_checkpoint(store, 60) is True
+    assert len(store.saved) == 1
+
+
+def test_truncated_bank_state_raises_value_error() -> None:
+    bank = DetectorBank(CONFIGS)
+    for idx in range(10):
+        ts = BASE + timedelta(minutes=idx)
+        bank.evaluate("n1", "soil", ts, 20.0 + idx % 4)
+        bank.evaluate("n1", "temp", ts, 15.0 + idx % 5)
+    blob = bank.to_bytes()
+
+    for cut in (6, len(blob) // 2, len(blob) - 1):
+        with pytest.raises(ValueError):
+            DetectorBank(CONFIGS).restore_bytes(blob[:cut])
@@ -0,0 +1,66 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models.detector_bank import DetectorBank, DetectorConfig, result_keys
+from src.models.ewma_anomaly import EwmaAnomalyDetector
+from src.tools.influx_anomaly import detect_anomalies
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def test_ewma_flags_spike_against_previous_state() -> None:
+    detector = EwmaAnomalyDetector(metric="temp", half_life=timedelta(hours=1), min_samples=10, z_threshold=3.0)
+    for idx in range(60):
+        result = detector.evaluate(BASE + timedelta(minutes=idx), 20.0 + (idx % 3) * 0.5)
+        assert result["temp_ewma_anomaly"] is False
+
+    spike = detector.evaluate(BASE + timedelta(minutes=61), 30.0)
+    assert spike["temp_ewma_window_ready"] is True
+    assert spike["temp_ewma_anomaly"] is True
+    assert spike["temp_ewma_mean"] == pytest.approx(20.5, abs=0.2)
+
+
+def test_ewma_weights_decay_with_elapsed_time() -> None:
+    detector = EwmaAnomalyDetector(metric="m", half_life=timedelta(hours=1), min_samples=1)
+    detector.evaluate(BASE, 10.0)
+    detector.evaluate(BASE + timedelta(seconds=1), 10.0)
+    assert detector.window_size() == 1  # peso efectivo algo menor que 2 tras 1 s de decaimiento
+    # Tras 10 semividas la historia apenas pesa: la nueva lectura domina la media.
+    detector.evaluate(BASE + timedelta(hours=10), 20.0)
+    state = detector.evaluate(BASE + timedelta(hours=10, seconds=1), 20.0)
+    assert state["m_ewma_mean"] == pytest.approx(20.0, abs=0.05)
+
+
+def test_ewma_state_roundtrip() -> None:
+    detector = EwmaAnomalyDetector(metric="m", min_samples=2)
+    for idx in range(20):
+        detector.evaluate(BASE + timedelta(minutes=idx), float(idx % 4))
+    clone = EwmaAnomalyDetector(metric="m", min_samples=2)
+    clone.restore(detector.to_bytes())
+    ts = BASE + timedelta(minutes=30)
+    assert clone.evaluate(ts, 9.0) == detector.evaluate(ts, 9.0)
+    assert detector.nbytes() < 64
+
+
+def test_bank_fallback_and_tool_select_ewma() -> None:
+    bank = DetectorBank({}, fallback=(DetectorConfig(method="ewma", window=timedelta(hours=12)),))
+    out = bank.evaluate_sample({"ts": "2025-01-01T00:00:00Z", "node_id": "n", "metric": "lux", "value": 5})
+    assert "lux_ewma_zscore" in out
+
+    samples = [{"ts": BASE + timedelta(minutes=idx), "value": 20.0 + idx % 2} for idx in range(80)]
+    samples.append({"ts": BASE + timedelta(minutes=81), "value": 40.0})
+    anomalies, last_state = detect_anomalies(
+        samples,
+        metric="temp",
+        window_hours=12,
+        window_samples=500,
+        min_samples=20,
+        z_threshold=3.0,
+        mad_threshold=3.5,
+        method="ewma",
+        half_life_hours=1.0,
+    )
+    keys = result_keys("temp", "ewma")
+    assert [entry["value"] for entry in anomalies] == [40.0]
+    assert last_state[keys["anomaly"]] is True
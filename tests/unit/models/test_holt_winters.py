@@ -0,0 +1,65 @@
+import math
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models.detector_bank import DetectorConfig, build_detector, result_keys
+from src.models.holt_winters import HoltWintersForecaster
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def _drying_soil(hours: int, *, step_min: int = 5, start: float = 60.0, rate: float = 0.5):
+    # Secado lineal con una pequeña oscilación diaria (evaporación diurna).
+    for idx in range(hours * 60 // step_min):
+        minutes = idx * step_min
+        value = start - rate * minutes / 60 - 1.5 * math.sin(2 * math.pi * minutes / 1440)
+        yield BASE + timedelta(minutes=minutes), value
+
+
+def _feed(model: HoltWintersForecaster, series) -> dict:
+    result = {}
+    for ts, value in series:
+        result = model.evaluate(ts, value)
+    return result
+
+
+def test_forecast_tracks_dry_down_trend() -> None:
+    model = HoltWintersForecaster(metric="soil", floor=30.0, horizon=timedelta(hours=18))
+    result = _feed(model, _drying_soil(48))
+    assert result["soil_hw_window_ready"] is True
+    assert result["soil_hw_trend_per_h"] == pytest.approx(-0.5, abs=0.1)
+    assert model.forecast(6) == pytest.approx(result["soil_hw_level"] - 3.0, abs=1.5)
+    # 60 - 24 = 36 % al final; cruza el 30 % en torno a 12-14 h.
+    assert result["soil_hw_dry_in_h"] == pytest.approx(13.0, abs=2.0)
+    assert model.hours_until(30.0, max_hours=6) is None
+    assert len(model.forecast_path(2)) == 8
+
+
+def test_residual_flags_spike_and_gaps_are_filled() -> None:
+    model = HoltWintersForecaster(metric="soil", min_samples=24)
+    _feed(model, _drying_soil(24))
+    steps = model.window_size()
+    spike = model.evaluate(BASE + timedelta(hours=24, minutes=5), 80.0)
+    assert spike["soil_hw_anomaly"] is True
+    model.evaluate(BASE + timedelta(hours=27), 45.0)
+    assert model.window_size() == steps + 13
+
+
+def test_state_roundtrip_and_bank_registration() -> None:
+    history = list(_drying_soil(30))
+    model = HoltWintersForecaster(metric="soil", floor=30.0)
+    assert model.load_history([ts for ts, _ in history], [value for _, value in history]) == len(history)
+
+    clone = HoltWintersForecaster(metric="soil", floor=30.0)
+    clone.restore(model.to_bytes())
+    ts = BASE + timedelta(hours=30, minutes=20)
+    assert clone.evaluate(ts, 44.0) == model.evaluate(ts, 44.0)
+    with pytest.raises(ValueError):
+        HoltWintersForecaster(metric="soil", step=timedelta(hours=1)).restore(model.to_bytes())
+
+    config = DetectorConfig(method="holt_winters", slot_minutes=30, min_samples=10, floor=25.0)
+    detector = build_detector("soil", config)
+    assert detector.nbytes() < 1024
+    keys = result_keys("soil", "holt_winters")
+    assert set(keys.values()) <= set(detector.evaluate(BASE, 50.0))
@@ -0,0 +1,66 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.models.detector_bank import DetectorBank, DetectorConfig  # noqa: E402
+from src.models.mahalanobis_anomaly import MahalanobisAnomalyDetector  # noqa: E402
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+METRICS = ("temp", "hum", "soil")
+
+
+def _readings(count: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    temp = 20.0 + 6.0 * np.sin(np.arange(count) / 40.0) + rng.normal(0.0, 0.3, count)
+    hum = 90.0 - 2.0 * temp + rng.normal(0.0, 0.5, count)
+    soil = 35.0 + rng.normal(0.0, 0.5, count)
+    return np.column_stack([temp, hum, soil])
+
+
+def test_incremental_covariance_matches_window() -> None:
+    detector = MahalanobisAnomalyDetector(metric="env", metrics=METRICS, min_samples=5, max_samples=50)
+    rows = _readings(180)
+    for idx, row in enumerate(rows):
+        detector.evaluate(BASE + timedelta(minutes=idx), dict(zip(METRICS, row)))
+    window = rows[-50:]
+    assert detector.window_size() == 50
+    assert detector._mean == pytest.approx(window.mean(axis=0))
+    exact = np.linalg.inv(np.cov(window, rowvar=False) * 49)
+    assert np.allclose(detector._inverse, exact, rtol=1e-6)
+
+
+def test_stuck_sensor_flagged_by_joint_distance() -> None:
+    detector = MahalanobisAnomalyDetector(metric="env", metrics=METRICS, min_samples=100, max_samples=500)
+    rows = _readings(400)
+    for idx, row in enumerate(rows):
+        result = detector.evaluate(BASE + timedelta(minutes=idx), dict(zip(METRICS, row)))
+    assert result["env_mahal_anomaly"] is False
+
+    # La humedad se queda fija en un valor normal mientras la temperatura sube.
+    stuck = {"temp": 26.0, "hum": 58.0, "soil": 35.0}
+    result = detector.evaluate(BASE + timedelta(minutes=401), stuck)
+    assert result["env_mahal_window_ready"] is True
+    assert result["env_mahal_anomaly"] is True
+    assert result["env_mahal_driver"] in ("temp", "hum")
+
+
+def test_bank_aligns_long_format_by_bucket_and_roundtrips() -> None:
+    config = DetectorConfig(method="mahalanobis", min_samples=2, metrics=("a", "b"))
+    bank = DetectorBank({"a": (DetectorConfig(method="ewma"),), "pair": (config,)})
+    ts = BASE.isoformat()
+    first = bank.evaluate_sample({"ts": ts, "node_id": "n", "metric": "a", "value": 1.0})
+    assert first["pair_mahal_window_samples"] == 0
+    assert "a_ewma_zscore" in first
+    second = bank.evaluate_sample({"ts": ts, "node_id": "n", "metric": "b", "value": 2.0})
+    assert second["pair_mahal_window_samples"] == 1
+
+    wide = bank.evaluate_sample({"ts": (BASE + timedelta(minutes=1)).isoformat(), "node_id": "n", "a": 2, "b": 3})
+    assert wide["pair_mahal_window_samples"] == 2
+
+    detector = bank.get("n", "pair", config)
+    clone = MahalanobisAnomalyDetector(metric="pair", metrics=("a", "b"), min_samples=2)
+    clone.restore(detector.to_bytes())
+    assert clone._mean == pytest.approx(detector._mean)
+    assert clone.window_size() == 2
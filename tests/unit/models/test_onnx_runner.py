@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.models import onnx_runner  # noqa: E402
+from src.models.onnx_runner import OnnxModelRunner, features_from_sample  # noqa: E402
+
+
+class _Input:
+    name = "features"
+
+
+class _SumSession:
+    def __init__(self, fail: bool = False) -> None:
+        self.batch_sizes = []
+        self.fail = fail
+        self.threads = set()
+
+    def get_inputs(self):
+        return [_Input()]
+
+    def run(self, output_names, feeds):
+        self.threads.add(threading.current_thread().name)
+        matrix = feeds["features"]
+        self.batch_sizes.append(matrix.shape[0])
+        if self.fail:
+            raise ValueError("modelo roto")
+        return [matrix.sum(axis=1, keepdims=True)]
+
+
+def test_submit_batches_by_size_off_the_caller_thread() -> None:
+    session = _SumSession()
+    runner = OnnxModelRunner(feature_names=("a", "b"), batch_size=4, max_latency_s=5.0, session=session)
+    futures = [runner.submit({"a": idx, "b": 1.0}) for idx in range(8)]
+    assert [future.result(timeout=2) for future in futures] == [[idx + 1.0] for idx in range(8)]
+    runner.close()
+    assert session.batch_sizes == [4, 4]
+    assert session.threads == {"onnx-runner"}
+    stats = runner.stats()
+    assert stats["batches"] == 2 and stats["samples"] == 8
+    assert stats["throughput_per_s"] > 0
+
+
+def test_partial_batch_flushes_after_latency_and_on_close() -> None:
+    session = _SumSession()
+    runner = OnnxModelRunner(feature_names=("a",), batch_size=64, max_latency_s=0.05, session=session)
+    assert runner.submit([2.0]).result(timeout=2) == [2.0]
+    pending = runner.submit([3.0])
+    runner.close()
+    assert pending.result(timeout=0) == [3.0]
+    with pytest.raises(RuntimeError):
+        runner.submit([1.0])
+
+
+def test_inference_errors_reach_every_future() -> None:
+    runner = OnnxModelRunner(feature_names=("a",), batch_size=2, session=_SumSession(fail=True))
+    futures = [runner.submit([1.0]), runner.submit([2.0])]
+    for future in futures:
+        assert isinstance(future.exception(timeout=2), ValueError)
+    runner.close()
+    assert runner.stats()["errors"] == 1
+
+
+def test_features_from_sample_orders_and_marks_missing() -> None:
+    row = features_from_sample({"b": "2.5", "a": 1, "c": "x"}, ("a", "b", "c"))
+    assert row.dtype == np.float32
+    assert row[:2].tolist() == [1.0, 2.5] and np.isnan(row[2])
+
+
+def test_real_onnx_session_is_cached(tmp_path) -> None:
+    pytest.importorskip("onnxruntime")
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = numpy_helper.from_array(np.array([[1.0], [2.0]], dtype=np.float32), name="W")
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["X", "W"], ["Y"])],
+        "linear",
+        [helper.make_tensor_value_info("X", TensorProto.FLOAT, [None, 2])],
+        [helper.make_tensor_value_info("Y", TensorProto.FLOAT, [None, 1])],
+        [weights],
+    )
+    path = tmp_path / "linear.onnx"
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)]), str(path))
+
+    onnx_runner.clear_sessions()
+    first, _ = onnx_runner.load_session(str(path), threads=1)
+    second, _ = onnx_runner.load_session(str(path), threads=1)
+    assert first is second
+    runner = OnnxModelRunner(str(path), feature_names=("a", "b"), batch_size=2, threads=1)
+    assert runner.submit({"a": 1.0, "b": 1.0}).result(timeout=5) == pytest.approx([3.0])
+    runner.close()
@@ -0,0 +1,80 @@
+import math
+import random
+from datetime import UTC, datetime, timedelta
+from statistics import median
+
+from src.models.mad_anomaly import RollingMadAnomalyDetector
+from src.models.order_stats import SortedWindow
+
+
+def _reference_state(window: list[float], value: float, detector: RollingMadAnomalyDetector) -> tuple[float, float, float]:
+    med = median(window)
+    mad = median([abs(sample - med) for sample in window])
+    scaled = detector.scale_factor * mad
+    if scaled == 0.0:
+        diff = value - med
+        score = 0.0 if diff == 0.0 else detector.mad_threshold + abs(diff)
+    else:
+        score = (value - med) / scaled
+    return med, mad, score
+
+
+def test_sorted_window_matches_statistics_median() -> None:
+    rng = random.Random(3)
+    for _ in range(500):
+        values = [round(rng.uniform(-5.0, 5.0), rng.choice([0, 1, 2])) for _ in range(rng.randint(1, 30))]
+        window = SortedWindow(values)
+        med = median(values)
+        assert window.median_and_mad() == (med, median([abs(v - med) for v in values]))
+
+
+def test_sliding_window_and_sweep_match_statistics_median() -> None:
+    # La búsqueda de la MAD arranca del reparto de la fila anterior: ventanas
+    # que cambian de forma (empates, colas, tamaños variables) no deben notarlo.
+    rng = random.Random(11)
+    values = [
+        rng.choice([1.0, 2.0, 2.5, round(rng.gauss(10.0, 3.0), 1), rng.expovariate(1.0), rng.gauss(0.0, 50.0)])
+        for _ in range(3000)
+    ]
+    starts, expected = [], []
+    start = 0
+    window = SortedWindow()
+    for pos, value in enumerate(values):
+        window.add(value)
+        start = max(start, pos + 1 - rng.randint(1, 80))
+        while len(window) > pos + 1 - start:
+            window.remove(values[pos - len(window) + 1])
+        current = values[start:pos + 1]
+        med = median(current)
+        expected.append((med, median([abs(v - med) for v in current])))
+        assert window.median_and_mad() == expected[-1], pos
+        starts.append(start)
+
+    swept = SortedWindow()
+    medians, mads = swept.sweep(values, starts, range(len(values)))
+    assert list(zip(medians, mads)) == expected
+    assert list(swept._values) == sorted(values[starts[-1]:])
+
+
+def test_mad_detector_matches_reference_on_12h_air_temp_trace() -> None:
+    # Traza de 12 h de air_temp_c a 10 s con ciclo diario, ruido y valores repetidos.
+    rng = random.Random(12)
+    base = datetime(2025, 6, 1, 6, tzinfo=UTC)
+    detector = RollingMadAnomalyDetector(
+        metric="air_temp_c", window=timedelta(hours=3), min_samples=60, mad_threshold=3.0, max_samples=512
+    )
+    window: list[tuple[datetime, float]] = []
+    for idx in range(12 * 360):
+        ts = base + timedelta(seconds=10 * idx)
+        value = round(18.0 + 7.0 * math.sin(idx / 4320 * math.pi) + rng.gauss(0.0, 0.3), 1)
+        state = detector.evaluate(ts, value)
+
+        window = [sample for sample in window if sample[0] >= ts - detector.window]
+        window.append((ts, value))
+        window = window[-detector.max_samples:]
+        med, mad, score = _reference_state([sample[1] for sample in window], value, detector)
+
+        assert state["air_temp_c_mad_window_samples"] == len(window)
+        assert state["air_temp_c_mad_median"] == round(med, 3)
+        assert state["air_temp_c_mad_deviation"] == round(mad, 3)
+        assert state["air_temp_c_mad_score"] == round(score, 3)
@@ -0,0 +1,68 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models.detector_bank import DetectorBank, DetectorConfig
+from src.models.result import DetectorResult, ResultChain, ResultLayout, as_dict
+from src.models.zscore_anomaly import RollingAnomalyDetector
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def test_detector_result_rounds_lazily_and_compares_as_dict() -> None:
+    layout = ResultLayout("m", (("mean", 3), ("anomaly", None)))
+    result = layout.build(1.23456, True)
+    assert isinstance(result, DetectorResult)
+    assert result["m_mean"] == 1.235
+    assert result == {"m_mean": 1.235, "m_anomaly": True}
+    assert "m_anomaly" in result and "anomaly" not in result
+    assert result.to_dict() == dict(result)
+    with pytest.raises(KeyError):
+        result["m_std"]
+
+
+def test_detectors_share_precomputed_keys() -> None:
+    detector = RollingAnomalyDetector(metric="soil", min_samples=1)
+    first = detector.evaluate(BASE, 1.0)
+    second = detector.evaluate(BASE + timedelta(hours=1), 2.0)
+    assert first._layout is second._layout
+    assert list(second) == [
+        "soil_window_samples",
+        "soil_window_hours",
+        "soil_rolling_mean",
+        "soil_rolling_std",
+        "soil_zscore",
+        "soil_anomaly",
+        "soil_window_ready",
+    ]
+
+
+def test_result_chain_follows_update_order() -> None:
+    chain = ResultChain(({"a": 1, "b": 1}, ResultLayout("x", (("v", 1),)).build(2.04)))
+    chain.append({"b": 2})
+    chain["c"] = 3
+    assert chain["b"] == 2 and chain["x_v"] == 2.0
+    assert chain.get("missing") is None
+    assert as_dict(chain) == {"a": 1, "b": 2, "x_v": 2.0, "c": 3}
+    assert len(chain) == 4
+    assert list(chain) == list(chain.to_dict()) == ["a", "b", "x_v", "c"]
+
+
+def test_result_chain_iterates_without_merging(monkeypatch) -> None:
+    chain = ResultChain(({"a": 1}, {"b": 2, "a": 3}), extra={"b": 4})
+
+    def fail(self) -> None:
+        raise AssertionError("to_dict no debería llamarse al iterar")
+
+    monkeypatch.setattr(ResultChain, "to_dict", fail)
+    assert list(chain) == ["a", "b"] and len(chain) == 2
+    assert dict(chain.items()) == {"a": 3, "b": 4}
+
+
+def test_bank_chains_multi_detector_outputs() -> None:
+    bank = DetectorBank(
+        {"t": (DetectorConfig(method="zscore", min_samples=1), DetectorConfig(method="mad", min_samples=1))}
+    )
+    out = bank.evaluate_sample({"ts": BASE, "t": 20.0})
+    assert isinstance(out, ResultChain)
+    assert {"t_zscore", "t_mad_score"} <= set(out.to_dict())
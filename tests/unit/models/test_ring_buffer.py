@@ -0,0 +1,63 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models.ring_buffer import TimeSeriesRing
+from src.models.zscore_anomaly import RollingAnomalyDetector
+
+
+def test_ring_wraps_and_pops_from_both_ends() -> None:
+    ring = TimeSeriesRing(3)
+    for idx in range(3):
+        ring.append(idx, float(idx))
+    assert ring.is_full()
+    with pytest.raises(IndexError):
+        ring.append(3, 3.0)
+
+    assert ring.popleft() == (0, 0.0)
+    ring.append(3, 3.0)
+    assert list(ring) == [(1, 1.0), (2, 2.0), (3, 3.0)]
+    assert (ring.first_ts, ring.last_ts) == (1, 3)
+    ts, values = ring.to_arrays()
+    assert list(ts) == [1, 2, 3] and list(values) == [1.0, 2.0, 3.0]
+
+    assert ring.pop() == (3, 3.0)
+    ring.appendleft(0, 0.5)
+    assert list(ring.values()) == [0.5, 1.0, 2.0]
+
+
+def test_detector_window_is_capped_by_preallocated_ring() -> None:
+    detector = RollingAnomalyDetector(metric="soil", window=timedelta(days=1), min_samples=2, max_samples=4)
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    for idx in range(10):
+        state = detector.evaluate(base + timedelta(minutes=idx), float(idx))
+
+    assert state["soil_window_samples"] == 4
+    assert state["soil_rolling_mean"] == 7.5
+    assert detector._samples.nbytes() == 4 * 16
+
+
+def test_ring_bytes_roundtrip_keeps_order_after_wrap() -> None:
+    ring = TimeSeriesRing(4)
+    for idx in range(6):
+        if ring.is_full():
+            ring.popleft()
+        ring.append(idx, float(idx) / 2)
+
+    copy = TimeSeriesRing(4)
+    copy.load_bytes(ring.to_bytes())
+    assert list(copy) == list(ring)
+
+
+def test_truncated_window_is_rejected_and_left_intact() -> None:
+    detector = RollingAnomalyDetector(metric="soil", window=timedelta(days=1), min_samples=2)
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    for idx in range(5):
+        detector.evaluate(base + timedelta(minutes=idx), float(idx))
+    blob = detector.to_bytes()
+
+    clone = RollingAnomalyDetector(metric="soil", window=timedelta(days=1), min_samples=2)
+    for cut in (3, len(blob) - 8):
+        with pytest.raises(ValueError):
+            clone.restore(blob[:cut])
+    assert clone.window_size() == 0
@@ -0,0 +1,61 @@
+import random
+from datetime import UTC, datetime, timedelta
+from statistics import fmean, pstdev
+
+import pytest
+
+from src.models.rolling_stats import RollingMoments
+from src.models.zscore_anomaly import RollingAnomalyDetector
+
+
+def test_moments_match_reference_with_evictions() -> None:
+    rng = random.Random(7)
+    moments = RollingMoments(reanchor_every=50)
+    window: list[float] = []
+    for _ in range(500):
+        value = rng.gauss(40.0, 5.0)
+        window.append(value)
+        moments.push(value)
+        if len(window) > 32:
+            moments.pop(window.pop(0))
+        if moments.needs_reanchor():
+            moments.reanchor(window)
+        avg, std_dev = moments.stats()
+        assert avg == pytest.approx(fmean(window), abs=1e-9)
+        assert std_dev == pytest.approx(pstdev(window), abs=1e-9)
+
+
+def test_constant_window_after_variation_has_zero_std() -> None:
+    detector = RollingAnomalyDetector(metric="soil", min_samples=3, z_threshold=1.0, max_samples=4)
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    for idx, value in enumerate([12.3, 57.1, 0.7, 33.3]):
+        detector.evaluate(base + timedelta(minutes=idx), value)
+    for idx in range(4, 8):
+        state = detector.evaluate(base + timedelta(minutes=idx), 21.1)
+
+    assert state["soil_rolling_std"] == 0.0
+    assert state["soil_rolling_mean"] == 21.1
+    assert state["soil_anomaly"] is False
+
+
+@pytest.mark.parametrize("max_samples", [256, 4096, 16384])
+def test_reanchor_work_per_sample_is_flat(monkeypatch: pytest.MonkeyPatch, max_samples: int) -> None:
+    touched = []
+    original = RollingMoments.reanchor
+
+    def counting(self: RollingMoments, values) -> None:
+        values_list = list(values)
+        touched.append(len(values_list))
+        original(self, values_list)
+
+    monkeypatch.setattr(RollingMoments, "reanchor", counting)
+    detector = RollingAnomalyDetector(
+        metric="soil", window=timedelta(days=365), min_samples=1, max_samples=max_samples
+    )
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    total = 3 * max_samples
+    for idx in range(total):
+        detector.evaluate(base + timedelta(seconds=10 * idx), float(idx % 97))
+
+    assert detector._moments.reanchor_every >= max_samples
+    assert sum(touched) / total <= 2.0
@@ -0,0 +1,69 @@
+import math
+import random
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models.detector_bank import DetectorConfig, build_detector, result_keys
+from src.models.mad_anomaly import RollingMadAnomalyDetector
+from src.models.seasonal_anomaly import SeasonalAnomalyDetector
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def _daily_series(days: int, *, step_min: int = 10, seed: int = 7):
+    rng = random.Random(seed)
+    for idx in range(days * 1440 // step_min):
+        minutes = idx * step_min
+        # Rampa de amanecer pronunciada: 12 °C de noche, 28 °C al mediodía.
+        value = 20.0 - 8.0 * math.cos(2 * math.pi * minutes / 1440) + rng.gauss(0.0, 0.3)
+        yield BASE + timedelta(minutes=minutes), value
+
+
+def test_seasonal_ignores_daily_cycle_that_mad_flags() -> None:
+    seasonal = SeasonalAnomalyDetector(metric="t", days=7, min_samples=5, min_days=2, threshold=4.0)
+    mad = RollingMadAnomalyDetector(metric="t", window=timedelta(hours=12), min_samples=30, mad_threshold=3.0)
+    seasonal_hits = mad_hits = 0
+    for ts, value in _daily_series(6):
+        seasonal_hits += seasonal.evaluate(ts, value)["t_seasonal_anomaly"]
+        mad_hits += mad.evaluate(ts, value)["t_mad_anomaly"]
+    assert mad_hits > 10
+    assert seasonal_hits <= 2
+
+    spike = seasonal.evaluate(BASE + timedelta(days=6, hours=3), 25.0)
+    assert spike["t_seasonal_window_ready"] is True
+    assert spike["t_seasonal_anomaly"] is True
+    assert spike["t_seasonal_slot"] == 3
+    assert spike["t_seasonal_mean"] == pytest.approx(14.3, abs=1.0)
+
+
+def test_seasonal_slot_uses_local_offset() -> None:
+    detector = SeasonalAnomalyDetector(metric="t", slot_minutes=15, utc_offset=timedelta(hours=-4))
+    ts = BASE + timedelta(hours=6, minutes=20)
+    assert detector.evaluate(ts, 1.0)["t_seasonal_slot"] == (2 * 60 + 20) // 15
+    with pytest.raises(ValueError):
+        SeasonalAnomalyDetector(metric="t", slot_minutes=7)
+
+
+def test_seasonal_fit_and_roundtrip() -> None:
+    history = list(_daily_series(4))
+    detector = SeasonalAnomalyDetector(metric="t", min_samples=5)
+    assert detector.fit([ts for ts, _ in history], [value for _, value in history]) == len(history)
+    means, mads, weights = detector.profile()
+    assert means[12] > means[0] + 10
+    assert min(weights) > 5
+
+    clone = SeasonalAnomalyDetector(metric="t", min_samples=5)
+    clone.restore(detector.to_bytes())
+    ts = BASE + timedelta(days=4, hours=12)
+    assert clone.evaluate(ts, 27.5) == detector.evaluate(ts, 27.5)
+    with pytest.raises(ValueError):
+        SeasonalAnomalyDetector(metric="t", slot_minutes=30).restore(detector.to_bytes())
+
+
+def test_bank_builds_seasonal_detector() -> None:
+    detector = build_detector("lux", DetectorConfig(method="seasonal", window=timedelta(days=10), slot_minutes=30))
+    assert isinstance(detector, SeasonalAnomalyDetector)
+    assert detector.days == 10
+    keys = result_keys("lux", "seasonal")
+    assert keys["score"] in detector.evaluate(BASE, 3.0)
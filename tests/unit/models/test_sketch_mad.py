@@ -0,0 +1,87 @@
+import gc
+import math
+import random
+import statistics
+import tracemalloc
+from datetime import UTC, datetime, timedelta
+
+from src.models.detector_bank import DetectorBank, DetectorConfig
+from src.models.quantile_sketch import QuantileSketch
+from src.models.sketch_mad import SketchMadAnomalyDetector
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def _series(count: int, step_min: int = 10):
+    rng = random.Random(7)
+    timestamps = [BASE + timedelta(minutes=idx * step_min) for idx in range(count)]
+    values = [25.0 + 4.0 * math.sin(idx * step_min / 1440 * 2 * math.pi) + rng.gauss(0.0, 1.0) for idx in range(count)]
+    return timestamps, values
+
+
+def test_quantile_sketch_stays_bounded_and_accurate() -> None:
+    rng = random.Random(3)
+    values = [rng.random() for _ in range(50000)]
+    sketch = QuantileSketch(k=64)
+    for value in values:
+        sketch.update(value)
+
+    assert sketch.retained() <= 3 * 64
+    quartiles = sketch.quantiles(4)
+    ordered = sorted(values)
+    for idx, estimate in enumerate(quartiles):
+        true_rank = (idx + 0.5) / 4
+        assert abs(sum(value <= estimate for value in ordered) / len(ordered) - true_rank) < 0.05
+
+
+def test_sketch_tracks_exact_median_and_mad_in_fixed_memory() -> None:
+    timestamps, values = _series(14 * 144)  # 14 days every 10 min
+    detector = SketchMadAnomalyDetector(metric="soil", window=timedelta(days=7), refresh_every=1)
+    for ts, value in zip(timestamps, values):
+        result = detector.evaluate(ts, value)
+
+    cutoff = timestamps[-1] - timedelta(days=7)
+    window = [value for ts, value in zip(timestamps, values) if ts >= cutoff]
+    median = statistics.median(window)
+    mad = statistics.median(abs(value - median) for value in window)
+    assert abs(result["soil_mad_median"] - median) < 0.15 * mad
+    assert abs(result["soil_mad_deviation"] - mad) < 0.15 * mad
+    assert detector.nbytes() <= 16 * 1024
+    assert len(detector.to_bytes()) <= 8 * 1024
+
+
+def test_retained_memory_stays_within_nbytes() -> None:
+    timestamps, values = _series(3 * 7 * 144 * 4, step_min=2)  # three 7-day windows every 2 min
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        detector = SketchMadAnomalyDetector(metric="soil", window=timedelta(days=7))
+        for ts, value in zip(timestamps, values):
+            detector.evaluate(ts, value)
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    scope = [tracemalloc.Filter(True, "*/src/models/*")]
+    retained = sum(stat.size_diff for stat in after.filter_traces(scope).compare_to(before.filter_traces(scope), "filename"))
+    assert 0 < retained <= detector.nbytes() <= 16 * 1024
+
+
+def test_sketch_flags_spike_and_restores_from_bytes() -> None:
+    timestamps, values = _series(600)
+    detector = SketchMadAnomalyDetector(metric="soil", window=timedelta(days=3), min_samples=50)
+    for ts, value in zip(timestamps, values):
+        detector.evaluate(ts, value)
+
+    clone = SketchMadAnomalyDetector(metric="soil", window=timedelta(days=3), min_samples=50)
+    clone.restore(detector.to_bytes())
+    spike_ts = timestamps[-1] + timedelta(minutes=10)
+    spike = detector.evaluate(spike_ts, 60.0)
+    assert spike["soil_mad_anomaly"] is True
+    assert clone.evaluate(spike_ts, 60.0) == spike
+
+
+def test_bank_builds_sketch_detectors() -> None:
+    bank = DetectorBank({"soil": (DetectorConfig(method="mad_sketch", window=timedelta(days=21)),)})
+    result = bank.evaluate("n1", "soil", BASE, 31.0)
+    assert result["soil_mad_window_samples"] == 1
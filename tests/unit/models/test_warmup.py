@@ -0,0 +1,74 @@
+from datetime import UTC, datetime, timedelta
+
+from src.acquisition.db import SensorDatabase
+from src.models.detector_bank import DetectorBank, DetectorConfig
+from src.models.warmup import warm_up
+from src.models.zscore_anomaly import RollingAnomalyDetector
+from src.timeutils import datetime_to_ns, iso_from_ns
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+CONFIG = DetectorConfig(method="zscore", window=timedelta(hours=1), min_samples=10, threshold=3.0, max_samples=512)
+
+
+def _seed(db: SensorDatabase, node_id: str, minutes: int, start: int = 0) -> None:
+    db.insert_samples_batch(
+        [
+            {
+                "ts": iso_from_ns(datetime_to_ns(BASE + timedelta(minutes=idx))),
+                "node_id": node_id,
+                "source": "meteo",
+                "metric": "temp_aire",
+                "value": 20.0 + idx % 5,
+                "unit": "°C",
+            }
+            for idx in range(start, start + minutes)
+        ]
+    )
+
+
+def test_warm_up_loads_last_window_per_node(tmp_path) -> None:
+    db = SensorDatabase(str(tmp_path / "sensors.db"))
+    _seed(db, "n1", 180)
+    _seed(db, "n2", 5, start=170)
+    bank = DetectorBank({"air_temp_c": (CONFIG,)})
+    end = BASE + timedelta(minutes=179)
+
+    report = warm_up(bank, db, reference_ns=datetime_to_ns(end))
+
+    assert report.samples == {"air_temp_c": 66}
+    assert (report.detectors, report.ready) == (2, 1)
+    reference = RollingAnomalyDetector(metric="air_temp_c", window=timedelta(hours=1), min_samples=10, max_samples=512)
+    for idx in range(180):
+        reference.evaluate(BASE + timedelta(minutes=idx), 20.0 + idx % 5)
+    next_ts = end + timedelta(minutes=1)
+    assert bank.evaluate("n1", "air_temp_c", next_ts, 30.0) == reference.evaluate(next_ts, 30.0)
+
+
+def test_load_history_skips_invalid_and_older_samples() -> None:
+    detector = RollingAnomalyDetector(metric="m", window=timedelta(hours=1), min_samples=2)
+    detector.evaluate(BASE + timedelta(minutes=10), 1.0)
+    loaded = detector.load_history(
+        [BASE + timedelta(minutes=idx) for idx in (5, 11, 12)],
+        [9.0, None, 3.0],
+    )
+    assert loaded == 1
+    assert detector.window_size() == 2
+
+
+def test_warm_up_reads_each_detector_window_only(tmp_path) -> None:
+    db = SensorDatabase(str(tmp_path / "sensors.db"))
+    _seed(db, "n1", 240)
+    long_config = DetectorConfig(method="mad", window=timedelta(hours=3), min_samples=10, max_samples=512)
+    bank = DetectorBank({"air_temp_c": (CONFIG, long_config)})
+
+    report = warm_up(bank, db, reference_ns=datetime_to_ns(BASE + timedelta(minutes=239)))
+
+    assert report.samples == {"air_temp_c": 181}
+    assert bank.get("n1", "air_temp_c", CONFIG).window_size() == 61
+    assert bank.get("n1", "air_temp_c", long_config).window_size() == 181
+
+
+def test_default_map_skips_soil_counts() -> None:
+    from src.models.warmup import DEFAULT_METRIC_MAP
+
+    assert "soil_moisture_pct" not in DEFAULT_METRIC_MAP
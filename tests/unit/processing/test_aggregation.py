@@ -0,0 +1,52 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.processing.aggregation import TumblingAggregator, widths_from_setting
+from src.processing.pipeline import Pipeline
+
+BASE_NS = int(datetime(2025, 1, 1, tzinfo=UTC).timestamp()) * 10**9
+
+
+def _sample(seconds: int, value: float, metric: str = "temp_aire") -> dict:
+    return {"ts_ns": BASE_NS + seconds * 10**9, "node_id": "n1", "metric": metric, "value": value, "unit": "C"}
+
+
+def test_windows_close_and_carry_min_max_mean_last() -> None:
+    stage = TumblingAggregator((timedelta(minutes=1), timedelta(minutes=5)), emit_raw=False)
+    emitted = []
+    for seconds, value in [(0, 1.0), (20, 5.0), (50, 3.0), (70, 10.0)]:
+        emitted += stage.process(_sample(seconds, value))
+    assert len(emitted) == 1
+    minute = emitted[0]
+    assert minute["window_s"] == 60 and minute["ts_ns"] == BASE_NS
+    assert (minute["value"], minute["value_min"], minute["value_max"]) == (3.0, 1.0, 5.0)
+    assert minute["value_count"] == 3 and minute["value_last"] == 3.0 and minute["unit"] == "C"
+
+    tail = stage.flush()
+    assert [(item["window_s"], item["value_count"]) for item in tail] == [(300, 4), (60, 1)]
+    assert stage.open_windows() == 0
+
+
+def test_late_samples_are_counted_not_merged() -> None:
+    stage = TumblingAggregator((timedelta(minutes=1),))
+    assert len(stage.process(_sample(0, 1.0))) == 1
+    closed = stage.process(_sample(65, 2.0))
+    assert closed[0]["metric"] == "temp_aire" and closed[1]["aggregate"] is True
+    stage.process(_sample(10, 99.0))
+    assert stage.late == 1
+    assert stage.flush()[0]["value_max"] == 2.0
+
+
+def test_wide_samples_and_pipeline_flush() -> None:
+    stage = TumblingAggregator((timedelta(minutes=1),), emit_raw=False, metrics=("a", "b"))
+    samples = [{"ts_ns": BASE_NS + idx * 30 * 10**9, "node_id": "n1", "a": idx, "b": "x"} for idx in range(4)]
+    out = list(Pipeline((stage,)).run(samples))
+    assert [(item["metric"], item["value"]) for item in out] == [("a", 0.5), ("a", 2.5)]
+
+
+def test_widths_from_setting() -> None:
+    assert widths_from_setting("60, 900,bad") == (timedelta(seconds=60), timedelta(seconds=900))
+    assert len(widths_from_setting("")) == 3
+    with pytest.raises(ValueError):
+        TumblingAggregator(())
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from src.processing.calibration import CalibrationCurve, CalibrationSet, CalibrationStage, load_calibration
+
+SPEC = {
+    "version": "test-v1",
+    "sensors": {
+        "humedad_suelo": {"kind": "piecewise", "points": [[300, 100], [650, 40], [1000, 0]], "unit": "%"},
+        "luminosidad": {"kind": "polynomial", "coefficients": [0, 2.0, 0.01], "unit": "lux", "clip": [0, 5000]},
+    },
+}
+
+
+def test_tables_match_curves_at_every_count() -> None:
+    calibration = CalibrationSet.from_dict(SPEC)
+    soil = calibration.tables["humedad_suelo"]
+    assert len(soil) == 1024
+    assert [soil.convert(c) for c in (0, 300, 475, 650, 825, 1000, 1023)] == pytest.approx([100, 100, 70, 40, 20, 0, 0])
+    light = calibration.curves["luminosidad"]
+    assert calibration.convert("luminosidad", 100) == light.evaluate(100.0) == pytest.approx(300.0)
+    assert calibration.convert("luminosidad", 1023) == 5000.0
+    assert calibration.convert("humedad_suelo", 474.6) == soil.convert(475) and soil.convert("x") is None
+    assert calibration.convert("temp_aire", "21.5") == 21.5
+
+
+def test_convert_columns_matches_per_sample() -> None:
+    np = pytest.importorskip("numpy")
+    calibration = CalibrationSet.from_dict(SPEC)
+    metrics = np.array(["humedad_suelo", "luminosidad", "temp_aire", "humedad_suelo", "humedad_suelo"], dtype=object)
+    values = [812.0, 40.0, 21.5, float("nan"), -5.0]
+    converted = calibration.convert_columns(metrics, values)
+    expected = [calibration.convert(m, v) for m, v in zip(metrics.tolist(), values)]
+    assert converted[[0, 1, 2, 4]].tolist() == [expected[0], expected[1], expected[2], expected[4]]
+    assert np.isnan(converted[3])
+
+
+@pytest.mark.parametrize("raw", ["inf", float("inf"), "-inf", float("nan")])
+def test_non_finite_readings_are_missing(raw) -> None:
+    np = pytest.importorskip("numpy")
+    calibration = CalibrationSet.from_dict(SPEC)
+    for metric in ("humedad_suelo", "luminosidad", "temp_aire"):
+        assert calibration.convert(metric, raw) is None
+        assert np.isnan(calibration.convert_columns(np.array([metric], dtype=object), [float(raw)])).all()
+    assert np.isnan(calibration.tables["humedad_suelo"].convert_array([float(raw), 812.0])[0])
+
+
+def test_stage_calibrates_once_and_keeps_counts() -> None:
+    stage = CalibrationStage(CalibrationSet.from_dict(SPEC))
+    sample = stage.process({"metric": "humedad_suelo", "value": 650, "unit": ""})
+    assert (sample["value"], sample["value_adc"], sample["unit"]) == (40.0, 650, "%")
+    assert stage.process(sample)["value"] == 40.0
+    wide = stage.process({"humedad_suelo": 300, "luminosidad": 0})
+    assert wide["humedad_suelo"] == 100.0 and wide["luminosidad_adc"] == 0
+
+
+def test_versions_recorded_once_in_state_store(tmp_path) -> None:
+    from src.acquisition.state_store import StateStore
+
+    path = tmp_path / "calibration.json"
+    path.write_text(json.dumps(SPEC), encoding="utf-8")
+    calibration = load_calibration(str(path))
+    store = StateStore(db_path=str(tmp_path / "state.db"))
+    assert calibration.record_version(store, "n1") is not None
+    assert calibration.record_version(store, "n1") is None
+    stored = store.find_config_version(calibration.sha256)
+    assert stored["version_tag"] == "test-v1"
+    assert stored["payload"]["calibration"]["sensors"]["humedad_suelo"]["points"][1] == [650.0, 40.0]
+
+    assert not load_calibration(str(tmp_path / "missing.json"))
+    with pytest.raises(ValueError):
+        CalibrationCurve("piecewise", points=((10.0, 1.0), (5.0, 2.0)))
+
+
+def test_curves_evaluate_arrays_exactly_and_convert_soil_fractions() -> None:
+    np = pytest.importorskip("numpy")
+    from src.processing.calibration import SOIL_FRACTION_CURVE
+    from src.processing.stub import soil_percent
+
+    calibration = CalibrationSet.from_dict(SPEC)
+    raw = [-3.0, 0.0, 299.5, 301.25, 474.6, 812.0, 1000.0, 1500.0]
+    for curve in calibration.curves.values():
+        assert curve.evaluate_array(raw).tolist() == [curve.evaluate(value) for value in raw]
+    fractions = [-0.1, 0.0, 0.285, 0.5, 1.2]
+    assert SOIL_FRACTION_CURVE.evaluate_array(fractions).tolist() == [0.0, 0.0, 28.499999999999996, 50.0, 100.0]
+    assert [soil_percent(value) for value in fractions] == [0.0, 0.0, 28.5, 50.0, 100.0]
+    assert np.isnan(SOIL_FRACTION_CURVE.evaluate_array([float("nan")])[0])
+
+
+def test_no_calibration_by_default() -> None:
+    import os
+
+    from src.config import Settings
+
+    assert Settings().calibration_path == os.getenv("NAIRA_CALIBRATION_PATH", "")
+    assert not load_calibration("")
@@ -0,0 +1,46 @@
+from datetime import UTC, datetime, timedelta
+
+from src.processing.deadband import DeadbandFilter, DeadbandRule, rules_from_setting
+from src.processing.pipeline import Pipeline
+
+BASE_NS = int(datetime(2025, 1, 1, tzinfo=UTC).timestamp()) * 10**9
+
+
+def _sample(seconds: int, value: float, metric: str = "luminosidad", quality: str = "ok") -> dict:
+    return {"ts_ns": BASE_NS + seconds * 10**9, "node_id": "n1", "metric": metric, "value": value, "quality": quality}
+
+
+def test_absolute_threshold_and_heartbeat() -> None:
+    stage = DeadbandFilter({"temp_aire": DeadbandRule(absolute=0.5, max_silence=timedelta(minutes=10))})
+    readings = [(0, 20.0), (30, 20.2), (60, 20.4), (90, 20.6), (120, 20.7), (720, 20.7)]
+    kept = [seconds for seconds, value in readings if stage.process(_sample(seconds, value, "temp_aire"))]
+    assert kept == [0, 90, 720]
+    assert stage.heartbeats == 1
+    assert stage.stats() == {"passed": 3, "suppressed": 3, "heartbeats": 1, "suppression_ratio": 0.5}
+
+
+def test_relative_threshold_quality_change_and_unfiltered_metrics() -> None:
+    stage = DeadbandFilter({"luminosidad": DeadbandRule(relative=0.05)})
+    assert stage.process(_sample(0, 400.0))
+    assert stage.process(_sample(1, 415.0)) is None
+    assert stage.process(_sample(2, 421.0))
+    assert stage.process(_sample(3, 421.0, quality="bad"))
+    assert stage.process(_sample(4, 7.0, metric="temp_aire"))
+    assert stage.process(_sample(5, 7.0, metric="temp_aire"))
+    assert stage.latest("n1") == {"luminosidad": 421.0, "temp_aire": 7.0}
+
+
+def test_latest_keeps_suppressed_values_inside_pipeline() -> None:
+    stage = DeadbandFilter(default=DeadbandRule(absolute=1.0))
+    pipeline = Pipeline((stage,))
+    outputs = list(pipeline.run(_sample(seconds, value) for seconds, value in [(0, 10.0), (1, 10.5), (2, 10.8)]))
+    assert [item["value"] for item in outputs] == [10.0]
+    assert stage.latest() == {"luminosidad": 10.8}
+
+
+def test_rules_from_setting() -> None:
+    rules = rules_from_setting("temp_aire:0.2, luminosidad:5%,bad,humedad_suelo:x", max_silence=timedelta(minutes=1))
+    assert rules == {
+        "temp_aire": DeadbandRule(absolute=0.2, max_silence=timedelta(minutes=1)),
+        "luminosidad": DeadbandRule(relative=0.05, max_silence=timedelta(minutes=1)),
+    }
@@ -0,0 +1,79 @@
+import random
+import statistics
+
+import pytest
+
+from src.processing.denoise import DenoiseStage, FilterSpec, RunningMedian, ScalarKalman, specs_from_setting
+from src.processing.pipeline import Pipeline
+
+
+def _long(value: float, metric: str = "humedad_suelo", node: str = "n1") -> dict:
+    return {"node_id": node, "metric": metric, "value": value}
+
+
+def test_running_median_matches_window_median() -> None:
+    rng = random.Random(4)
+    values = [rng.choice([rng.gauss(500, 5), 1023.0]) for _ in range(300)]
+    median = RunningMedian(7)
+    for idx, value in enumerate(values):
+        assert median.update(value) == statistics.median(values[max(0, idx - 6):idx + 1])
+
+
+def test_kalman_reduces_noise_and_converges() -> None:
+    rng = random.Random(1)
+    kalman = ScalarKalman(q=0.01, r=25.0)
+    noisy = [300.0 + rng.gauss(0, 5) for _ in range(500)]
+    smooth = [kalman.update(value) for value in noisy]
+    assert statistics.pstdev(smooth[100:]) < statistics.pstdev(noisy[100:]) / 3
+    assert smooth[-1] == pytest.approx(300.0, abs=2.0)
+
+
+def test_output_selection_per_metric_and_wide_samples() -> None:
+    stage = DenoiseStage({
+        "humedad_suelo": FilterSpec("median", window=3),
+        "luminosidad": FilterSpec("kalman", output="filtered"),
+        "soil_moisture_pct": FilterSpec("median", window=3),
+    })
+    pipeline = Pipeline((stage,))
+    outputs = list(pipeline.run(_long(value) for value in (500.0, 900.0, 510.0)))
+    assert [item["value"] for item in outputs] == [500.0, 700.0, 510.0]
+    assert outputs[1]["value_raw"] == 900.0
+
+    light = stage.process(_long(120.0, metric="luminosidad"))
+    assert light["value"] == 120.0 and light["value_filtered"] == 120.0
+    untouched = stage.process(_long(21.5, metric="temp_aire"))
+    assert "value_raw" not in untouched and "value_filtered" not in untouched
+
+    wide = stage.process({"node_id": "n2", "soil_moisture_pct": 40.0, "luminosidad": 50.0})
+    assert wide["soil_moisture_pct_raw"] == 40.0 and wide["luminosidad_filtered"] == 50.0
+
+
+def test_state_round_trip_and_filter_columns() -> None:
+    np = pytest.importorskip("numpy")
+    specs = {"humedad_suelo": FilterSpec("median", window=3), "luminosidad": FilterSpec("kalman")}
+    stage = DenoiseStage(specs)
+    for value in (500.0, 520.0, 480.0):
+        stage.process(_long(value))
+        stage.process(_long(value / 4, metric="luminosidad"))
+    restored = DenoiseStage(specs)
+    assert restored.restore_bytes(stage.to_bytes()) == 2
+    assert restored.process(_long(530.0))["value"] == stage.process(_long(530.0))["value"]
+
+    columns = DenoiseStage(specs).filter_columns(
+        ["n1", "n1", "n1", "n1"],
+        np.array(["humedad_suelo", "temp_aire", "humedad_suelo", "humedad_suelo"], dtype=object),
+        [500.0, 21.0, 900.0, 510.0],
+    )
+    assert columns["value"].tolist() == [500.0, 21.0, 700.0, 510.0]
+    assert columns["value_raw"].tolist() == [500.0, 21.0, 900.0, 510.0]
+
+    changed = DenoiseStage({"humedad_suelo": FilterSpec("kalman")})
+    assert changed.restore_bytes(stage.to_bytes()) == 0
+
+
+def test_specs_from_setting() -> None:
+    specs = specs_from_setting("humedad_suelo:median:window=5, luminosidad:kalman:q=0.5:r=9:output=filtered,x:fft,y")
+    assert specs == {
+        "humedad_suelo": FilterSpec("median", window=5),
+        "luminosidad": FilterSpec("kalman", q=0.5, r=9.0, output="filtered"),
+    }
@@ -0,0 +1,65 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.processing import indicators
+from src.processing.indicators import IndicatorStage
+from src.processing.pipeline import Pipeline
+
+BASE = datetime(2025, 6, 1, tzinfo=UTC)
+
+
+def _sample(hours: float, temp: float, rh: float = 50.0, **extra) -> dict:
+    ts = BASE + timedelta(hours=hours)
+    return {"ts_ns": int(ts.timestamp()) * 10**9, "node_id": "n1", "air_temp_c": temp, "air_humidity_pct": rh, **extra}
+
+
+def test_formulas_match_fao56_examples() -> None:
+    assert indicators.saturation_vapor_pressure(20.0) == pytest.approx(2.338, abs=1e-3)
+    assert indicators.vapor_pressure_deficit(20.0, 50.0) == pytest.approx(1.169, abs=1e-3)
+    assert indicators.dew_point(25.0, 60.0) == pytest.approx(16.7, abs=0.1)
+    # FAO-56, ejemplo 19 (14-15 h): Rn = 1.749 MJ/(m²·h), u2 = 3.3 m/s → 0.63 mm/h.
+    radiation = 1.749 / (0.77 * 0.0036)
+    rate = indicators.et0_hourly(38.0, 52.0, radiation, 3.3, indicators.pressure_from_altitude(8.0))
+    assert rate == pytest.approx(0.63, abs=0.01)
+    assert indicators.growing_degree_days(8.0, 35.0) == 9.0
+
+
+def test_vectorized_compute_matches_scalars() -> None:
+    np = pytest.importorskip("numpy")
+    temp, rh, rad = np.array([12.0, 25.0, 38.0]), np.array([90.0, 60.0, 52.0]), np.array([0.0, 300.0, 800.0])
+    batch = indicators.compute(temp, rh, rad)
+    for idx in range(3):
+        single = indicators.compute(float(temp[idx]), float(rh[idx]), float(rad[idx]))
+        for key, value in single.items():
+            assert batch[key][idx] == pytest.approx(value)
+
+
+def test_stage_accumulates_per_day_and_survives_restart() -> None:
+    stage = IndicatorStage(base_c=10.0, upper_c=30.0)
+    for hours, temp in [(0, 12.0), (6, 20.0), (12, 28.0)]:
+        out = stage.process(_sample(hours, temp, light_lux=126.7 * 500))
+    assert out["gdd_today"] == 10.0 and out["gdd_total"] == 10.0
+    assert out["et0_mm_h"] > 0 and out["et0_today_mm"] == 0.0  # huecos de 6 h no se integran
+
+    stage.process(_sample(12.5, 26.0, solar_radiation_wm2=500.0))
+    assert stage.accumulators("n1").et0_mm > 0
+
+    clone = IndicatorStage(base_c=10.0, upper_c=30.0)
+    assert clone.restore_bytes(stage.to_bytes()) == 1
+    nextday = clone.process(_sample(25, 16.0))
+    assert nextday["gdd_today"] == 6.0 and nextday["gdd_total"] == 16.0
+    assert nextday["et0_mm_h"] is None and nextday["et0_today_mm"] == 0.0
+    with pytest.raises(ValueError):
+        clone.restore_bytes(b"XXXX")
+
+
+def test_stage_batch_equals_per_sample_and_skips_long_rows() -> None:
+    pytest.importorskip("numpy")
+    samples = [_sample(idx * 0.25, 15.0 + idx, 40.0 + idx, light_lux=20000.0) for idx in range(8)]
+    samples.append({"ts_ns": samples[-1]["ts_ns"] + 1, "node_id": "n1", "metric": "luminosidad", "value": 3.0})
+    scalar_stage = IndicatorStage()
+    expected = [scalar_stage.process(dict(sample)) for sample in samples]
+    batched = next(Pipeline((IndicatorStage(),)).run_batches([[dict(sample) for sample in samples]]))
+    assert batched == expected
+    assert "vpd_kpa" not in batched[-1] and batched[0]["gdd_total"] == 5.0
@@ -0,0 +1,76 @@
+import pytest
+
+from src.processing import stub as processing_stub
+from src.processing.pipeline import Pipeline, Stage, stage
+
+
+@stage(reads=("x",), writes=("double",))
+def _double(sample):
+    sample["double"] = sample["x"] * 2
+    return sample
+
+
+@stage(reads=("x",))
+def _drop_odd(sample):
+    return None if sample["x"] % 2 else sample
+
+
+class _Pairs(Stage):
+    name = "pairs"
+    fanout = True
+
+    def __init__(self):
+        self.held = []
+
+    def process(self, sample):
+        self.held.append(sample)
+        if len(self.held) < 2:
+            return []
+        out, self.held = self.held, []
+        return out
+
+    def flush(self):
+        out, self.held = self.held, []
+        return out
+
+
+def test_stream_runs_stages_in_place_and_counts() -> None:
+    pipeline = Pipeline((_drop_odd, _double), inputs=("x",))
+    samples = [{"x": idx} for idx in range(6)]
+    out = list(pipeline.run(samples))
+    assert [item["double"] for item in out] == [0, 4, 8]
+    assert out[0] is samples[0]
+    stats = pipeline.stats()
+    assert stats["drop_odd"]["received"] == 6 and stats["drop_odd"]["dropped"] == 3
+    assert stats["double"]["emitted"] == 3
+    assert pipeline.writes == ("double",)
+
+
+def test_fanout_stage_flushes_through_later_stages() -> None:
+    pipeline = Pipeline((_Pairs(), _double))
+    assert [item["double"] for item in pipeline.run({"x": idx} for idx in range(5))] == [0, 2, 4, 6, 8]
+    assert pipeline.feed({"x": 1}) == []
+    assert [item["double"] for item in pipeline.feed({"x": 2})] == [2, 4]
+    pipeline.feed({"x": 3})
+    assert [item["double"] for item in pipeline.flush()] == [6]
+    with pytest.raises(TypeError):
+        pipeline.process({"x": 1})
+
+    batches = list(Pipeline((_Pairs(), _double)).run_batches([[{"x": 1}], [{"x": 2}, {"x": 3}]]))
+    assert [[item["double"] for item in batch] for batch in batches] == [[2, 4], [6]]
+
+
+def test_pipeline_validates_declared_fields() -> None:
+    with pytest.raises(ValueError):
+        Pipeline((_double,), inputs=("y",))
+    with pytest.raises(ValueError):
+        Pipeline((_double, _double))
+
+
+def test_process_sample_runs_default_pipeline() -> None:
+    sample = {"ts": "2025-01-01T00:00:00Z", "soil_moisture": 0.2, "node_id": "pipeline-test"}
+    result = processing_stub.process_sample(sample)
+    assert "soil_moisture_pct" not in sample
+    assert result["soil_moisture_pct"] == 20.0 and result["dry_alert"] is True
+    assert result["anomaly_detected"] is False
+    assert processing_stub.get_pipeline().stats()["models"]["received"] >= 1
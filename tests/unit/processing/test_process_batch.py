@@ -0,0 +1,74 @@
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.models.batch import round_like_python  # noqa: E402
+from src.processing.stub import process_batch, process_sample, soil_percent  # noqa: E402
+
+BASE_NS = 1_735_689_600 * 10**9
+METRICS = ("soil_moisture", "air_temp_c", "air_humidity_pct", "luminosidad")
+
+
+def _rows(count: int, node: str, seed: int = 5):
+    rng = random.Random(seed)
+    rows = []
+    for idx in range(count):
+        metric = METRICS[idx % len(METRICS)]
+        if metric == "soil_moisture":
+            value = rng.choice([0.285, 0.15, 1.2, -0.1, "bad", 0.4 + rng.gauss(0.0, 0.03)])
+        elif metric == "air_temp_c":
+            value = 20.0 + 3.0 * math.sin(idx / 200) + rng.gauss(0.0, 0.4)
+        else:
+            value = 60.0 + rng.gauss(0.0, 2.0)
+        if idx in (900, 1500):
+            value = 95.0 if metric != "soil_moisture" else 0.05
+        rows.append({"ts_ns": BASE_NS + idx * 10**10 // len(METRICS), "node_id": node, "metric": metric, "value": value})
+    return rows
+
+
+def _same(key, expected, actual) -> bool:
+    if expected is None:
+        return actual is None or (isinstance(actual, float) and math.isnan(actual))
+    if isinstance(expected, str) and key == "value":
+        # Las columnas son numéricas: una lectura no numérica llega como NaN.
+        return isinstance(actual, float) and math.isnan(actual)
+    if isinstance(expected, float) and math.isnan(expected):
+        return math.isnan(actual)
+    return type(expected) is type(actual) and expected == actual
+
+
+def test_round_like_python_breaks_ties_like_round() -> None:
+    raw = np.array([0.025, 0.15, 2.675, 0.285 * 100, 12.3456, -0.125])
+    for digits in (1, 2, 3):
+        assert round_like_python(raw, digits).tolist() == [round(item, digits) for item in raw.tolist()]
+    assert soil_percent("bad") == 0.0 and soil_percent(float("nan")) == 0.0 and soil_percent(1.7) == 100.0
+
+
+def test_process_batch_matches_per_sample_path() -> None:
+    batch_rows = _rows(2000, "batch-node")
+    columns = process_batch(
+        [row["ts_ns"] for row in batch_rows],
+        "batch-node",
+        [row["metric"] for row in batch_rows],
+        [row["value"] for row in batch_rows],
+    )
+    checked = set()
+    for idx, row in enumerate(_rows(2000, "row-node")):
+        expected = process_sample(row).to_dict()
+        if row["metric"] == "soil_moisture":
+            # Contrato: la lectura original se conserva y el % es un campo nuevo.
+            assert (expected["metric"], expected["value"]) == ("soil_moisture", row["value"])
+        for key, value in expected.items():
+            if key in ("ts", "ts_model", "node_id") or key not in columns:
+                continue
+            actual = columns[key][idx]
+            actual = actual.item() if hasattr(actual, "item") else actual
+            assert _same(key, value, actual), (idx, key, value, actual)
+            checked.add(key)
+    assert {"soil_moisture_pct", "dry_alert", "soil_moisture_pct_zscore", "air_temp_c_mad_score"} <= checked
+    assert {"soil_moisture_pct_hw_forecast", "env_mahal_distance", "risk_score", "anomaly_detected"} <= checked
+    assert columns["dry_alert"].sum() > 0
+
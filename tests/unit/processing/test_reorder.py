@@ -0,0 +1,81 @@
+import random
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.processing.pipeline import Pipeline
+from src.processing.reorder import ReorderBuffer
+
+BASE_NS = int(datetime(2025, 1, 1, tzinfo=UTC).timestamp()) * 10**9
+
+
+def _sample(seconds: int, node: str = "n1") -> dict:
+    return {"ts_ns": BASE_NS + seconds * 10**9, "node_id": node, "metric": "temp_aire", "value": float(seconds)}
+
+
+def test_emits_in_order_within_allowed_lateness() -> None:
+    stage = ReorderBuffer(timedelta(seconds=30))
+    emitted = []
+    for seconds in (0, 10, 5, 40, 20, 35, 70, 15):
+        emitted += stage.process(_sample(seconds))
+    assert [item["value"] for item in emitted] == [0, 5, 10, 20, 35, 40]
+    assert stage.late == 1 and stage.drain_late()[0]["value"] == 15
+    assert stage.watermark() == BASE_NS + 40 * 10**9
+    assert [item["value"] for item in stage.flush()] == [70]
+    assert stage.stats()["pending"] == 0
+
+
+def test_bounded_buffer_forces_oldest_out() -> None:
+    late = []
+    stage = ReorderBuffer(timedelta(hours=1), max_pending=3, on_late=late.append)
+    emitted = []
+    for seconds in (10, 30, 20, 40, 50):
+        emitted += stage.process(_sample(seconds))
+    assert [item["value"] for item in emitted] == [10, 20]
+    assert stage.forced == 2 and stage.pending() == 3
+    assert stage.process(_sample(15)) == [] and [item["value"] for item in late] == [15]
+
+
+def test_keyed_watermarks_are_independent() -> None:
+    stage = ReorderBuffer(timedelta(seconds=30), key="node_id")
+    emitted = []
+    for seconds, node in [(1000, "live"), (0, "replay"), (1040, "live"), (20, "replay"), (10, "replay")]:
+        emitted += stage.process(_sample(seconds, node=node))
+    assert stage.late == 0
+    assert [(item["node_id"], item["value"]) for item in emitted] == [("live", 1000)]
+    assert [(item["node_id"], item["value"]) for item in stage.flush()] == [
+        ("replay", 0), ("replay", 10), ("replay", 20), ("live", 1040)
+    ]
+    assert stage.process(_sample(5, node="replay")) == [] and stage.late == 1
+
+
+def test_shuffled_stream_comes_out_sorted_in_pipeline() -> None:
+    rng = random.Random(7)
+    seconds = list(range(0, 600, 5))
+    shuffled = []
+    for start in range(0, len(seconds), 6):
+        chunk = seconds[start:start + 6]
+        rng.shuffle(chunk)
+        shuffled += chunk
+    pipeline = Pipeline((ReorderBuffer(timedelta(seconds=30)),))
+    out = [item["value"] for item in pipeline.run(_sample(value) for value in shuffled)]
+    assert out == sorted(out) and len(out) == len(seconds)
+    assert pipeline.stats()["reorder"]["received"] == len(seconds)
+
+
+def test_processing_stream_keeps_late_samples_away_from_detectors() -> None:
+    from src.processing import stub
+
+    rows = [_sample(value, node="reorder-node") for value in (0, 30, 10, 200, 20, 400)]
+    results = [result.to_dict() for result in stub.process_stream(rows)]
+    assert [row["value"] for row in results] == [0, 10, 30, 200, 400]
+    assert [row["value"] for row in stub.drain_late_samples()] == [20]
+    stamps = [row["ts_ns"] for row in results]
+    assert stamps == sorted(stamps) and all("temp_aire_ewma_zscore" in row for row in results)
+
+
+def test_rejects_invalid_bounds() -> None:
+    with pytest.raises(ValueError):
+        ReorderBuffer(timedelta(seconds=-1))
+    with pytest.raises(ValueError):
+        ReorderBuffer(max_pending=0)
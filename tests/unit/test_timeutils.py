@@ -0,0 +1,70 @@
+import time
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+
+from src import timeutils
+
+
+def test_iso_roundtrip_keeps_contract_format() -> None:
+    ts_ns = timeutils.datetime_to_ns(datetime(2025, 5, 1, 12, 30, 15, 250000, tzinfo=UTC))
+    iso = timeutils.iso_from_ns(ts_ns)
+
+    assert iso == "2025-05-01T12:30:15.250000Z"
+    assert timeutils.to_epoch_ns(iso) == ts_ns
+
+
+def test_numeric_epochs_are_accepted_in_any_unit() -> None:
+    expected = 1_735_689_600 * 10**9
+    assert timeutils.to_epoch_ns(1_735_689_600) == expected
+    assert timeutils.to_epoch_ns(1_735_689_600_000) == expected
+    assert timeutils.to_epoch_ns(1_735_689_600_000_000) == expected
+    assert timeutils.to_epoch_ns(expected) == expected
+    assert timeutils.to_epoch_ns(1_735_689_600.5) == expected + 500_000_000
+
+
+def test_offsets_normalize_to_utc() -> None:
+    aware = datetime(2025, 1, 1, 1, tzinfo=timezone(timedelta(hours=1)))
+    assert timeutils.to_epoch_ns(aware) == timeutils.to_epoch_ns("2025-01-01T00:00:00Z")
+    assert timeutils.to_epoch_ns("2025-01-01T00:00:00Z") == timeutils.to_epoch_ns("2025-01-01T00:00:00+00:00")
+
+
+@pytest.mark.skipif(not hasattr(time, "tzset"), reason="requiere time.tzset")
+def test_naive_values_are_local_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("TZ", "America/Bogota")  # UTC-5, sin horario de verano
+    time.tzset()
+    try:
+        expected = timeutils.to_epoch_ns("2025-01-01T05:00:00Z")
+        assert timeutils.to_epoch_ns(datetime(2025, 1, 1)) == expected
+        timeutils.parse_iso_ns.cache_clear()
+        assert timeutils.to_epoch_ns("2025-01-01T00:00:00") == expected
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        timeutils.parse_iso_ns.cache_clear()
+
+
+def test_numpy_scalars_and_unknown_types() -> None:
+    np = pytest.importorskip("numpy")
+    assert timeutils.to_epoch_ns(np.int64(1_735_689_600)) == 1_735_689_600 * 10**9
+    assert timeutils.to_epoch_ns(np.int32(5)) == 5 * 10**9
+    assert timeutils.to_epoch_ns(np.float32(2.0)) == 2 * 10**9
+    before = timeutils.now_ns()
+    assert timeutils.to_epoch_ns(float("inf")) >= before
+    for bad in (True, object(), [1]):
+        with pytest.raises(TypeError):
+            timeutils.to_epoch_ns(bad)
+
+
+def test_sample_ts_ns_prefers_carried_epoch() -> None:
+    assert timeutils.sample_ts_ns({"ts": "not-a-date", "ts_ns": 42}) == 42
+    assert timeutils.sample_ts_ns({"ts": "1970-01-01T00:00:01Z"}) == 10**9
+
+
+def test_iso_parse_cache_is_consistent_across_threads() -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    stamps = [f"2025-05-01T12:00:{second:02d}Z" for second in range(60)] * 20
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        parsed = list(pool.map(timeutils.parse_iso_ns, stamps))
+    assert parsed == [timeutils.to_epoch_ns(stamp) for stamp in stamps]
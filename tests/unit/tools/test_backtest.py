@@ -0,0 +1,66 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.tools import backtest  # noqa: E402
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+BASE_NS = int(BASE.timestamp()) * 10**9
+STEP_NS = 60 * 10**9
+
+
+def _series(count: int = 600, spikes: tuple[int, ...] = (200, 400)):
+    rng = np.random.default_rng(3)
+    ts_ns = BASE_NS + np.arange(count, dtype=np.int64) * STEP_NS
+    values = 20.0 + rng.normal(0.0, 0.2, count)
+    values[list(spikes)] += 5.0
+    return ts_ns, values
+
+
+def test_score_flags_counts_events_and_false_positives() -> None:
+    ts_ns = np.arange(10, dtype=np.int64)
+    flags = np.array([0, 1, 0, 0, 1, 0, 0, 0, 1, 0], dtype=bool)
+    starts, ends = np.array([1, 6]), np.array([2, 7])
+    score = backtest.score_flags(ts_ns, flags, starts, ends)
+    assert score["precision"] == pytest.approx(1 / 3)
+    assert score["recall"] == pytest.approx(0.5)
+    assert backtest.score_flags(ts_ns, flags, starts, ends, tolerance_ns=1)["recall"] == 1.0
+    assert backtest.score_flags(ts_ns, flags, np.empty(0), np.empty(0))["f1"] is None
+
+
+def test_backtest_grid_inline_and_parallel_match() -> None:
+    ts_ns, values = _series()
+    labels = (ts_ns[[200, 400]], ts_ns[[200, 400]])
+    grid = backtest.build_grid(["zscore", "mad", "ewma"], [3.0, 6.0], [2.0], [30])
+    inline = backtest.run_backtest(ts_ns, values, grid, labels=labels)
+    parallel = backtest.run_backtest(ts_ns, values, grid, labels=labels, workers=2)
+
+    strip = [{key: row[key] for key in backtest.REPORT_FIELDS if key != "seconds"} for row in inline]
+    assert strip == [{key: row[key] for key in backtest.REPORT_FIELDS if key != "seconds"} for row in parallel]
+    assert len(inline) == 6
+    best = min(inline, key=backtest._rank_key)
+    assert best["recall"] == 1.0
+
+
+def test_load_csv_series_sorts_and_filters(tmp_path) -> None:
+    path = tmp_path / "history.csv"
+    path.write_text(
+        "ts,value,node_id\n"
+        "2025-01-01T00:02:00Z,3,a\n"
+        "2025-01-01T00:00:00Z,1,a\n"
+        "2025-01-01T00:01:00Z,9,b\n"
+        "2025-01-01T00:03:00Z,bad,a\n"
+    )
+    ts_ns, values = backtest.load_csv_series(str(path), node_id="a")
+    assert values.tolist() == [1.0, 3.0]
+    assert ts_ns[1] - ts_ns[0] == 2 * STEP_NS
+
+
+def test_multivariate_methods_are_rejected() -> None:
+    assert "mahalanobis" not in backtest.UNIVARIATE_METHODS
+    with pytest.raises(SystemExit):
+        backtest.parse_args(["--csv", "h.csv", "--metric", "t", "--methods", "mahalanobis"])
+    with pytest.raises(ValueError, match="mahalanobis"):
+        backtest.build_grid(["zscore", "mahalanobis"], [3.0], [2.0], [30])
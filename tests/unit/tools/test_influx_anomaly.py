@@ -0,0 +1,55 @@
+import math
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models.detector_bank import MULTIVARIATE_METHODS, UNIVARIATE_METHODS, result_keys
+from src.tools import influx_anomaly
+
+BASE = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def _samples(hours: int = 72, step_min: int = 10):
+    samples = []
+    for idx in range(hours * 60 // step_min):
+        ts = BASE + timedelta(minutes=step_min * idx)
+        value = 20.0 + 4.0 * math.sin(idx * step_min / 1440 * 2 * math.pi) + 0.1 * (idx % 7)
+        if idx == 300:
+            value += 25.0
+        samples.append({"ts": ts.isoformat().replace("+00:00", "Z"), "value": value})
+    return samples
+
+
+@pytest.mark.parametrize("method", UNIVARIATE_METHODS)
+def test_detect_anomalies_runs_every_offered_method(method: str) -> None:
+    anomalies, last_state = influx_anomaly.detect_anomalies(
+        _samples(),
+        metric="air_temp_c",
+        window_hours=24,
+        window_samples=500,
+        min_samples=12,
+        z_threshold=3.0,
+        mad_threshold=3.5,
+        method=method,
+    )
+    assert result_keys("air_temp_c", method)["anomaly"] in last_state
+    assert all(sample[result_keys("air_temp_c", method)["anomaly"]] for sample in anomalies)
+
+
+def test_cli_offers_only_univariate_methods() -> None:
+    assert set(UNIVARIATE_METHODS).isdisjoint(MULTIVARIATE_METHODS)
+    assert influx_anomaly.parse_args(["--metric", "air_temp_c", "--method", "mad"]).method == "mad"
+    for method in MULTIVARIATE_METHODS:
+        with pytest.raises(SystemExit):
+            influx_anomaly.parse_args(["--metric", "air_temp_c", "--method", method])
+        with pytest.raises(ValueError):
+            influx_anomaly.detect_anomalies(
+                _samples(1),
+                metric="air_temp_c",
+                window_hours=1,
+                window_samples=10,
+                min_samples=2,
+                z_threshold=3.0,
+                mad_threshold=3.5,
+                method=method,
+            )